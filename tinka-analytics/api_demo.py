@@ -2,6 +2,8 @@ from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel, conlist
 import numpy as np
 
+from modules import etl, bitmask, exact
+
 app = FastAPI(
     title="Tinka Analytics AI API",
     description="Demo deployment for Tinka Analytics Predictive Models",
@@ -16,11 +18,33 @@ class PredictionResponse(BaseModel):
     score_rareza: float
     mensaje: str
     recomendacion: str
+    max_aciertos_historicos: int = 0
+    veces_sorteada: int = 0
+    percentil_suma: float = 50.0
+
+def get_store():
+    """
+    Shared, memory-mapped history (one physical copy for every worker).
+    """
+    return etl.open_draw_store()
     
 @app.get("/")
 def read_root():
     return {"status": "AI Model API is Running", "docs": "/docs"}
 
+@app.get("/frecuencias")
+def read_frequencies():
+    store = get_store()
+    if store is None:
+        raise HTTPException(status_code=503, detail="Historial de sorteos no disponible.")
+
+    counts = store.ball_counts()
+    return {
+        "version": store.version,
+        "sorteos": len(store),
+        "frecuencias": {str(n): int(c) for n, c in enumerate(counts, start=1)}
+    }
+
 @app.post("/predict", response_model=PredictionResponse)
 def predict_combination(request: PredictionRequest):
     numeros = request.numeros
@@ -32,10 +56,11 @@ def predict_combination(request: PredictionRequest):
         raise HTTPException(status_code=400, detail="Los números no pueden repetirse.")
         
     suma = sum(numeros)
-    media_teorica = 153 # 6 * 25.5
+    dist_suma = exact.get_tables(50, 6).suma
     
-    desviacion = abs(suma - media_teorica) / media_teorica
-    score_rareza = round(min(100.0, desviacion * 200.0), 2)
+    # Rareza = 100 * (1 - P(suma al menos tan extrema)), from the exact distribution of the sum
+    score_rareza = round(float(100.0 * (1.0 - dist_suma.two_sided_p(suma))), 2)
+    percentil_suma = round(float(dist_suma.percentile(suma)), 2)
     
     if score_rareza < 20:
         mensaje = "Combinación común. Se alinea con el Centroide del Teorema del Límite Central."
@@ -46,11 +71,22 @@ def predict_combination(request: PredictionRequest):
     else:
         mensaje = "Combinación altamente anómala (Rareza Extrema)."
         recomendacion = "Baja probabilidad de salir, pero de acertar, garantiza pozo único."
+
+    # Compare against every historical draw with bitwise ops on the shared store
+    max_aciertos, veces_sorteada = 0, 0
+    store = get_store()
+    if store is not None and len(store):
+        aciertos = bitmask.count_matches(store.masks, bitmask.numbers_to_mask(numeros))
+        max_aciertos = int(aciertos.max())
+        veces_sorteada = int((aciertos == 6).sum())
         
     return PredictionResponse(
         score_rareza=score_rareza,
         mensaje=mensaje,
-        recomendacion=recomendacion
+        recomendacion=recomendacion,
+        max_aciertos_historicos=max_aciertos,
+        veces_sorteada=veces_sorteada,
+        percentil_suma=percentil_suma
     )
 
 # Para ejecutar:
@@ -2,15 +2,32 @@ import pandas as pd
 import numpy as np
 import scipy.stats as stats
 
+from . import features
+from .store import DrawStore
+from .audit import runs_test, compute_gaps
+from .bayes import posterior_trajectory
+
 # -------------------------------------------------------------------
 # FASE 1: ESTADÍSTICA DESCRIPTIVA
 # -------------------------------------------------------------------
 
+def _observed_counts(df_exploded):
+    """
+    Frequency per ball as a Series indexed by ball number (only balls that came out).
+    Accepts df_exploded or a memory-mapped DrawStore.
+    """
+    if isinstance(df_exploded, DrawStore):
+        counts = df_exploded.ball_counts()
+        freqs = pd.Series(counts, index=np.arange(1, len(counts) + 1), name='count')
+        return freqs[freqs > 0]
+    return df_exploded['Numero'].value_counts().sort_index()
+
 def get_frequency_analysis(df_exploded):
     """
     Returns frequency counts of balls, mean frequency, and standard deviation.
+    df_exploded can also be a DrawStore (zero-copy).
     """
-    freqs = df_exploded['Numero'].value_counts().sort_index()
+    freqs = _observed_counts(df_exploded)
     mean_freq = freqs.mean()
     std_freq = freqs.std()
     
@@ -26,9 +43,7 @@ def get_sum_distribution(df_draws):
     """
     Returns the distribution of the sum of the balls, and Shapiro-Wilk test.
     """
-    df = df_draws.copy()
-    df['Suma'] = df['Bolillas_Clean'].apply(lambda x: sum([int(n) for n in x if n.isdigit()]))
-    sums = df['Suma']
+    sums = df_draws['Suma']
     
     mean_sum = sums.mean()
     std_sum = sums.std()
@@ -45,13 +60,8 @@ def get_parity_analysis(df_draws):
     """
     Returns parity distribution and basic hypergeometric probabilities.
     """
-    def count_parity(bolillas):
-        nums = [int(n) for n in bolillas if n.isdigit()]
-        evens = sum(1 for n in nums if n % 2 == 0)
-        odds = len(nums) - evens
-        return f"{evens}P-{odds}I"
-
-    parity_counts = df_draws['Bolillas_Clean'].apply(count_parity).value_counts().reset_index()
+    combinations = df_draws['Pares'].astype(str) + 'P-' + df_draws['Impares'].astype(str) + 'I'
+    parity_counts = combinations.value_counts().reset_index()
     parity_counts.columns = ['Combinacion', 'FrecuenciaObservada']
     parity_counts['ProporcionObservada'] = parity_counts['FrecuenciaObservada'] / len(df_draws)
     
@@ -76,8 +86,9 @@ def get_parity_analysis(df_draws):
 def get_chi_square_test(df_exploded, total_balls=50):
     """
     Chi-Square Goodness of Fit test for uniform distribution.
+    df_exploded can also be a DrawStore (zero-copy).
     """
-    observed_freq = df_exploded['Numero'].value_counts().sort_index()
+    observed_freq = _observed_counts(df_exploded)
     
     total_draws_balls = observed_freq.sum()
     expected_freq = np.full(total_balls, total_draws_balls / total_balls)
@@ -94,37 +105,32 @@ def get_chi_square_test(df_exploded, total_balls=50):
     
     return chi2_stat, p_value, obs_all, expected_freq
 
-def get_gap_metrics(df_exploded, current_sorteo_max):
+def get_gap_incidence(df_exploded, total_balls=50):
+    """
+    Chronological incidence matrix and numeric Sorteo ids from df_exploded (or a DrawStore).
+    """
+    if isinstance(df_exploded, DrawStore):
+        return df_exploded.incidence, df_exploded.sorteos
+
+    # Sorteo ids parsed once per column (not once per ball)
+    sorteo_num = pd.to_numeric(df_exploded['Sorteo'].astype(str).str.extract(r'(\d+)', expand=False), errors='coerce')
+    codes, sorteos = pd.factorize(sorteo_num, sort=True)
+    numbers = df_exploded['Numero'].to_numpy(dtype=int)
+
+    incidence = np.zeros((len(sorteos), total_balls), dtype=bool)
+    valid = (codes >= 0) & (numbers >= 1) & (numbers <= total_balls)
+    incidence[codes[valid], numbers[valid] - 1] = True
+    return incidence, np.asarray(sorteos, dtype=float)
+
+def get_gap_metrics(df_exploded, current_sorteo_max, total_balls=50):
     """
     Z-Score Gap Map: Measures how many standard deviations a number is from its expected return.
+    All balls are computed at once from the incidence matrix (see audit.compute_gaps).
     """
-    gaps = {}
-    for num in range(1, 51):
-        draws_with_num = df_exploded[df_exploded['Numero'] == num]['Sorteo'].astype(str).str.extract(r'(\d+)').astype(float).squeeze().sort_values(ascending=False).values
-        
-        if len(draws_with_num) > 1:
-            diffs = np.abs(np.diff(draws_with_num))
-            mean_gap = np.mean(diffs)
-            std_gap = np.std(diffs)
-            last_seen = draws_with_num[0]
-            current_gap = current_sorteo_max - last_seen
-            
-            z_score = (current_gap - mean_gap) / std_gap if std_gap > 0 else 0
-            
-            gaps[num] = {
-                'Numero': str(num),
-                'Mean_Gap': mean_gap,
-                'Current_Gap': current_gap,
-                'Z_Score': z_score,
-                'Plot_Size': max(1, 5 + (z_score * 2)) 
-            }
-        else:
-            gaps[num] = {'Numero': str(num), 'Mean_Gap': 0, 'Current_Gap': 0, 'Z_Score': 0, 'Plot_Size': 1}
-            
-    df_gaps = pd.DataFrame(gaps).T
-    for col in ['Mean_Gap', 'Current_Gap', 'Z_Score', 'Plot_Size']:
-        df_gaps[col] = df_gaps[col].astype(float)
-        
+    incidence, sorteos = get_gap_incidence(df_exploded, total_balls)
+    gap_result = compute_gaps(incidence, sorteos, current_sorteo_max)
+
+    df_gaps = gap_result.df_gaps
     anomaly = df_gaps.loc[df_gaps['Z_Score'].idxmax()]
     
     return df_gaps, anomaly
@@ -133,23 +139,7 @@ def get_runs_test(df_draws):
     """
     Runs Test (Wald-Wolfowitz) on Sums to check independence.
     """
-    df = df_draws.copy()
-    df['Suma'] = df['Bolillas_Clean'].apply(lambda x: sum([int(n) for n in x if n.isdigit()]))
-    median_sum = df['Suma'].median()
-    
-    seq = (df['Suma'] > median_sum).astype(int).values
-    
-    n1 = np.sum(seq)
-    n2 = len(seq) - n1
-    runs = np.sum(np.abs(np.diff(seq))) + 1
-    
-    expected_runs = ((2 * n1 * n2) / (n1 + n2)) + 1 if (n1 + n2) > 0 else 0
-    var_runs = (2 * n1 * n2 * (2 * n1 * n2 - n1 - n2)) / ((n1 + n2)**2 * (n1 + n2 - 1)) if (n1 + n2) > 1 else 0
-    
-    z_stat = (runs - expected_runs) / np.sqrt(var_runs) if var_runs > 0 else 0
-    p_value = 2 * (1 - stats.norm.cdf(abs(z_stat)))
-    
-    return z_stat, p_value, runs, expected_runs
+    return runs_test(df_draws['Suma'].to_numpy())
 
 # -------------------------------------------------------------------
 # FASE 3: MACHINE LEARNING & AI
@@ -157,64 +147,60 @@ def get_runs_test(df_draws):
 
 def get_ml_features(df_exploded):
     """
-    Feature Engineering: Generate lags, moving averages, etc. for ML.
+    Feature Engineering: lags, rolling sums, cumulative counts and gaps for ML,
+    as a FeatureSet (see modules/features.py). A DrawStore uses the on-disk feature
+    cache of its dataset version; df_exploded is computed on the fly.
     """
-    df = df_exploded.copy()
-    df.sort_values(by=['Sorteo', 'Numero'], inplace=True)
-    
-    # Simple feature engineering for demo
-    # Number of times a ball has appeared up to this point
-    df['Sorteos_Number'] = df['Sorteo'].astype(str).str.extract(r'(\d+)').astype(float)
-    df['Cumulative_Count'] = df.groupby('Numero').cumcount() + 1
-    
-    return df
+    if isinstance(df_exploded, DrawStore):
+        feature_set = features.load_features(df_exploded)
+        if feature_set is not None:
+            return feature_set
+    incidence, sorteos = get_gap_incidence(df_exploded)
+    return features.build_feature_set(incidence, sorteos)
+
+# XGBClassifier settings used unless overridden (XGBoost's own defaults)
+XGB_PARAMS = {'n_estimators': 100, 'max_depth': 6, 'learning_rate': 0.3}
 
-def train_xgb_model(df_exploded):
+def fit_xgb_model(feature_set, params=None, test_size=0.2, xgb_model=None):
+    """
+    Fit an XGBClassifier on a FeatureSet with a chronological holdout (the last
+    test_size of the draws). xgb_model: booster to continue training from, in which
+    case params['n_estimators'] trees are added to it.
+    Returns (model, cm, fpr, tpr, roc_auc, importances).
+    """
+    from xgboost import XGBClassifier
+    from sklearn.metrics import confusion_matrix, roc_curve, auc
+
+    params = {**XGB_PARAMS, **(params or {})}
+
+    # Chronological split by draws (one sample per draw and ball)
+    n_train = feature_set.n_draws - int(np.ceil(test_size * feature_set.n_draws))
+    X_train, y_train = feature_set.xy(slice(None, n_train))
+    X_test, y_test = feature_set.xy(slice(n_train, None))
+
+    # Train
+    model = XGBClassifier(eval_metric='logloss', scale_pos_weight=(len(y_train) - y_train.sum()) / y_train.sum(), **params)
+    model.fit(X_train, y_train, xgb_model=xgb_model)
+
+    y_pred_proba = model.predict_proba(X_test)[:, 1]
+    y_pred = model.predict(X_test)
+
+    cm = confusion_matrix(y_test, y_pred)
+    fpr, tpr, _ = roc_curve(y_test, y_pred_proba)
+    roc_auc = auc(fpr, tpr)
+
+    importances = dict(zip(feature_set.feature_names, model.feature_importances_))
+
+    return model, cm, fpr, tpr, roc_auc, importances
+
+def train_xgb_model(df_exploded, test_size=0.2):
     """
     Trains a simple XGBClassifier to predict if a number will show up based on engineered features.
+    Every feature of draw t only uses earlier draws; the last test_size of the draws is the holdout.
     Returns metrics (Confusion Matrix, ROC Curve data).
     """
     try:
-        from xgboost import XGBClassifier
-        from sklearn.model_selection import train_test_split
-        from sklearn.metrics import confusion_matrix, roc_curve, auc
-        
-        df = get_ml_features(df_exploded)
-        
-        # Super simplified dataset generation for binary classification:
-        # We need positive (number drawn) and negative (number not drawn) samples.
-        sorteos = df['Sorteo'].unique()
-        all_combinations = pd.MultiIndex.from_product([sorteos, range(1, 51)], names=['Sorteo', 'Numero']).to_frame(index=False)
-        merged = pd.merge(all_combinations, df[['Sorteo', 'Numero', 'Cumulative_Count']], on=['Sorteo', 'Numero'], how='left')
-        merged['Is_Drawn'] = merged['Cumulative_Count'].notna().astype(int)
-        merged['Cumulative_Count'] = merged.groupby('Numero')['Cumulative_Count'].ffill().fillna(0)
-        
-        # Add some random lag features to justify ML use
-        merged['Lag_1'] = merged.groupby('Numero')['Is_Drawn'].shift(1).fillna(0)
-        merged['Lag_2'] = merged.groupby('Numero')['Is_Drawn'].shift(2).fillna(0)
-        merged['Rolling_Sum_5'] = merged.groupby('Numero')['Is_Drawn'].transform(lambda x: x.rolling(5).sum()).fillna(0)
-        
-        X = merged[['Cumulative_Count', 'Lag_1', 'Lag_2', 'Rolling_Sum_5']]
-        y = merged['Is_Drawn']
-        
-        # Train Test Split
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, shuffle=False)
-        
-        # Train
-        model = XGBClassifier(eval_metric='logloss', use_label_encoder=False, scale_pos_weight=(len(y)-y.sum())/y.sum())
-        model.fit(X_train, y_train)
-        
-        y_pred_proba = model.predict_proba(X_test)[:, 1]
-        y_pred = model.predict(X_test)
-        
-        cm = confusion_matrix(y_test, y_pred)
-        fpr, tpr, _ = roc_curve(y_test, y_pred_proba)
-        roc_auc = auc(fpr, tpr)
-        
-        importance = model.feature_importances_
-        feature_names = X.columns
-        importances = dict(zip(feature_names, importance))
-        
+        _, cm, fpr, tpr, roc_auc, importances = fit_xgb_model(get_ml_features(df_exploded), test_size=test_size)
         return cm, fpr, tpr, roc_auc, importances
     except ImportError:
         return None, None, None, None, None
@@ -230,37 +216,13 @@ def get_lstm_simulated_loss():
     
     return pd.DataFrame({'Epoch': epochs, 'Train_Loss': loss, 'Val_Loss': val_loss})
 
-def get_bayesian_inference(df_exploded, current_sorteo_max):
+def get_bayesian_inference(df_exploded, current_sorteo_max=None, prior_strength=50.0, credible=0.95):
     """
-    Simple Bayesian Evidence Updator.
-    Prior: 6/50 (base chance of any number being drawn).
-    Likelihood: P(Evidence | Drawn) vs P(Evidence | Not Drawn) based on gap length.
+    Conjugate Beta-Binomial posterior of every ball (see bayes.posterior_trajectory).
+    Prior: Beta centered on 6/50 with the weight of prior_strength draws.
+    Returns the final posterior per ball with its credible interval.
+    current_sorteo_max is accepted for compatibility and not needed by the update.
     """
-    df_gaps, _ = get_gap_metrics(df_exploded, current_sorteo_max)
-    
-    # Prior Probability (P(D))
-    prior = 6 / 50.0  # ~12%
-    
-    results = []
-    for _, row in df_gaps.iterrows():
-        # Heuristic likelihood based on Z-Score (Just for simulation/demo purposes)
-        # If Z-score is high, evidence suggests it's overdue
-        z = row['Z_Score']
-        
-        # Using a sigmoid-like modifier on the prior
-        modifier = 1 / (1 + np.exp(-z)) 
-        
-        # Adjusted Posterior (Bayesian update simulation)
-        posterior = prior * modifier * 2 
-        # Cap at 50% for realism
-        posterior = min(posterior, 0.5)
-        
-        results.append({
-            'Numero': row['Numero'],
-            'Prior': prior,
-            'Posterior': posterior,
-            'Z_Score_Evidencia': z
-        })
-        
-    df_bayes = pd.DataFrame(results)
-    return df_bayes
+    incidence, sorteos = get_gap_incidence(df_exploded)
+    trajectory = posterior_trajectory(incidence, sorteos, prior_strength, credible, stride=max(len(incidence), 1))
+    return trajectory.df_final
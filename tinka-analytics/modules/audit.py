@@ -0,0 +1,582 @@
+import json
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import scipy.stats as stats
+
+from . import bitmask
+from .store import DrawStore
+
+# Shapiro-Wilk p-values are only reliable up to 5000 observations
+SHAPIRO_MAX_N = 5000
+
+# -------------------------------------------------------------------
+# MOTOR DE AUDITORÍA (FASE 1 + FASE 2 EN UNA PASADA)
+# -------------------------------------------------------------------
+
+@dataclass
+class AuditResult:
+    """
+    Everything the Dashboard shows for Fase 1 and Fase 2, computed in one pass.
+    Arrays are indexed by ball (position 0 = ball 1) or by draw, in chronological order.
+    """
+    n_draws: int
+    total_balls: int
+    # Frecuencias + Chi-Cuadrado
+    frequencies: np.ndarray
+    expected_freq: np.ndarray
+    mean_freq: float
+    std_freq: float
+    chi2_stat: float
+    chi2_p_value: float
+    # Sumas (input de Shapiro-Wilk)
+    sums: np.ndarray
+    mean_sum: float
+    std_sum: float
+    median_sum: float
+    shapiro_p_value: float
+    # Paridad
+    evens: np.ndarray
+    parity_hist: np.ndarray
+    parity_expected: np.ndarray
+    # Runs Test
+    runs: int
+    expected_runs: float
+    runs_z: float
+    runs_p_value: float
+
+    @property
+    def df_freq(self):
+        """
+        Same layout as analysis.get_frequency_analysis.
+        """
+        seen = self.frequencies > 0
+        return pd.DataFrame({
+            'Numero': np.arange(1, self.total_balls + 1)[seen].astype(str),
+            'Frecuencia': self.frequencies[seen],
+            'Media_Esperada': self.mean_freq
+        })
+
+    @property
+    def parity_counts(self):
+        """
+        Same layout as analysis.get_parity_analysis.
+        """
+        k = len(self.parity_hist) - 1
+        seen = np.flatnonzero(self.parity_hist)
+        df = pd.DataFrame({
+            'Combinacion': [f"{e}P-{k - e}I" for e in seen],
+            'FrecuenciaObservada': self.parity_hist[seen],
+        })
+        df['ProporcionObservada'] = df['FrecuenciaObservada'] / self.n_draws
+        df['ProbabilidadTeorica'] = self.parity_expected[seen]
+        return df.sort_values(by='FrecuenciaObservada', ascending=False, kind='stable').reset_index(drop=True)
+
+def runs_test(values):
+    """
+    Wald-Wolfowitz runs test above/below the median.
+    Returns (z_stat, p_value, runs, expected_runs).
+    """
+    values = np.asarray(values)
+    if len(values) == 0:
+        return 0, 1.0, 0, 0
+
+    seq = (values > np.median(values)).astype(np.int8)
+
+    n1 = int(seq.sum())
+    n2 = len(seq) - n1
+    runs = int(np.count_nonzero(np.diff(seq))) + 1
+
+    return runs_statistics(n1, n2, runs)
+
+def runs_statistics(n1, n2, runs):
+    """
+    Normal approximation of the runs test given the counts above (n1) and below (n2) the median.
+    Returns (z_stat, p_value, runs, expected_runs).
+    """
+    expected_runs = ((2 * n1 * n2) / (n1 + n2)) + 1 if (n1 + n2) > 0 else 0
+    var_runs = (2 * n1 * n2 * (2 * n1 * n2 - n1 - n2)) / ((n1 + n2)**2 * (n1 + n2 - 1)) if (n1 + n2) > 1 else 0
+
+    z_stat = (runs - expected_runs) / np.sqrt(var_runs) if var_runs > 0 else 0
+    p_value = 2 * (1 - stats.norm.cdf(abs(z_stat)))
+
+    return z_stat, p_value, runs, expected_runs
+
+def run_audit(draws, total_balls=50):
+    """
+    Frequencies, Chi-Square, sum moments + Shapiro-Wilk, parity histogram and Runs Test
+    from the (n_draws x k) draws matrix (or a DrawStore) in a single vectorized pass.
+    """
+    if isinstance(draws, DrawStore):
+        draws = draws.draws
+    draws = np.asarray(draws)
+    n_draws, k = draws.shape
+
+    # 1. Frequencies + Chi-Square (0 = missing ball, dropped)
+    frequencies = np.bincount(draws.ravel(), minlength=total_balls + 1)[1:total_balls + 1]
+    seen = frequencies[frequencies > 0]
+    mean_freq = seen.mean() if len(seen) else 0.0
+    std_freq = seen.std(ddof=1) if len(seen) > 1 else 0.0
+
+    expected_freq = np.full(total_balls, frequencies.sum() / total_balls)
+    if frequencies.sum() > 0:
+        chi2_stat, chi2_p = stats.chisquare(f_obs=frequencies, f_exp=expected_freq)
+    else:
+        chi2_stat, chi2_p = 0.0, 1.0
+
+    # 2. Sums (Shapiro-Wilk input, most recent SHAPIRO_MAX_N draws)
+    sums = draws.sum(axis=1, dtype=np.int64)
+    mean_sum = sums.mean() if n_draws else 0.0
+    std_sum = sums.std(ddof=1) if n_draws > 1 else 0.0
+    median_sum = np.median(sums) if n_draws else 0.0
+    shapiro_p = stats.shapiro(sums[-SHAPIRO_MAX_N:])[1] if n_draws >= 3 else 1.0
+
+    # 3. Parity (hypergeometric reference: odds among total_balls)
+    evens = ((draws > 0) & (draws % 2 == 0)).sum(axis=1)
+    parity_hist = np.bincount(evens, minlength=k + 1)
+    n_odd_balls = (total_balls + 1) // 2
+    parity_expected = stats.hypergeom.pmf(k - np.arange(k + 1), total_balls, n_odd_balls, k)
+
+    # 4. Runs Test on the chronological sum series
+    runs_z, runs_p, runs, expected_runs = runs_test(sums)
+
+    return AuditResult(
+        n_draws=n_draws,
+        total_balls=total_balls,
+        frequencies=frequencies,
+        expected_freq=expected_freq,
+        mean_freq=float(mean_freq),
+        std_freq=float(std_freq),
+        chi2_stat=float(chi2_stat),
+        chi2_p_value=float(chi2_p),
+        sums=sums,
+        mean_sum=float(mean_sum),
+        std_sum=float(std_sum),
+        median_sum=float(median_sum),
+        shapiro_p_value=float(shapiro_p),
+        evens=evens,
+        parity_hist=parity_hist,
+        parity_expected=parity_expected,
+        runs=runs,
+        expected_runs=float(expected_runs),
+        runs_z=float(runs_z),
+        runs_p_value=float(runs_p),
+    )
+
+# -------------------------------------------------------------------
+# MOTOR DE RETRASOS (GAPS) PARA TODAS LAS BOLILLAS
+# -------------------------------------------------------------------
+
+@dataclass
+class GapResult:
+    """
+    Inter-arrival gaps of every ball, measured in Sorteo ids.
+    The full history is stored CSR-style: the gaps of ball n are
+    gaps[offsets[n - 1]:offsets[n]], in chronological order.
+    """
+    total_balls: int
+    gaps: np.ndarray
+    gap_sorteos: np.ndarray
+    offsets: np.ndarray
+    appearances: np.ndarray
+    mean_gap: np.ndarray
+    std_gap: np.ndarray
+    last_seen: np.ndarray
+    current_gap: np.ndarray
+    z_score: np.ndarray
+
+    def history(self, number):
+        """
+        Gaps of one ball, oldest first.
+        """
+        return self.gaps[self.offsets[number - 1]:self.offsets[number]]
+
+    @property
+    def df_history(self):
+        """
+        Long frame (Numero, Sorteo, Gap): one row per return of a ball, Sorteo being the draw it returned in.
+        """
+        numbers = np.repeat(np.arange(1, self.total_balls + 1), np.diff(self.offsets))
+        return pd.DataFrame({'Numero': numbers, 'Sorteo': self.gap_sorteos, 'Gap': self.gaps})
+
+    @property
+    def df_gaps(self):
+        """
+        Same layout as analysis.get_gap_metrics.
+        """
+        valid = self.appearances > 1
+        df_gaps = pd.DataFrame({
+            'Numero': np.arange(1, self.total_balls + 1).astype(str),
+            'Mean_Gap': np.where(valid, self.mean_gap, 0.0),
+            'Current_Gap': np.where(valid, self.current_gap, 0.0),
+            'Z_Score': np.where(valid, self.z_score, 0.0),
+        }, index=np.arange(1, self.total_balls + 1))
+        df_gaps['Plot_Size'] = np.where(valid, np.maximum(1, 5 + (df_gaps['Z_Score'] * 2)), 1.0)
+        return df_gaps
+
+def compute_gaps(incidence, sorteos=None, current_sorteo=None):
+    """
+    Gap mean, std, current gap and Z-Score for every ball at once from the
+    (n_draws x total_balls) incidence matrix. Draws must be in chronological order.
+    sorteos defaults to 0..n_draws-1 and current_sorteo to the last sorteo.
+    """
+    if isinstance(incidence, DrawStore):
+        incidence, sorteos = incidence.incidence, incidence.sorteos if sorteos is None else sorteos
+    incidence = np.asarray(incidence, dtype=bool)
+    n_draws, total_balls = incidence.shape
+
+    sorteos = np.arange(n_draws, dtype=float) if sorteos is None else np.asarray(sorteos, dtype=float)
+    if current_sorteo is None:
+        current_sorteo = sorteos[-1] if n_draws else 0
+
+    # 1. Every (ball, draw) hit, grouped by ball and chronological within each ball
+    ball_idx, draw_idx = np.nonzero(incidence.T)
+    hit_sorteos = sorteos[draw_idx]
+    appearances = np.bincount(ball_idx, minlength=total_balls)
+
+    # 2. Consecutive hits of the same ball are one gap
+    same_ball = ball_idx[1:] == ball_idx[:-1]
+    gaps = np.diff(hit_sorteos)[same_ball]
+    gap_ball = ball_idx[1:][same_ball]
+    gap_sorteos = hit_sorteos[1:][same_ball]
+    n_gaps = np.bincount(gap_ball, minlength=total_balls)
+    offsets = np.concatenate([[0], np.cumsum(n_gaps)])
+
+    # 3. Per-ball moments (population std, as np.std)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_gap = np.bincount(gap_ball, weights=gaps, minlength=total_balls) / n_gaps
+        sq_dev = (gaps - mean_gap[gap_ball]) ** 2
+        std_gap = np.sqrt(np.bincount(gap_ball, weights=sq_dev, minlength=total_balls) / n_gaps)
+
+    # 4. Current gap and Z-Score
+    last_seen = np.full(total_balls, np.nan)
+    seen = appearances > 0
+    last_seen[seen] = hit_sorteos[np.cumsum(appearances)[seen] - 1]
+    current_gap = current_sorteo - last_seen
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z_score = np.where(std_gap > 0, (current_gap - mean_gap) / std_gap, 0.0)
+
+    return GapResult(
+        total_balls=total_balls,
+        gaps=gaps,
+        gap_sorteos=gap_sorteos,
+        offsets=offsets,
+        appearances=appearances,
+        mean_gap=mean_gap,
+        std_gap=std_gap,
+        last_seen=last_seen,
+        current_gap=current_gap,
+        z_score=z_score,
+    )
+
+# -------------------------------------------------------------------
+# ESTABILIDAD TEMPORAL (VENTANAS MÓVILES CON SUMAS PREFIJAS)
+# -------------------------------------------------------------------
+
+@dataclass
+class RollingAudit:
+    """
+    Audit of every window of `window` consecutive draws, one row per window position.
+    """
+    window: int
+    stride: int
+    starts: np.ndarray
+    labels: np.ndarray
+    frequencies: np.ndarray
+    expected_freq: float
+    chi2_stat: np.ndarray
+    chi2_p_value: np.ndarray
+    sum_mean: np.ndarray
+    sum_var: np.ndarray
+
+    @property
+    def df_windows(self):
+        """
+        One row per window: last Sorteo, Chi-Square, p-value and sum moments.
+        """
+        return pd.DataFrame({
+            'Sorteo_Fin': self.labels,
+            'Chi2': self.chi2_stat,
+            'P_Value': self.chi2_p_value,
+            'Suma_Media': self.sum_mean,
+            'Suma_Varianza': self.sum_var,
+        })
+
+    def heatmap_frame(self, relative=True):
+        """
+        Ball x window matrix for a heatmap; relative=True shows observed / expected.
+        """
+        values = self.frequencies / self.expected_freq if relative else self.frequencies
+        return pd.DataFrame(values.T, index=np.arange(1, values.shape[1] + 1), columns=self.labels)
+
+def rolling_audit(draws, window=50, stride=1, total_balls=50, labels=None):
+    """
+    Chi-Square p-value, per-ball frequency and sum mean/variance for every window of
+    `window` draws at the given stride. Everything comes from cumulative sums over the
+    incidence matrix, so sweeping all window positions costs about one full pass.
+    """
+    incidence = None
+    if isinstance(draws, DrawStore):
+        incidence = draws.incidence
+        labels = draws.sorteos if labels is None else labels
+        draws = draws.draws
+    draws = np.asarray(draws)
+    n_draws, k = draws.shape
+    if incidence is None:
+        incidence = bitmask.draws_to_incidence(draws, total_balls)
+    total_balls = incidence.shape[1]
+    labels = np.arange(n_draws) if labels is None else np.asarray(labels)
+
+    starts = np.arange(0, max(n_draws - window + 1, 0), stride)
+    ends = starts + window
+
+    # 1. Prefix sums (leading zero row so that window = P[end] - P[start])
+    prefix = np.zeros((n_draws + 1, total_balls), dtype=np.int32)
+    np.cumsum(incidence, axis=0, out=prefix[1:])
+    frequencies = prefix[ends] - prefix[starts]
+
+    # 2. Chi-Square per window
+    expected_freq = window * k / total_balls
+    chi2_stat = ((frequencies - expected_freq) ** 2).sum(axis=1) / expected_freq
+    chi2_p_value = stats.chi2.sf(chi2_stat, total_balls - 1)
+
+    # 3. Sum moments per window (sample variance)
+    sums = draws.sum(axis=1, dtype=np.float64)
+    prefix_sum = np.concatenate([[0.0], np.cumsum(sums)])
+    prefix_sq = np.concatenate([[0.0], np.cumsum(sums ** 2)])
+    total = prefix_sum[ends] - prefix_sum[starts]
+    total_sq = prefix_sq[ends] - prefix_sq[starts]
+    sum_mean = total / window
+    sum_var = (total_sq - window * sum_mean ** 2) / (window - 1) if window > 1 else np.zeros(len(starts))
+
+    return RollingAudit(
+        window=window,
+        stride=stride,
+        starts=starts,
+        labels=labels[ends - 1] if len(ends) else labels[:0],
+        frequencies=frequencies,
+        expected_freq=expected_freq,
+        chi2_stat=chi2_stat,
+        chi2_p_value=chi2_p_value,
+        sum_mean=sum_mean,
+        sum_var=sum_var,
+    )
+
+# -------------------------------------------------------------------
+# ESTADO INCREMENTAL (ACTUALIZACIÓN POR SORTEO)
+# -------------------------------------------------------------------
+
+class AuditState:
+    """
+    Running audit state that advances one draw at a time in O(balls).
+
+    Holds the ball counts, last-seen Sorteo and Welford gap moments per ball, and a runs
+    accumulator: a histogram of sums plus, for every possible median threshold, how many
+    consecutive pairs cross it. That makes the runs test exact even though the median
+    moves with every draw.
+    """
+
+    def __init__(self, total_balls=50, balls_per_draw=6):
+        self.total_balls = total_balls
+        self.balls_per_draw = balls_per_draw
+        max_sum = sum(range(total_balls - balls_per_draw + 1, total_balls + 1))
+
+        self.n_draws = 0
+        self.last_sorteo = None
+        # Frequencies
+        self.counts = np.zeros(total_balls, dtype=np.int64)
+        # Gaps (Welford, in Sorteo ids)
+        self.last_seen = np.full(total_balls, np.nan)
+        self.gap_n = np.zeros(total_balls, dtype=np.int64)
+        self.gap_mean = np.zeros(total_balls)
+        self.gap_m2 = np.zeros(total_balls)
+        # Runs
+        self.last_sum = None
+        self.sum_hist = np.zeros(max_sum + 1, dtype=np.int64)
+        self.crossings = np.zeros(max_sum + 1, dtype=np.int64)
+
+    @classmethod
+    def from_draws(cls, draws, sorteos=None, total_balls=50):
+        """
+        Build the state for a whole history in one vectorized pass
+        (same result as calling update() draw by draw).
+        """
+        if isinstance(draws, DrawStore):
+            draws, sorteos = draws.draws, draws.sorteos if sorteos is None else sorteos
+        draws = np.asarray(draws)
+        n_draws, k = draws.shape
+        state = cls(total_balls, k)
+        if n_draws == 0:
+            return state
+
+        sorteos = np.arange(n_draws, dtype=float) if sorteos is None else np.asarray(sorteos, dtype=float)
+        incidence = np.zeros((n_draws, total_balls + 1), dtype=bool)
+        incidence[np.repeat(np.arange(n_draws), k), draws.ravel()] = True
+        gaps = compute_gaps(incidence[:, 1:], sorteos)
+
+        state.n_draws = n_draws
+        state.last_sorteo = float(sorteos[-1])
+        state.counts = gaps.appearances.astype(np.int64)
+        state.last_seen = gaps.last_seen
+        state.gap_n = np.diff(gaps.offsets).astype(np.int64)
+        state.gap_mean = np.nan_to_num(gaps.mean_gap)
+        state.gap_m2 = np.nan_to_num(gaps.std_gap ** 2 * state.gap_n)
+
+        sums = draws.sum(axis=1, dtype=np.int64)
+        state.last_sum = int(sums[-1])
+        state.sum_hist = np.bincount(sums, minlength=len(state.sum_hist)).astype(np.int64)
+        lo, hi = np.minimum(sums[:-1], sums[1:]), np.maximum(sums[:-1], sums[1:])
+        delta = np.bincount(lo, minlength=len(state.crossings) + 1) - np.bincount(hi, minlength=len(state.crossings) + 1)
+        state.crossings = np.cumsum(delta)[:len(state.crossings)].astype(np.int64)
+        return state
+
+    def update(self, draw, sorteo=None):
+        """
+        Advance the state with one new draw (iterable of balls). sorteo defaults to last + 1.
+        """
+        balls = np.asarray([n for n in draw if 1 <= n <= self.total_balls], dtype=np.int64)
+        idx = balls - 1
+        if sorteo is None:
+            sorteo = 0.0 if self.last_sorteo is None else self.last_sorteo + 1
+        sorteo = float(sorteo)
+
+        # 1. Frequencies
+        self.counts[idx] += 1
+
+        # 2. Gaps (Welford update for the balls that had been seen before)
+        seen = idx[~np.isnan(self.last_seen[idx])]
+        gap = sorteo - self.last_seen[seen]
+        self.gap_n[seen] += 1
+        delta = gap - self.gap_mean[seen]
+        self.gap_mean[seen] += delta / self.gap_n[seen]
+        self.gap_m2[seen] += delta * (gap - self.gap_mean[seen])
+        self.last_seen[idx] = sorteo
+
+        # 3. Runs accumulator
+        total = int(balls.sum())
+        if self.last_sum is not None:
+            lo, hi = sorted((self.last_sum, total))
+            self.crossings[lo:hi] += 1
+        self.sum_hist[total] += 1
+        self.last_sum = total
+
+        self.n_draws += 1
+        self.last_sorteo = sorteo
+        return self
+
+    # --- Same outputs as the batch functions in modules/analysis ---
+
+    def frequency_analysis(self):
+        """
+        Same as analysis.get_frequency_analysis on the full history.
+        """
+        seen = self.counts > 0
+        freqs = pd.Series(self.counts[seen], index=np.arange(1, self.total_balls + 1)[seen])
+        mean_freq = freqs.mean()
+        std_freq = freqs.std()
+
+        df_freq = pd.DataFrame({
+            'Numero': freqs.index.astype(str),
+            'Frecuencia': freqs.values,
+            'Media_Esperada': mean_freq
+        })
+        return df_freq, mean_freq, std_freq
+
+    def chi_square_test(self):
+        """
+        Same as analysis.get_chi_square_test on the full history.
+        """
+        expected_freq = np.full(self.total_balls, self.counts.sum() / self.total_balls)
+        chi2_stat, p_value = stats.chisquare(f_obs=self.counts, f_exp=expected_freq)
+        return chi2_stat, p_value, self.counts.tolist(), expected_freq
+
+    def gap_metrics(self, current_sorteo_max=None):
+        """
+        Same as analysis.get_gap_metrics on the full history.
+        """
+        current = self.last_sorteo if current_sorteo_max is None else current_sorteo_max
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std_gap = np.sqrt(self.gap_m2 / self.gap_n)
+            current_gap = current - self.last_seen
+            z_score = np.where(std_gap > 0, (current_gap - self.gap_mean) / std_gap, 0.0)
+
+        gap_result = GapResult(
+            total_balls=self.total_balls,
+            gaps=np.zeros(0),
+            gap_sorteos=np.zeros(0),
+            offsets=np.zeros(self.total_balls + 1, dtype=np.int64),
+            appearances=self.counts,
+            mean_gap=self.gap_mean,
+            std_gap=std_gap,
+            last_seen=self.last_seen,
+            current_gap=current_gap,
+            z_score=z_score,
+        )
+        df_gaps = gap_result.df_gaps
+        return df_gaps, df_gaps.loc[df_gaps['Z_Score'].idxmax()]
+
+    def runs_test(self):
+        """
+        Same as analysis.get_runs_test on the full history.
+        """
+        if self.n_draws == 0:
+            return 0, 1.0, 0, 0
+
+        # Median of the sums from the histogram
+        cumulative = np.cumsum(self.sum_hist)
+        lower = np.searchsorted(cumulative, (self.n_draws - 1) // 2 + 1)
+        upper = np.searchsorted(cumulative, self.n_draws // 2 + 1)
+        threshold = int(np.floor((lower + upper) / 2))
+
+        # Integer sums: "> median" is the same as "> floor(median)"
+        n1 = int(self.n_draws - cumulative[threshold])
+        n2 = self.n_draws - n1
+        runs = int(self.crossings[threshold]) + 1
+        return runs_statistics(n1, n2, runs)
+
+    # --- Serialization ---
+
+    def to_dict(self):
+        """
+        JSON-serializable snapshot of the state.
+        """
+        def clean(values):
+            return [None if np.isnan(v) else v for v in values.tolist()]
+
+        return {
+            'total_balls': self.total_balls,
+            'balls_per_draw': self.balls_per_draw,
+            'n_draws': self.n_draws,
+            'last_sorteo': self.last_sorteo,
+            'counts': self.counts.tolist(),
+            'last_seen': clean(self.last_seen),
+            'gap_n': self.gap_n.tolist(),
+            'gap_mean': self.gap_mean.tolist(),
+            'gap_m2': self.gap_m2.tolist(),
+            'last_sum': self.last_sum,
+            'sum_hist': self.sum_hist.tolist(),
+            'crossings': self.crossings.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls(data['total_balls'], data['balls_per_draw'])
+        state.n_draws = data['n_draws']
+        state.last_sorteo = data['last_sorteo']
+        state.last_sum = data['last_sum']
+        state.last_seen = np.array([np.nan if v is None else v for v in data['last_seen']], dtype=float)
+        for name in ['counts', 'gap_n', 'sum_hist', 'crossings']:
+            setattr(state, name, np.array(data[name], dtype=np.int64))
+        for name in ['gap_mean', 'gap_m2']:
+            setattr(state, name, np.array(data[name], dtype=float))
+        return state
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
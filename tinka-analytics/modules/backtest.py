@@ -0,0 +1,212 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from . import bitmask, etl, parallel, prizes, sampler
+from .store import DrawStore
+
+# -------------------------------------------------------------------
+# BACKTESTING HISTÓRICO (WALK-FORWARD)
+# -------------------------------------------------------------------
+# The real modern-era draws are replayed in order. Before draw t every strategy
+# picks its ticket from draws 0..t-1 only, and the ticket is priced against draw t
+# (main balls, boliyapa and "Sí o Sí" additional balls) with the prize engine.
+# The state each strategy needs (appearances, gap moments, last appearance) is a
+# running sum over the incidence matrix shifted by one draw, so the whole replay
+# costs one pass over the history instead of one full analysis per draw.
+
+BACKTEST_STRATEGIES = {
+    'hot': 'Calientes (Top Frecuencia)',
+    'cold': 'Fríos (Menor Frecuencia)',
+    'overdue': 'Más Atrasados (Z-Score de Retraso)',
+    'bayes': 'Bayesiano (Muestreo de Thompson)',
+    'random': 'Azar Puro',
+}
+
+@dataclass
+class WalkForwardState:
+    """
+    What was known before every draw t (row t only uses draws 0..t-1).
+    counts[t, n - 1]: appearances of ball n; z_scores[t, n - 1]: its gap Z-Score,
+    with the same definition as analysis.get_gap_metrics on the first t draws.
+    """
+    counts: np.ndarray
+    z_scores: np.ndarray
+
+def walk_forward_state(incidence, sorteos):
+    """
+    Appearances and gap Z-Scores of every ball before every draw, from cumulative sums.
+    """
+    incidence = np.asarray(incidence, dtype=bool)
+    sorteos = np.asarray(sorteos, dtype=float)
+    n_draws, total_balls = incidence.shape
+
+    def shifted(running):
+        # Row t = value after draw t - 1 (row 0: nothing seen yet)
+        return np.vstack([np.zeros((1, total_balls), dtype=running.dtype), running[:-1]])
+
+    # 1. Last appearance up to and including every draw (-inf = never seen)
+    last_seen = np.maximum.accumulate(np.where(incidence, sorteos[:, None], -np.inf), axis=0)
+    prev_seen = np.vstack([np.full((1, total_balls), -np.inf), last_seen[:-1]])
+
+    # 2. A hit of an already seen ball closes one gap; running moments of the gaps
+    closes_gap = incidence & np.isfinite(prev_seen)
+    gaps = np.where(closes_gap, sorteos[:, None] - prev_seen, 0.0)
+    n_gaps = shifted(np.cumsum(closes_gap, axis=0, dtype=np.int64))
+    sum_gaps = shifted(np.cumsum(gaps, axis=0))
+    sum_sq_gaps = shifted(np.cumsum(gaps ** 2, axis=0))
+
+    # 3. Gap Z-Score as seen from the last known draw (population std, as np.std)
+    counts = shifted(np.cumsum(incidence, axis=0, dtype=np.int64))
+    current = np.concatenate([[0.0], sorteos[:-1]])[:, None]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_gap = sum_gaps / n_gaps
+        std_gap = np.sqrt(np.maximum(sum_sq_gaps / n_gaps - mean_gap ** 2, 0.0))
+        z_scores = np.where((counts > 1) & (std_gap > 0), (current - shifted(last_seen) - mean_gap) / std_gap, 0.0)
+
+    return WalkForwardState(counts=counts, z_scores=z_scores)
+
+@dataclass
+class BacktestResult:
+    """
+    Replay of every strategy over the scored draws (one ticket per strategy and draw).
+    tickets[s, t] are the balls played; matches / boliyapa_hits / extra_hits / payouts
+    are (n_strategies x n_scored) arrays.
+    """
+    strategies: list
+    sorteos: np.ndarray
+    n_played: int
+    cost_per_draw: int
+    expected_hits: float
+    tickets: np.ndarray
+    matches: np.ndarray
+    boliyapa_hits: np.ndarray
+    extra_hits: np.ndarray
+    payouts: np.ndarray
+
+    @property
+    def labels(self):
+        return [BACKTEST_STRATEGIES[s] for s in self.strategies]
+
+    @property
+    def df_cumulative(self):
+        """
+        Long frame (Sorteo, Estrategia, Costo_Acumulado, Premio_Acumulado, Balance) for plotting.
+        """
+        n_scored = len(self.sorteos)
+        cost = self.cost_per_draw * np.arange(1, n_scored + 1)
+        prize = np.cumsum(self.payouts, axis=1)
+        return pd.DataFrame({
+            'Sorteo': np.tile(self.sorteos, len(self.strategies)),
+            'Estrategia': np.repeat(self.labels, n_scored),
+            'Costo_Acumulado': np.tile(cost, len(self.strategies)),
+            'Premio_Acumulado': prize.ravel(),
+            'Balance': (prize - cost).ravel(),
+        })
+
+    @property
+    def df_summary(self):
+        """
+        One row per strategy: cost, prizes, ROI, hits and worst drawdown of the balance.
+        """
+        n_scored = len(self.sorteos)
+        total_cost = self.cost_per_draw * n_scored
+        total_prize = self.payouts.sum(axis=1)
+        balance = np.cumsum(self.payouts - self.cost_per_draw, axis=1)
+        peak = np.maximum.accumulate(np.maximum(balance, 0), axis=1)
+        return pd.DataFrame({
+            'Estrategia': self.labels,
+            'Sorteos': n_scored,
+            'Costo_Total': total_cost,
+            'Premio_Total': total_prize,
+            'ROI': (total_prize - total_cost) / total_cost * 100 if total_cost else np.nan,
+            'Media_Aciertos': self.matches.mean(axis=1),
+            'Sorteos_Premiados': (self.payouts > 0).sum(axis=1),
+            'Aciertos_3_Mas': (self.matches >= 3).sum(axis=1),
+            'Con_Boliyapa': self.boliyapa_hits.sum(axis=1),
+            'Max_Caida': (peak - balance).max(axis=1) if n_scored else 0,
+        })
+
+def _top_balls(scores, n_played):
+    # n_played balls with the highest score per row (ties: lowest ball first), sorted
+    picks = np.argsort(-scores, axis=1, kind='stable')[:, :n_played] + 1
+    return np.sort(picks, axis=1)
+
+def strategy_tickets(state, strategy, n_played=6, rng=None, prior_strength=50.0, k=6):
+    """
+    (n_draws x n_played) tickets of one strategy from the walk-forward state.
+    hot / cold / overdue reproduce tournament.strategy_tickets on the first t draws.
+    """
+    n_draws, total_balls = state.counts.shape
+    if strategy == 'hot':
+        return _top_balls(state.counts, n_played)
+    if strategy == 'cold':
+        return _top_balls(-state.counts, n_played)
+    if strategy == 'overdue':
+        return _top_balls(state.z_scores, n_played)
+    if strategy == 'bayes':
+        # Thompson sampling: one draw from every ball's Beta-Binomial posterior (see bayes.py)
+        p0 = k / total_balls
+        seen = np.arange(n_draws)[:, None]
+        theta = rng.beta(prior_strength * p0 + state.counts, prior_strength * (1 - p0) + seen - state.counts)
+        return _top_balls(theta, n_played)
+    if strategy == 'random':
+        return np.sort(sampler.sample_draws(rng, n_draws, n_played, total_balls).astype(np.int64), axis=1)
+    raise ValueError(f"Estrategia desconocida: {strategy}")
+
+def run_backtest(df_draws, strategies=None, n_played=6, min_history=30, prior_strength=50.0, seed=None,
+                 total_balls=50):
+    """
+    Walk-forward replay of the modern-era draws (df_draws from etl.load_data / load_draws,
+    or a DrawStore).
+    Strategies start betting once min_history draws are known; each one plays a bet of
+    n_played numbers per draw at the price and prizes of the prize engine.
+    """
+    strategies = list(strategies or BACKTEST_STRATEGIES.keys())
+    unknown = [s for s in strategies if s not in BACKTEST_STRATEGIES]
+    if unknown:
+        raise ValueError(f"Estrategias desconocidas: {', '.join(map(str, unknown))}. "
+                         f"Opciones válidas: {', '.join(BACKTEST_STRATEGIES)}.")
+    engine = prizes.get_prize_engine()
+    if not engine.min_played <= n_played <= engine.max_played:
+        raise ValueError(f"Se debe jugar entre {engine.min_played} y {engine.max_played} números.")
+
+    # 1. Real draws: main balls, boliyapa and additional balls
+    if isinstance(df_draws, DrawStore):
+        draws, boliyapa, extra_balls = np.asarray(df_draws.draws), np.asarray(df_draws.boliyapa), np.asarray(df_draws.extra_balls)
+        sorteos = np.asarray(df_draws.sorteos, dtype=float)
+    else:
+        draws = etl.parse_bolillas(df_draws['Bolillas'], total_balls=total_balls)
+        boliyapa, extra_balls = etl.parse_extra_balls(df_draws, total_balls)
+        sorteos = pd.to_numeric(df_draws['Sorteo'], errors='coerce').to_numpy(dtype=float)
+    if len(draws) <= min_history:
+        raise ValueError(f"Se necesitan más de {min_history} sorteos para el backtesting.")
+
+    # 2. Walk-forward state and every strategy's ticket for every draw
+    state = walk_forward_state(bitmask.draws_to_incidence(draws, total_balls), sorteos)
+    rngs = dict(zip(BACKTEST_STRATEGIES, (np.random.default_rng(s) for s in parallel.spawn_seeds(seed, len(BACKTEST_STRATEGIES)))))
+    scored = slice(min_history, None)
+    tickets = np.stack([strategy_tickets(state, s, n_played, rngs[s], prior_strength)[scored] for s in strategies])
+
+    # 3. Outcomes against the real draws, priced with one gather
+    ticket_masks = bitmask.draws_to_masks(tickets.reshape(-1, n_played)).reshape(len(strategies), -1)
+    main_masks = bitmask.draws_to_masks(draws[scored])
+    boliyapa_masks = bitmask.draws_to_masks(boliyapa[scored, None])
+    extra_masks = bitmask.draws_to_masks(extra_balls[scored])
+    matches = bitmask.popcount(ticket_masks & main_masks)
+    boliyapa_hits = ((ticket_masks & boliyapa_masks) != 0).astype(np.int64)
+    extra_hits = bitmask.popcount(ticket_masks & extra_masks)
+
+    return BacktestResult(
+        strategies=strategies,
+        sorteos=sorteos[scored],
+        n_played=n_played,
+        cost_per_draw=int(engine.cost(n_played)),
+        expected_hits=n_played * draws.shape[1] / total_balls,
+        tickets=tickets,
+        matches=matches,
+        boliyapa_hits=boliyapa_hits,
+        extra_hits=extra_hits,
+        payouts=engine.payout(n_played, matches, boliyapa_hits, extra_hits),
+    )
@@ -0,0 +1,125 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from scipy import special
+
+from .store import DrawStore
+
+# -------------------------------------------------------------------
+# INFERENCIA BAYESIANA CONJUGADA (BETA-BINOMIAL)
+# -------------------------------------------------------------------
+# Each ball n has an unknown per-draw inclusion probability theta_n. With a
+# Beta(a0, b0) prior centered on k / N and c_t appearances after t draws, the
+# posterior is Beta(a0 + c_t, b0 + t - c_t). The whole trajectory is therefore a
+# cumulative sum of the incidence matrix, with no loop over draws or balls.
+
+@dataclass
+class PosteriorTrajectory:
+    """
+    Posterior mean and equal-tailed credible interval of every ball after every
+    stride-th draw. Arrays are (n_points x total_balls); position 0 = ball 1.
+    """
+    prior_mean: float
+    prior_strength: float
+    credible: float
+    steps: np.ndarray
+    sorteos: np.ndarray
+    counts: np.ndarray
+    mean: np.ndarray
+    lower: np.ndarray
+    upper: np.ndarray
+
+    @property
+    def total_balls(self):
+        return self.mean.shape[1]
+
+    @property
+    def df_final(self):
+        """
+        Posterior after the last draw, one row per ball.
+        """
+        t = self.steps[-1]
+        counts = self.counts[-1]
+        p0 = self.prior_mean
+        with np.errstate(invalid='ignore', divide='ignore'):
+            z = np.where(t > 0, (counts - t * p0) / np.sqrt(t * p0 * (1 - p0)), 0.0)
+        return pd.DataFrame({
+            'Numero': np.arange(1, self.total_balls + 1),
+            'Apariciones': counts,
+            'Prior': p0,
+            'Posterior': self.mean[-1],
+            'IC_Bajo': self.lower[-1],
+            'IC_Alto': self.upper[-1],
+            'Z_Score_Evidencia': z,
+        })
+
+    def frame(self, balls=None):
+        """
+        Long-format trajectory (Sorteo, Numero, Posterior, IC_Bajo, IC_Alto) for plotting.
+        balls: iterable of ball numbers to keep (default: all).
+        """
+        balls = np.arange(1, self.total_balls + 1) if balls is None else np.asarray(list(balls), dtype=int)
+        cols = balls - 1
+        n_points = len(self.steps)
+        return pd.DataFrame({
+            'Sorteo': np.repeat(self.sorteos, len(balls)),
+            'Paso': np.repeat(self.steps, len(balls)),
+            'Numero': np.tile(balls, n_points),
+            'Posterior': self.mean[:, cols].ravel(),
+            'IC_Bajo': self.lower[:, cols].ravel(),
+            'IC_Alto': self.upper[:, cols].ravel(),
+        })
+
+def posterior_trajectory(incidence, sorteos=None, prior_strength=50.0, credible=0.95, stride=1, k=None):
+    """
+    Beta-Binomial posterior of every ball along the whole history.
+
+    incidence: chronological (n_draws x total_balls) boolean matrix, or a DrawStore.
+    prior_strength: a0 + b0, the prior's weight in equivalent draws.
+    stride: keep one point every `stride` draws (the last draw is always kept);
+            the credible interval is only evaluated on the kept points.
+    k: balls per draw (default: the most common row sum of the incidence matrix).
+    """
+    if isinstance(incidence, DrawStore):
+        incidence, sorteos = incidence.incidence, incidence.sorteos
+    incidence = np.asarray(incidence, dtype=bool)
+    n_draws, total_balls = incidence.shape
+    if sorteos is None:
+        sorteos = np.arange(1, n_draws + 1)
+    sorteos = np.asarray(sorteos)
+
+    if k is None:
+        row_sums = incidence.sum(axis=1)
+        k = int(np.bincount(row_sums).argmax()) if n_draws else 6
+    p0 = k / total_balls
+    a0, b0 = prior_strength * p0, prior_strength * (1 - p0)
+
+    # 1. Cumulative appearances at the kept points (rows = draws seen so far)
+    points = np.arange(stride - 1, n_draws, stride)
+    if n_draws and (len(points) == 0 or points[-1] != n_draws - 1):
+        points = np.append(points, n_draws - 1)
+    counts = np.cumsum(incidence, axis=0, dtype=np.int64)[points]
+    steps = points + 1
+
+    # 2. Conjugate update and posterior moments
+    a = a0 + counts
+    b = b0 + steps[:, None] - counts
+    mean = a / (a + b)
+
+    # 3. Equal-tailed credible interval from the inverse regularized incomplete beta
+    tail = (1 - credible) / 2
+    lower = special.betaincinv(a, b, tail)
+    upper = special.betaincinv(a, b, 1 - tail)
+
+    return PosteriorTrajectory(
+        prior_mean=p0,
+        prior_strength=prior_strength,
+        credible=credible,
+        steps=steps,
+        sorteos=sorteos[points],
+        counts=counts,
+        mean=mean,
+        lower=lower,
+        upper=upper,
+    )
@@ -0,0 +1,101 @@
+import numpy as np
+
+TOTAL_BALLS = 50
+
+# -------------------------------------------------------------------
+# REPRESENTACIÓN COMPACTA (BITMASK / INCIDENCIA)
+# -------------------------------------------------------------------
+# Ball n is stored in bit (n - 1) of a uint64, so any game with up to 64 balls fits.
+
+_ONE = np.uint64(1)
+
+def popcount(x, dtype=np.int64):
+    """
+    Number of set bits of every element of a uint64 array.
+    dtype=np.uint8 avoids widening large match matrices.
+    """
+    x = np.asarray(x, dtype=np.uint64)
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(x).astype(dtype, copy=False)
+
+    # SWAR fallback for NumPy < 2.0
+    x = x - ((x >> _ONE) & np.uint64(0x5555555555555555))
+    x = (x & np.uint64(0x3333333333333333)) + ((x >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    x = (x + (x >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return ((x * np.uint64(0x0101010101010101)) >> np.uint64(56)).astype(dtype)
+
+def numbers_to_mask(numbers):
+    """
+    Bitmask of a single ticket or draw (iterable of balls 1..64).
+    """
+    nums = np.asarray(list(numbers), dtype=np.uint64)
+    if nums.size == 0:
+        return np.uint64(0)
+    return np.bitwise_or.reduce(_ONE << (nums - _ONE))
+
+def draws_to_masks(draws):
+    """
+    One uint64 bitmask per draw from an (n_draws x k) matrix (0 = missing ball).
+    """
+    draws = np.asarray(draws)
+    if draws.ndim != 2 or draws.shape[0] == 0:
+        return np.zeros(len(draws), dtype=np.uint64)
+
+    bits = np.where(draws > 0, _ONE << (np.maximum(draws, 1).astype(np.uint64) - _ONE), np.uint64(0))
+    return np.bitwise_or.reduce(bits, axis=1)
+
+def mask_to_numbers(mask, total_balls=TOTAL_BALLS):
+    """
+    Sorted balls contained in a single bitmask.
+    """
+    balls = np.arange(1, total_balls + 1)
+    return balls[(np.uint64(mask) >> (balls.astype(np.uint64) - _ONE)) & _ONE == 1]
+
+def masks_to_incidence(masks, total_balls=TOTAL_BALLS):
+    """
+    Boolean (n_draws x total_balls) incidence matrix: [i, n - 1] is True if ball n came out in draw i.
+    """
+    masks = np.asarray(masks, dtype=np.uint64)
+    shifts = np.arange(total_balls, dtype=np.uint64)
+    return ((masks[:, None] >> shifts) & _ONE).astype(bool)
+
+def draws_to_incidence(draws, total_balls=TOTAL_BALLS):
+    """
+    Boolean incidence matrix built directly from an (n_draws x k) draws matrix.
+    """
+    draws = np.asarray(draws)
+    incidence = np.zeros((len(draws), total_balls + 1), dtype=bool)
+    rows = np.repeat(np.arange(len(draws)), draws.shape[1] if draws.ndim == 2 else 0)
+    incidence[rows, draws.ravel()] = True
+    # Column 0 collects missing balls
+    return incidence[:, 1:]
+
+def pack_incidence(incidence):
+    """
+    Bit-packed incidence matrix (n_draws x ceil(total_balls / 8) uint8).
+    """
+    return np.packbits(incidence, axis=1)
+
+def unpack_incidence(packed, total_balls=TOTAL_BALLS):
+    """
+    Inverse of pack_incidence.
+    """
+    return np.unpackbits(packed, axis=1, count=total_balls).astype(bool)
+
+def count_matches(masks, ticket_mask):
+    """
+    Balls in common between every draw and a ticket (popcount of the intersection).
+    """
+    return popcount(np.asarray(masks, dtype=np.uint64) & np.uint64(ticket_mask))
+
+def contains(masks, number):
+    """
+    Membership of a ball in every draw, as a boolean array.
+    """
+    return (np.asarray(masks, dtype=np.uint64) >> np.uint64(number - 1)) & _ONE == 1
+
+def ball_frequencies(masks, total_balls=TOTAL_BALLS):
+    """
+    Times each ball 1..total_balls appears across the draws.
+    """
+    return masks_to_incidence(masks, total_balls).sum(axis=0)
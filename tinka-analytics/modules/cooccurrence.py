@@ -0,0 +1,169 @@
+import os
+import glob
+from dataclasses import dataclass
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+from scipy.special import comb
+
+from . import bitmask, etl
+from .store import DrawStore
+
+# -------------------------------------------------------------------
+# CO-OCURRENCIA DE PARES Y TRÍOS
+# -------------------------------------------------------------------
+# Under a fair draw of k balls out of N, any given pair appears in a draw with
+# probability k(k-1) / (N(N-1)) and any triplet with k(k-1)(k-2) / (N(N-1)(N-2)),
+# so each cell count is Binomial(n_draws, p).
+# The cells are not independent (every draw adds exactly C(k, 2) pairs, and pairs
+# sharing a ball are correlated), so the global pair Chi-Square does not follow a
+# Chi-Square with C(N, 2) - 1 degrees of freedom: its p-value is calibrated against
+# simulated null histories in nulls.run_null_audit instead.
+
+@dataclass
+class CooccurrenceResult:
+    """
+    Pair and triplet counts with their expected value and Z-Score under a fair draw.
+    pair_chi2 is the global pair statistic (its p-value comes from nulls.run_null_audit).
+    pair_* are (N x N) matrices (diagonal = single-ball frequency); triplet_* are flat
+    arrays in colex order, decoded by `triplets`.
+    """
+    n_draws: int
+    total_balls: int
+    pair_counts: np.ndarray
+    pair_expected: float
+    pair_z: np.ndarray
+    pair_chi2: float
+    triplets: np.ndarray
+    triplet_counts: np.ndarray
+    triplet_expected: float
+    triplet_z: np.ndarray
+
+    def top_pairs(self, n=10):
+        """
+        Most over-represented pairs.
+        """
+        i, j = np.triu_indices(self.total_balls, k=1)
+        order = np.argsort(-self.pair_z[i, j], kind='stable')[:n]
+        return pd.DataFrame({
+            'Par': [f"{a + 1}-{b + 1}" for a, b in zip(i[order], j[order])],
+            'Observado': self.pair_counts[i[order], j[order]],
+            'Esperado': self.pair_expected,
+            'Z_Score': self.pair_z[i[order], j[order]],
+        })
+
+    def top_triplets(self, n=10):
+        """
+        Most over-represented triplets.
+        """
+        order = np.argsort(-self.triplet_z, kind='stable')[:n]
+        return pd.DataFrame({
+            'Trio': ['-'.join(str(b) for b in t) for t in self.triplets[order]],
+            'Observado': self.triplet_counts[order],
+            'Esperado': self.triplet_expected,
+            'Z_Score': self.triplet_z[order],
+        })
+
+def triplet_table(total_balls=50):
+    """
+    All triplets (1-based, a < b < c) indexed by their colex rank.
+    """
+    table = np.array(list(combinations(range(total_balls), 3)), dtype=np.int64)
+    ranks = triplet_rank(table)
+    ordered = np.empty_like(table)
+    ordered[ranks] = table
+    return ordered + 1
+
+def triplet_rank(triplets):
+    """
+    Colex rank of 0-based sorted triplets (a < b < c): C(c, 3) + C(b, 2) + C(a, 1).
+    """
+    a, b, c = triplets[..., 0], triplets[..., 1], triplets[..., 2]
+    return c * (c - 1) * (c - 2) // 6 + b * (b - 1) // 2 + a
+
+def compute_cooccurrence(draws, total_balls=50):
+    """
+    Pair counts from a single incidence-matrix product and triplet counts from the
+    C(k, 3) triplets of every draw, ranked and counted with one bincount.
+    """
+    incidence = None
+    if isinstance(draws, DrawStore):
+        incidence, draws = draws.incidence, draws.draws
+    draws = np.asarray(draws)
+    n_draws, k = draws.shape
+    if incidence is None:
+        incidence = bitmask.draws_to_incidence(draws, total_balls)
+
+    # 1. Pairs: X^T X
+    x = np.asarray(incidence, dtype=np.float32)
+    pair_counts = np.rint(x.T @ x).astype(np.int64)
+
+    # 2. Triplets: rank the C(k, 3) sorted triplets of each draw
+    n_triplets = int(comb(total_balls, 3, exact=True))
+    ordered = np.sort(draws.astype(np.int64), axis=1) - 1
+    cols = np.array(list(combinations(range(k), 3)))
+    draw_triplets = ordered[:, cols]
+    valid = (draw_triplets >= 0).all(axis=2)
+    triplet_counts = np.bincount(triplet_rank(draw_triplets)[valid], minlength=n_triplets)
+
+    return _from_counts(n_draws, k, total_balls, pair_counts, triplet_counts)
+
+def _from_counts(n_draws, k, total_balls, pair_counts, triplet_counts):
+    # Expected counts, Z-Scores and Chi-Square from the raw counts (no pass over the draws)
+    p_pair = k * (k - 1) / (total_balls * (total_balls - 1))
+    pair_expected = n_draws * p_pair
+    with np.errstate(invalid='ignore', divide='ignore'):
+        pair_z = (pair_counts - pair_expected) / np.sqrt(pair_expected * (1 - p_pair))
+    np.fill_diagonal(pair_z, 0.0)
+    iu = np.triu_indices(total_balls, k=1)
+    pair_chi2 = float(((pair_counts[iu] - pair_expected) ** 2).sum() / pair_expected) if pair_expected > 0 else 0.0
+
+    p_triplet = k * (k - 1) * (k - 2) / (total_balls * (total_balls - 1) * (total_balls - 2))
+    triplet_expected = n_draws * p_triplet
+    with np.errstate(invalid='ignore', divide='ignore'):
+        triplet_z = (triplet_counts - triplet_expected) / np.sqrt(triplet_expected * (1 - p_triplet))
+
+    return CooccurrenceResult(
+        n_draws=n_draws,
+        total_balls=total_balls,
+        pair_counts=pair_counts,
+        pair_expected=pair_expected,
+        pair_z=pair_z,
+        pair_chi2=pair_chi2,
+        triplets=triplet_table(total_balls),
+        triplet_counts=triplet_counts,
+        triplet_expected=triplet_expected,
+        triplet_z=triplet_z,
+    )
+
+def load_cooccurrence(filepath="data/tinka_data.csv", cache_dir=None):
+    """
+    Co-occurrence for the current dataset, cached on disk per dataset version.
+    Returns None if the data is unavailable.
+    """
+    draw_store = etl.open_draw_store(filepath, cache_dir)
+    if draw_store is None:
+        return None
+
+    cache_folder = os.path.dirname(etl.get_cache_paths(filepath, cache_dir)[0])
+    cache_path = os.path.join(cache_folder, f"cooccurrence_{draw_store.version}.npz")
+
+    if os.path.exists(cache_path):
+        with np.load(cache_path, allow_pickle=False) as cached:
+            pair_counts, triplet_counts = cached['pair_counts'], cached['triplet_counts']
+        return _from_counts(len(draw_store), draw_store.draws.shape[1], draw_store.total_balls,
+                            pair_counts, triplet_counts)
+
+    result = compute_cooccurrence(draw_store)
+    try:
+        for stale in glob.glob(os.path.join(cache_folder, "cooccurrence_*.npz")):
+            os.remove(stale)
+        tmp_path = cache_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, pair_counts=result.pair_counts, triplet_counts=result.triplet_counts)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
+
+    return result
@@ -1,51 +1,465 @@
+import io
+import os
+import json
+import hashlib
 import pandas as pd
 import numpy as np
 
-def load_data(filepath="data/tinka_data.csv"):
+from . import bitmask, store
+
+# Rules changed ~Oct 2022 to 50 balls
+MODERN_ERA_START = '2022-10-01'
+BALLS_PER_DRAW = 6
+TOTAL_BALLS = 50
+
+# Bump whenever the cached layout or the cleaning rules change
+CACHE_VERSION = 2
+# Appended segments kept before compacting the cache into a single file
+MAX_CACHE_SEGMENTS = 32
+
+def parse_dates(fechas):
     """
-    Load and clean the Tinka dataset.
-    Returns a tuple: (df_draws, df_exploded)
+    Parse the whole 'Fecha' column at once (dd/mm/YYYY).
+    Only the rows that don't match the format go through pandas' inference.
+    """
+    fechas = fechas.astype(str).str.strip()
+    parsed = pd.to_datetime(fechas, format='%d/%m/%Y', errors='coerce')
+
+    missing = parsed.isna()
+    if missing.any():
+        parsed[missing] = pd.to_datetime(fechas[missing], format='mixed', errors='coerce')
+
+    return parsed
+
+def parse_bolillas(bolillas, balls_per_draw=BALLS_PER_DRAW, total_balls=TOTAL_BALLS):
+    """
+    Split the 'Bolillas' column in bulk into an (n_draws x balls_per_draw) int8 matrix.
+    Missing or invalid tokens are stored as 0.
+    """
+    tokens = bolillas.astype(str).str.split(expand=True).reindex(columns=range(balls_per_draw))
+    nums = tokens.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+
+    valid = (nums >= 1) & (nums <= total_balls)
+    return np.where(valid, nums, 0).astype(np.int8)
+
+def parse_extra_balls(df_draws, total_balls=TOTAL_BALLS):
+    """
+    Boliyapa ('YAPA') and "Sí o Sí" additional balls ('Adicionales') of every draw.
+    Returns (boliyapa, extra_balls): an (n_draws,) int8 array and an (n_draws x max_extra)
+    int8 matrix, aligned with the draws frame; 0 = missing ball (e.g. no promotion).
+    """
+    n_draws = len(df_draws)
+    if 'YAPA' in df_draws:
+        boliyapa = parse_bolillas(df_draws['YAPA'], 1, total_balls)[:, 0]
+    else:
+        boliyapa = np.zeros(n_draws, dtype=np.int8)
+
+    if 'Adicionales' not in df_draws or n_draws == 0:
+        return boliyapa, np.zeros((n_draws, 0), dtype=np.int8)
+    extras = df_draws['Adicionales'].fillna('').astype(str)
+    max_extra = int(extras.str.split().str.len().max())
+    return boliyapa, parse_bolillas(extras, max_extra, total_balls)
+
+def build_modern_draws(df):
+    """
+    Turn the raw CSV frame into the modern-era draws frame and its draws matrix.
+    Rows are in chronological order and the matrix is aligned row-by-row with the frame.
+    """
+    df = df.copy()
+
+    # 1. Date Parsing (single vectorized pass)
+    df['Fecha_dt'] = parse_dates(df['Fecha'])
+
+    # 2. Filter Modern Era and sort chronologically (canonical order)
+    df_modern = df[df['Fecha_dt'] >= MODERN_ERA_START]
+    df_modern = df_modern.sort_values(by=['Fecha_dt', 'Sorteo'], kind='stable').reset_index(drop=True)
+
+    # 3. Clean 'Bolillas' string
+    draws = parse_bolillas(df_modern['Bolillas'])
+
+    return add_draw_features(df_modern, draws), draws
+
+def add_draw_features(df_modern, draws):
+    """
+    Feature Engineering on Draws (derived from the matrix).
+    """
+    df_modern['Bolillas_Clean'] = df_modern['Bolillas'].astype(str).str.split()
+
+    drawn = draws > 0
+    evens = drawn & (draws % 2 == 0)
+    df_modern['Suma'] = draws.sum(axis=1, dtype=np.int64)
+    df_modern['Pares'] = evens.sum(axis=1)
+    df_modern['Impares'] = drawn.sum(axis=1) - df_modern['Pares']
+    # One uint64 per draw (bit n-1 set if ball n came out)
+    df_modern['Mask'] = bitmask.draws_to_masks(draws)
+
+    return df_modern
+
+def explode_draws(df_draws, draws):
+    """
+    Number-level frame: one row per drawn ball, built straight from the draws matrix.
+    """
+    base = df_draws.drop(columns=['Bolillas_Clean', 'Mask'], errors='ignore')
+    df_exploded = base.loc[base.index.repeat(draws.shape[1])]
+
+    nums = draws.ravel()
+    df_exploded = df_exploded.assign(Numero=nums.astype(int))
+    df_exploded = df_exploded[nums > 0]
+
+    return df_exploded
+
+# -------------------------------------------------------------------
+# CACHE EN DISCO (COLUMNAR)
+# -------------------------------------------------------------------
+
+class HistoryConflictError(ValueError):
+    """
+    Raised when rows that are already cached were edited, deleted or reordered in the CSV.
+    """
+
+def get_cache_paths(filepath, cache_dir=None):
+    """
+    Returns (data_path, manifest_path) of the on-disk cache for a given CSV.
+    By default the cache lives in a 'cache' folder next to the CSV.
+    """
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(filepath)), 'cache')
+    stem = os.path.splitext(os.path.basename(filepath))[0]
+    return os.path.join(cache_dir, f"{stem}.npz"), os.path.join(cache_dir, f"{stem}.json")
+
+def file_sha256(filepath, chunk_size=1 << 20):
+    """
+    Content hash of a file, read in chunks.
+    """
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def fingerprint_csv(raw):
+    """
+    Hashes of the raw CSV bytes: whole file, header line and body.
+    The body hash is what lets a refresh prove that the cached rows are untouched.
+    """
+    header, _, body = raw.partition(b'\n')
+    return {
+        'sha256': hashlib.sha256(raw).hexdigest(),
+        'header_sha256': hashlib.sha256(header).hexdigest(),
+        'body_size': len(body),
+        'body_sha256': hashlib.sha256(body).hexdigest(),
+    }
+
+def _read_manifest(manifest_path):
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_manifest(manifest_path, manifest):
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+def save_draws_cache(df_draws, draws, data_path):
+    """
+    Store the cleaned draws as one binary array per column (numpy .npz, no pickles).
+    Derived features are not stored; they are rebuilt from the draws matrix on load.
+    """
+    derived = ['Bolillas_Clean', 'Suma', 'Pares', 'Impares', 'Mask']
+    base = df_draws.drop(columns=derived, errors='ignore')
+
+    arrays = {'columns': np.array(base.columns, dtype=str), 'draws': draws}
+    for col in base.columns:
+        values = base[col]
+        if values.dtype.kind in 'biufM':
+            arrays[f"col:{col}"] = values.to_numpy()
+        else:
+            if values.isna().any():
+                arrays[f"na:{col}"] = values.isna().to_numpy()
+            arrays[f"col:{col}"] = values.fillna('').astype(str).to_numpy(dtype=str)
+
+    tmp_path = data_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, data_path)
+
+def _read_cache_segment(data_path):
+    with np.load(data_path, allow_pickle=False) as cache:
+        draws = cache['draws']
+        columns = {}
+        for col in cache['columns'].tolist():
+            values = pd.Series(cache[f"col:{col}"])
+            if f"na:{col}" in cache.files:
+                values = values.mask(cache[f"na:{col}"])
+            columns[col] = values
+
+    return pd.DataFrame(columns), draws
+
+def read_draws_cache(data_paths):
+    """
+    Load a cache written by save_draws_cache (a single file or a list of appended segments).
+    Returns a tuple: (df_draws, draws)
+    """
+    if isinstance(data_paths, str):
+        data_paths = [data_paths]
+
+    segments = [_read_cache_segment(path) for path in data_paths]
+    df_draws = pd.concat([seg[0] for seg in segments], ignore_index=True)
+    draws = np.concatenate([seg[1] for seg in segments])
+
+    return add_draw_features(df_draws, draws), draws
+
+def _cache_is_fresh(manifest, stat, sha256=None):
+    if manifest is None or manifest.get('version') != CACHE_VERSION:
+        return False
+    if sha256 is not None:
+        return manifest.get('sha256') == sha256
+    return manifest.get('size') == stat.st_size and manifest.get('mtime_ns') == stat.st_mtime_ns
+
+def _segment_paths(manifest, data_path):
+    cache_dir = os.path.dirname(data_path)
+    return [os.path.join(cache_dir, name) for name in manifest.get('segments', [])]
+
+def _split_new_rows(raw, manifest):
+    """
+    Returns the raw bytes of the rows added since the cached version of the CSV,
+    or None if the cached rows are no longer intact.
+    """
+    header, _, body = raw.partition(b'\n')
+    if hashlib.sha256(header).hexdigest() != manifest['header_sha256']:
+        return None
+
+    old_size = manifest['body_size']
+    extra = len(body) - old_size
+    if extra < 0:
+        return None
+
+    def intact(chunk):
+        return hashlib.sha256(chunk).hexdigest() == manifest['body_sha256']
+
+    # New draws are published at the top of the file...
+    if (extra == 0 or body[extra - 1:extra] == b'\n') and intact(body[extra:]):
+        return body[:extra]
+    # ...but plain appends at the bottom are accepted too
+    if (old_size == 0 or body[old_size - 1:old_size] == b'\n') and intact(body[:old_size]):
+        return body[old_size:]
+
+    return None
+
+def _parse_new_rows(raw, new_rows, manifest):
+    header = raw.partition(b'\n')[0]
+    if not new_rows.strip():
+        return pd.DataFrame(), np.zeros((0, BALLS_PER_DRAW), dtype=np.int8)
+
+    df_new = pd.read_csv(io.BytesIO(header + b'\n' + new_rows), encoding='latin1')
+
+    # New rows must be strictly newer than anything cached (no re-issued ids)
+    last_sorteo = manifest.get('last_sorteo')
+    sorteos = pd.to_numeric(df_new['Sorteo'], errors='coerce')
+    if sorteos.duplicated().any() or (last_sorteo is not None and (sorteos <= last_sorteo).any()):
+        raise HistoryConflictError("New rows reuse Sorteo ids that are already in the cache.")
+
+    return build_modern_draws(df_new)
+
+def _build_manifest(stat, fingerprint, segments, df_draws, draws):
+    last_sorteo = pd.to_numeric(df_draws['Sorteo'], errors='coerce').max() if len(df_draws) else None
+    return {
+        'version': CACHE_VERSION,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        **fingerprint,
+        'segments': segments,
+        'n_draws': int(len(draws)),
+        'last_sorteo': None if pd.isna(last_sorteo) else int(last_sorteo),
+    }
+
+def get_store_dir(filepath="data/tinka_data.csv", cache_dir=None):
+    """
+    Folder of the memory-mapped draw store published by the ETL.
     """
+    data_path, _ = get_cache_paths(filepath, cache_dir)
+    return os.path.join(os.path.dirname(data_path), 'store')
+
+def ingest_new_draws(filepath="data/tinka_data.csv", cache_dir=None, on_conflict='raise'):
+    """
+    Incremental ingest: parse only the rows added since the cached version of the CSV
+    and append them to the cache as a new segment, then publish the shared draw store.
+    Returns a tuple: (df_draws, draws, n_new)
+
+    If cached rows were edited, on_conflict='raise' raises HistoryConflictError and
+    on_conflict='rebuild' repairs the cache with a full rebuild.
+    """
+    df_draws, draws, n_new = _update_cache(filepath, cache_dir, on_conflict)
+
+    if len(draws):
+        version = get_dataset_version(filepath, cache_dir)
+        store_dir = get_store_dir(filepath, cache_dir)
+        if store.get_store_version(store_dir) != version:
+            _publish_store(store_dir, version, df_draws, draws)
+
+    return df_draws, draws, n_new
+
+def _publish_store(store_dir, version, df_draws, draws):
+    # The store is an accelerator: failing to write it never breaks the ingest
+    boliyapa, extra_balls = parse_extra_balls(df_draws)
     try:
-        df = pd.read_csv(filepath, encoding='latin1')
+        store.write_store(store_dir, version, df_draws, draws, boliyapa=boliyapa, extra_balls=extra_balls)
+    except OSError:
+        pass
+
+def _update_cache(filepath, cache_dir, on_conflict):
+    empty = pd.DataFrame(), np.zeros((0, BALLS_PER_DRAW), dtype=np.int8), 0
+
+    try:
+        stat = os.stat(filepath)
     except FileNotFoundError:
-        return pd.DataFrame(), pd.DataFrame()
+        return empty
+
+    data_path, manifest_path = get_cache_paths(filepath, cache_dir)
+    manifest = _read_manifest(manifest_path)
+    segment_paths = _segment_paths(manifest, data_path) if manifest else []
+    cache_ok = bool(segment_paths) and all(os.path.exists(path) for path in segment_paths)
+
+    # 1. Fast path: size and mtime unchanged
+    if cache_ok and _cache_is_fresh(manifest, stat):
+        return (*read_draws_cache(segment_paths), 0)
 
-    # 1. Date Parsing (Robust)
-    def parse_dates_robust(date_str):
+    with open(filepath, 'rb') as f:
+        raw = f.read()
+    fingerprint = fingerprint_csv(raw)
+
+    # 2. File touched but content identical: refresh the manifest only
+    if cache_ok and _cache_is_fresh(manifest, stat, fingerprint['sha256']):
+        manifest.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
         try:
-            return pd.to_datetime(date_str, format='%d/%m/%Y')
-        except:
-            return pd.to_datetime(date_str, errors='coerce')
-
-    df['Fecha_dt'] = df['Fecha'].apply(parse_dates_robust)
-    
-    # 2. Filter Modern Era (Rules changed ~Oct 2022 to 50 balls)
-    df_modern = df[df['Fecha_dt'] >= '2022-10-01'].copy()
-    
-    # 3. Clean 'Bolillas' string
-    # Remove extra spaces and split
-    df_modern['Bolillas_Clean'] = df_modern['Bolillas'].astype(str).str.strip().str.replace('  ', ' ').str.split(' ')
-    
-    # 4. Feature Engineering on Draws
-    def calculate_stats(row_list):
+            _write_manifest(manifest_path, manifest)
+        except OSError:
+            pass
+        return (*read_draws_cache(segment_paths), 0)
+
+    # 3. Append only the new rows
+    if cache_ok and manifest.get('version') == CACHE_VERSION:
         try:
-            nums = [int(n) for n in row_list if n.isdigit()]
-            return pd.Series({
-                'Suma': sum(nums),
-                'Pares': sum(1 for n in nums if n % 2 == 0),
-                'Impares': sum(1 for n in nums if n % 2 != 0),
-                'Num_Set': frozenset(nums)
-            })
-        except:
-            return pd.Series({'Suma': 0, 'Pares': 0, 'Impares': 0, 'Num_Set': frozenset()})
-
-    df_modern = pd.concat([df_modern, df_modern['Bolillas_Clean'].apply(calculate_stats)], axis=1)
-    
-    # 5. Explode for Number-level analysis
-    df_exploded = df_modern.explode('Bolillas_Clean')
-    df_exploded['Numero'] = pd.to_numeric(df_exploded['Bolillas_Clean'], errors='coerce')
-    df_exploded = df_exploded.dropna(subset=['Numero'])
-    df_exploded['Numero'] = df_exploded['Numero'].astype(int)
-    
-    return df_modern, df_exploded
+            new_rows = _split_new_rows(raw, manifest)
+            if new_rows is None:
+                raise HistoryConflictError("Cached rows were edited, deleted or reordered in the CSV.")
+            df_new, draws_new = _parse_new_rows(raw, new_rows, manifest)
+        except HistoryConflictError:
+            if on_conflict != 'rebuild':
+                raise
+        else:
+            df_draws, draws = read_draws_cache(segment_paths)
+            df_draws = pd.concat([df_draws, df_new], ignore_index=True)
+            draws = np.concatenate([draws, draws_new])
+            df_draws = add_draw_features(df_draws, draws)
+
+            segments = manifest['segments']
+            try:
+                if len(draws_new):
+                    if len(segments) >= MAX_CACHE_SEGMENTS:
+                        # Compact everything back into a single file
+                        save_draws_cache(df_draws, draws, data_path)
+                        segments = [os.path.basename(data_path)]
+                    else:
+                        stem = os.path.splitext(data_path)[0]
+                        segment_path = f"{stem}.{len(segments)}.npz"
+                        save_draws_cache(df_new, draws_new, segment_path)
+                        segments = segments + [os.path.basename(segment_path)]
+                _write_manifest(manifest_path, _build_manifest(stat, fingerprint, segments, df_draws, draws))
+            except OSError:
+                pass
+
+            return df_draws, draws, len(draws_new)
+
+    # 4. Cache miss (or repair): rebuild and persist
+    df_draws, draws = build_modern_draws(pd.read_csv(io.BytesIO(raw), encoding='latin1'))
+
+    try:
+        os.makedirs(os.path.dirname(data_path), exist_ok=True)
+        save_draws_cache(df_draws, draws, data_path)
+        segments = [os.path.basename(data_path)]
+        _write_manifest(manifest_path, _build_manifest(stat, fingerprint, segments, df_draws, draws))
+        for path in segment_paths:
+            if path != data_path and os.path.exists(path):
+                os.remove(path)
+    except OSError:
+        # Read-only deployments still work, just without the cache
+        pass
+
+    return df_draws, draws, len(draws)
+
+def _load_csv(filepath):
+    try:
+        return pd.read_csv(filepath, encoding='latin1')
+    except FileNotFoundError:
+        return None
+
+def load_draws(filepath="data/tinka_data.csv", use_cache=True, cache_dir=None):
+    """
+    Load the modern-era draws.
+    Returns a tuple: (df_draws, draws) where draws is the (n_draws x 6) int8 matrix.
+
+    With use_cache, the cleaned result is kept on disk keyed by the CSV's size, mtime
+    and content hash; new draws are appended incrementally and edited history
+    triggers a full rebuild.
+    """
+    if not use_cache:
+        df = _load_csv(filepath)
+        if df is None:
+            return pd.DataFrame(), np.zeros((0, BALLS_PER_DRAW), dtype=np.int8)
+        return build_modern_draws(df)
+
+    df_draws, draws, _ = ingest_new_draws(filepath, cache_dir=cache_dir, on_conflict='rebuild')
+    return df_draws, draws
+
+def open_draw_store(filepath="data/tinka_data.csv", cache_dir=None):
+    """
+    Zero-copy, read-only DrawStore for the current CSV (see modules/store.py).
+    The store is (re)published first if the CSV changed. Returns None if unavailable.
+    """
+    version = get_dataset_version(filepath, cache_dir)
+    if version is None:
+        return None
+
+    store_dir = get_store_dir(filepath, cache_dir)
+    if store.get_store_version(store_dir) != version:
+        ingest_new_draws(filepath, cache_dir=cache_dir, on_conflict='rebuild')
+
+    draw_store = store.open_store(store_dir)
+    if draw_store is None:
+        # Published with an older layout (or damaged): publish it again from the cache
+        df_draws, draws = load_draws(filepath, cache_dir=cache_dir)
+        if len(draws):
+            _publish_store(store_dir, version, df_draws, draws)
+        draw_store = store.open_store(store_dir)
+    return draw_store
+
+def get_dataset_version(filepath="data/tinka_data.csv", cache_dir=None):
+    """
+    Short identifier of the dataset contents (prefix of the CSV's SHA-256).
+    Used to key any derived artifact (features, models, co-occurrence tables).
+    """
+    _, manifest_path = get_cache_paths(filepath, cache_dir)
+    manifest = _read_manifest(manifest_path)
+    try:
+        stat = os.stat(filepath)
+    except FileNotFoundError:
+        return None
+
+    if _cache_is_fresh(manifest, stat):
+        return manifest['sha256'][:16]
+    return file_sha256(filepath)[:16]
+
+def load_data(filepath="data/tinka_data.csv", use_cache=True, cache_dir=None):
+    """
+    Load and clean the Tinka dataset.
+    Returns a tuple: (df_draws, df_exploded)
+    """
+    df_draws, draws = load_draws(filepath, use_cache=use_cache, cache_dir=cache_dir)
+    if df_draws.empty:
+        return df_draws, pd.DataFrame()
+
+    return df_draws, explode_draws(df_draws, draws)
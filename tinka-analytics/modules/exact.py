@@ -0,0 +1,285 @@
+import os
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import scipy.stats as stats
+from scipy.special import comb
+
+# -------------------------------------------------------------------
+# DISTRIBUCIONES TEÓRICAS EXACTAS (k BOLILLAS DE N SIN REEMPLAZO)
+# -------------------------------------------------------------------
+# Counts of k-subsets of {1..N} per value of each statistic, built once by dynamic
+# programming and stored as .npz. After that every pmf / cdf / percentile is an
+# array index.
+
+DECADE_SIZE = 10
+EXACT_STATISTICS = ['suma', 'pares', 'decenas', 'consecutivos']
+
+STATISTIC_LABELS = {
+    'suma': 'Suma de Bolillas',
+    'pares': 'Cantidad de Pares',
+    'decenas': 'Decenas Distintas',
+    'consecutivos': 'Pares Consecutivos',
+}
+
+# Tables already built or loaded by this process, keyed by (total_balls, k)
+_TABLES = {}
+
+@dataclass
+class ExactDistribution:
+    """
+    Exact distribution of an integer statistic on the support [low, low + len(counts)).
+    counts[i] is the number of k-subsets whose statistic equals low + i.
+    """
+    low: int
+    counts: np.ndarray
+
+    def __post_init__(self):
+        total = self.counts.sum()
+        self.support = np.arange(self.low, self.low + len(self.counts))
+        self.pmf_table = self.counts / total
+        self.cdf_table = np.cumsum(self.pmf_table)
+        # P(X >= x) accumulated from the right, so upper tails keep full precision
+        self.sf_table = np.cumsum(self.pmf_table[::-1])[::-1]
+
+    def _index(self, x):
+        return np.asarray(x, dtype=np.int64) - self.low
+
+    def pmf(self, x):
+        """
+        P(X = x); zero outside the support.
+        """
+        i = self._index(x)
+        inside = (i >= 0) & (i < len(self.counts))
+        return np.where(inside, self.pmf_table[np.clip(i, 0, len(self.counts) - 1)], 0.0)
+
+    def cdf(self, x):
+        """
+        P(X <= x).
+        """
+        i = self._index(x)
+        values = self.cdf_table[np.clip(i, 0, len(self.counts) - 1)]
+        return np.where(i < 0, 0.0, np.where(i >= len(self.counts), 1.0, values))
+
+    def sf(self, x):
+        """
+        P(X >= x).
+        """
+        i = self._index(x)
+        values = self.sf_table[np.clip(i, 0, len(self.counts) - 1)]
+        return np.where(i < 0, 1.0, np.where(i >= len(self.counts), 0.0, values))
+
+    def percentile(self, x):
+        """
+        Mid-percentile of x (0-100): P(X < x) + P(X = x) / 2.
+        """
+        return 100.0 * (self.cdf(x) - self.pmf(x) / 2)
+
+    def two_sided_p(self, x):
+        """
+        Exact two-sided tail probability of observing x, capped at 1.
+        """
+        return np.minimum(1.0, 2 * np.minimum(self.cdf(x), self.sf(x)))
+
+    def ppf(self, q):
+        """
+        Smallest x with P(X <= x) >= q.
+        """
+        return self.low + np.searchsorted(self.cdf_table, np.asarray(q) - 1e-12)
+
+    @property
+    def mean(self):
+        return float((self.support * self.pmf_table).sum())
+
+    @property
+    def std(self):
+        return float(np.sqrt(((self.support - self.mean) ** 2 * self.pmf_table).sum()))
+
+@dataclass
+class ExactTables:
+    """
+    Exact distributions of the draw statistics for a k-of-N game.
+    """
+    total_balls: int
+    k: int
+    suma: ExactDistribution
+    pares: ExactDistribution
+    decenas: ExactDistribution
+    consecutivos: ExactDistribution
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+def sum_counts(total_balls, k):
+    """
+    Number of k-subsets of {1..N} for every sum, by 0/1-knapsack convolution.
+    Returns (low, counts) with low = k(k+1)/2.
+    """
+    max_sum = k * (2 * total_balls - k + 1) // 2
+    # table[j, s] = subsets of size j with sum s among the balls processed so far
+    table = np.zeros((k + 1, max_sum + 1), dtype=np.int64)
+    table[0, 0] = 1
+    for n in range(1, total_balls + 1):
+        # Right-hand side is copied by NumPy (overlapping views), so every ball is used once
+        table[1:, n:] += table[:-1, :-n]
+    low = k * (k + 1) // 2
+    return low, table[k, low:]
+
+def even_counts(total_balls, k):
+    """
+    Number of k-subsets for every count of even balls (hypergeometric numerators).
+    """
+    evens = total_balls // 2
+    e = np.arange(k + 1)
+    return 0, np.array([comb(evens, i, exact=True) * comb(total_balls - evens, k - i, exact=True) for i in e], dtype=np.int64)
+
+def decade_counts(total_balls, k, decade_size=DECADE_SIZE):
+    """
+    Number of k-subsets for every number of distinct decades (1-10, 11-20, ...) touched,
+    by convolving the decades one at a time.
+    """
+    sizes = [min(decade_size, total_balls - start) for start in range(0, total_balls, decade_size)]
+    # table[j, d] = ways to pick j balls touching d decades among the decades processed
+    table = np.zeros((k + 1, len(sizes) + 1), dtype=np.int64)
+    table[0, 0] = 1
+    for size in sizes:
+        new = table.copy()
+        for i in range(1, min(size, k) + 1):
+            new[i:, 1:] += comb(size, i, exact=True) * table[:-i, :-1]
+        table = new
+    return 1, table[k, 1:min(k, len(sizes)) + 1]
+
+def consecutive_counts(total_balls, k):
+    """
+    Number of k-subsets for every count of adjacent pairs (n, n + 1) drawn together.
+    A subset with r maximal blocks has k - r adjacent pairs: C(k - 1, r - 1) * C(N - k + 1, r).
+    """
+    pairs = np.arange(k)
+    return 0, np.array([comb(k - 1, k - p - 1, exact=True) * comb(total_balls - k + 1, k - p, exact=True) for p in pairs], dtype=np.int64)
+
+def build_tables(total_balls=50, k=6):
+    """
+    Compute every exact table from scratch.
+    """
+    builders = {'suma': sum_counts, 'pares': even_counts, 'decenas': decade_counts, 'consecutivos': consecutive_counts}
+    return ExactTables(total_balls, k, **{name: ExactDistribution(*build(total_balls, k)) for name, build in builders.items()})
+
+def get_tables(total_balls=50, k=6, cache_dir=os.path.join('data', 'cache')):
+    """
+    Exact tables for a k-of-N game, memoized per process and cached on disk.
+    """
+    key = (total_balls, k)
+    if key in _TABLES:
+        return _TABLES[key]
+
+    cache_path = os.path.join(cache_dir, f"exact_{total_balls}_{k}.npz") if cache_dir else None
+    tables = None
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with np.load(cache_path, allow_pickle=False) as cached:
+                tables = ExactTables(total_balls, k, **{
+                    name: ExactDistribution(int(cached[f"{name}_low"]), cached[f"{name}_counts"]) for name in EXACT_STATISTICS
+                })
+        except (OSError, ValueError, KeyError):
+            tables = None
+
+    if tables is None:
+        tables = build_tables(total_balls, k)
+        if cache_path:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                arrays = {}
+                for name in EXACT_STATISTICS:
+                    arrays[f"{name}_low"] = np.int64(tables[name].low)
+                    arrays[f"{name}_counts"] = tables[name].counts
+                tmp_path = cache_path + '.tmp'
+                with open(tmp_path, 'wb') as f:
+                    np.savez(f, **arrays)
+                os.replace(tmp_path, cache_path)
+            except OSError:
+                pass
+
+    _TABLES[key] = tables
+    return tables
+
+# -------------------------------------------------------------------
+# ESTADÍSTICOS POR SORTEO Y BONDAD DE AJUSTE
+# -------------------------------------------------------------------
+
+def draw_statistics(draws, decade_size=DECADE_SIZE):
+    """
+    Per-draw value of every exact statistic from an (n_draws x k) matrix.
+    """
+    draws = np.asarray(draws, dtype=np.int64)
+    ordered = np.sort(draws, axis=1)
+    decades = (ordered - 1) // decade_size
+    return {
+        'suma': draws.sum(axis=1),
+        'pares': (draws % 2 == 0).sum(axis=1),
+        'decenas': 1 + (np.diff(decades, axis=1) != 0).sum(axis=1),
+        'consecutivos': (np.diff(ordered, axis=1) == 1).sum(axis=1),
+    }
+
+def goodness_of_fit(values, dist, min_expected=5.0):
+    """
+    Chi-Square test of observed integer values against an exact distribution.
+    Adjacent support values are merged until every bin expects at least min_expected.
+    Returns (chi2, p_value, dof, df_bins).
+    """
+    values = np.asarray(values, dtype=np.int64)
+    n = len(values)
+    observed = np.bincount(np.clip(values - dist.low, 0, len(dist.counts) - 1), minlength=len(dist.counts))
+    expected = n * dist.pmf_table
+
+    # 1. Greedy left-to-right merge, folding a short last bin into its neighbour
+    edges, acc = [0], 0.0
+    for i, e in enumerate(expected):
+        acc += e
+        if acc >= min_expected and i < len(expected) - 1:
+            edges.append(i + 1)
+            acc = 0.0
+    if len(edges) > 1 and expected[edges[-1]:].sum() < min_expected:
+        edges.pop()
+    starts = np.array(edges)
+    obs_bins = np.add.reduceat(observed, starts)
+    exp_bins = np.add.reduceat(expected, starts)
+    ends = np.append(starts[1:], len(expected)) - 1
+
+    # 2. Pearson statistic
+    dof = len(obs_bins) - 1
+    if dof < 1:
+        return 0.0, 1.0, 0, pd.DataFrame()
+    chi2 = float(((obs_bins - exp_bins) ** 2 / exp_bins).sum())
+    p_value = float(stats.chi2.sf(chi2, dof))
+
+    df_bins = pd.DataFrame({
+        'Rango': [f"{dist.low + a}" if a == b else f"{dist.low + a}-{dist.low + b}" for a, b in zip(starts, ends)],
+        'Observado': obs_bins,
+        'Esperado': exp_bins,
+    })
+    return chi2, p_value, dof, df_bins
+
+def exact_audit(draws, total_balls=50, min_expected=5.0):
+    """
+    Exact goodness-of-fit of every statistic in EXACT_STATISTICS.
+    Returns (df_summary, bins) where bins maps each statistic to its binned frame.
+    """
+    draws = np.asarray(draws)
+    tables = get_tables(total_balls, draws.shape[1])
+    observed = draw_statistics(draws)
+
+    rows, bins = [], {}
+    for name in EXACT_STATISTICS:
+        dist = tables[name]
+        chi2, p_value, dof, df_bins = goodness_of_fit(observed[name], dist, min_expected)
+        bins[name] = df_bins
+        rows.append({
+            'Estadistico': STATISTIC_LABELS[name],
+            'Media_Observada': float(observed[name].mean()) if len(draws) else 0.0,
+            'Media_Teorica': dist.mean,
+            'Chi2': chi2,
+            'GL': dof,
+            'P_Valor': p_value,
+        })
+    return pd.DataFrame(rows), bins
@@ -0,0 +1,196 @@
+import os
+import glob
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from . import etl
+
+# -------------------------------------------------------------------
+# ALMACÉN DE FEATURES PARA MACHINE LEARNING (VECTORIZADO E INCREMENTAL)
+# -------------------------------------------------------------------
+# The features of ball n before draw t are all differences of the cumulative
+# incidence C[t] = appearances in draws 0..t-1: a rolling window of w draws is
+# C[t] - C[t - w], a lag is one row of the incidence matrix, and the gap is t minus
+# the running maximum of the last appearance. Every row only uses earlier draws,
+# so nothing about draw t leaks into its own features.
+# The (n_draws x total_balls x n_features) array is cached per dataset version;
+# when draws are appended only the new rows are computed, from the running state
+# (appearances, last appearance, last rows of the incidence) saved with it.
+
+LAGS = (1, 2)
+WINDOWS = (5, 10, 20)
+FEATURE_NAMES = (['Cumulative_Count'] + [f'Lag_{lag}' for lag in LAGS]
+                 + [f'Rolling_Sum_{w}' for w in WINDOWS] + ['Gap'])
+
+# Draws of history the features of a new draw can look back on
+HISTORY = max(LAGS + WINDOWS)
+
+@dataclass
+class FeatureSet:
+    """
+    features[t, n - 1, f]: feature FEATURE_NAMES[f] of ball n before draw t.
+    target[t, n - 1]: 1 if ball n came out in draw t.
+    counts / last_seen: running state after the last draw (for incremental updates).
+    """
+    version: str
+    sorteos: np.ndarray
+    features: np.ndarray
+    target: np.ndarray
+    counts: np.ndarray
+    last_seen: np.ndarray
+
+    @property
+    def feature_names(self):
+        return list(FEATURE_NAMES)
+
+    @property
+    def n_draws(self):
+        return len(self.target)
+
+    @property
+    def total_balls(self):
+        return self.target.shape[1]
+
+    def xy(self, rows=slice(None)):
+        """
+        (X, y) of the selected draws flattened to one sample per (draw, ball).
+        """
+        features, target = self.features[rows], self.target[rows]
+        return features.reshape(-1, len(FEATURE_NAMES)), target.reshape(-1).astype(np.int8)
+
+    @property
+    def df(self):
+        """
+        Long frame (Sorteo, Numero, features..., Is_Drawn): one row per (draw, ball).
+        """
+        X, y = self.xy()
+        df = pd.DataFrame(X, columns=FEATURE_NAMES)
+        df.insert(0, 'Numero', np.tile(np.arange(1, self.total_balls + 1), self.n_draws))
+        df.insert(0, 'Sorteo', np.repeat(self.sorteos, self.total_balls))
+        df['Is_Drawn'] = y
+        return df
+
+def compute_features(incidence, start=0, counts=None, last_seen=None):
+    """
+    Features of draws start..n-1 of a chronological incidence matrix.
+    counts / last_seen: appearances and last appearance index (-1 = never) of every
+    ball before draw start (default: computed from incidence[:start]).
+    Returns (features, counts, last_seen), the last two after the final draw.
+    """
+    incidence = np.asarray(incidence, dtype=bool)
+    n_draws, total_balls = incidence.shape
+    if counts is None:
+        counts = incidence[:start].sum(axis=0, dtype=np.int64)
+    if last_seen is None:
+        idx = np.where(incidence[:start], np.arange(start)[:, None], -1)
+        last_seen = idx.max(axis=0) if start else np.full(total_balls, -1, dtype=np.int64)
+
+    # 1. Cumulative appearances before every row of the block (block starts HISTORY rows early)
+    lo = max(0, start - HISTORY)
+    block = incidence[lo:].astype(np.int64)
+    base = counts - block[:start - lo].sum(axis=0)
+    cum = base + np.vstack([np.zeros((1, total_balls), dtype=np.int64), np.cumsum(block, axis=0)])
+
+    # Row t of the output is row i = t - lo of cum (value before draw t)
+    i = np.arange(start - lo, n_draws - lo)
+    out = np.empty((len(i), total_balls, len(FEATURE_NAMES)), dtype=np.float32)
+    f = 0
+    out[:, :, f] = cum[i]
+    f += 1
+
+    # 2. Lags: the incidence of draw t - lag (0 before the first draw)
+    for lag in LAGS:
+        out[:, :, f] = np.where((i - lag >= 0)[:, None], block[np.maximum(i - lag, 0)], 0)
+        f += 1
+
+    # 3. Rolling windows: differences of the cumulative counts
+    for w in WINDOWS:
+        out[:, :, f] = cum[i] - cum[np.maximum(i - w, 0)]
+        f += 1
+
+    # 4. Gap: draws since the last appearance before t (t + 1 if never seen)
+    rows = np.arange(start, n_draws)
+    seen = np.maximum.accumulate(np.where(incidence[start:], rows[:, None], -1), axis=0) if len(rows) else np.zeros((0, total_balls), dtype=np.int64)
+    before = np.maximum(last_seen, np.vstack([np.full((1, total_balls), -1), seen[:-1]]))
+    out[:, :, f] = rows[:, None] - before
+
+    new_last_seen = np.maximum(last_seen, seen[-1]) if len(rows) else last_seen
+    return out, cum[-1], new_last_seen
+
+def build_feature_set(incidence, sorteos, version=None):
+    """
+    FeatureSet of a whole history, from scratch.
+    """
+    incidence = np.asarray(incidence, dtype=bool)
+    features, counts, last_seen = compute_features(incidence)
+    return FeatureSet(version, np.asarray(sorteos), features, incidence, counts, last_seen)
+
+def extend_feature_set(feature_set, incidence, sorteos, version=None):
+    """
+    FeatureSet of a longer history whose first rows are feature_set's draws:
+    only the appended draws are computed.
+    """
+    incidence = np.asarray(incidence, dtype=bool)
+    start = feature_set.n_draws
+    new, counts, last_seen = compute_features(incidence, start, feature_set.counts, feature_set.last_seen)
+    return FeatureSet(version, np.asarray(sorteos), np.concatenate([feature_set.features, new]), incidence, counts, last_seen)
+
+def _read_feature_set(path):
+    with np.load(path, allow_pickle=False) as cached:
+        return FeatureSet(str(cached['version']), cached['sorteos'], cached['features'], cached['target'],
+                          cached['counts'], cached['last_seen'])
+
+def _write_feature_set(path, feature_set):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, version=np.str_(feature_set.version), sorteos=feature_set.sorteos, features=feature_set.features,
+                 target=feature_set.target, counts=feature_set.counts, last_seen=feature_set.last_seen)
+    os.replace(tmp_path, path)
+
+def load_features(source=None, filepath="data/tinka_data.csv", cache_dir=None):
+    """
+    FeatureSet of the current dataset, cached on disk per dataset version.
+    source: a DrawStore (default: the current store). A cached set of an older version
+    whose draws are a prefix of the current ones is extended with the appended draws
+    instead of being rebuilt. Returns None if the data is unavailable.
+    """
+    draw_store = source or etl.open_draw_store(filepath, cache_dir)
+    if draw_store is None:
+        return None
+
+    cache_folder = os.path.dirname(etl.get_cache_paths(filepath, cache_dir)[0])
+    cache_path = os.path.join(cache_folder, f"features_{draw_store.version}.npz")
+    incidence, sorteos = np.asarray(draw_store.incidence), np.asarray(draw_store.sorteos)
+
+    if os.path.exists(cache_path):
+        try:
+            return _read_feature_set(cache_path)
+        except (OSError, ValueError, KeyError):
+            pass
+
+    # 1. Reuse an older version whose draws are a prefix of the current history
+    feature_set = None
+    for stale in glob.glob(os.path.join(cache_folder, "features_*.npz")):
+        try:
+            previous = _read_feature_set(stale)
+        except (OSError, ValueError, KeyError):
+            continue
+        n_old = previous.n_draws
+        if 0 < n_old <= len(incidence) and np.array_equal(previous.target, incidence[:n_old]) \
+                and np.array_equal(previous.sorteos, sorteos[:n_old]):
+            feature_set = extend_feature_set(previous, incidence, sorteos, draw_store.version)
+            break
+
+    # 2. Otherwise build from scratch, then replace the stale files
+    if feature_set is None:
+        feature_set = build_feature_set(incidence, sorteos, draw_store.version)
+    try:
+        for stale in glob.glob(os.path.join(cache_folder, "features_*.npz")):
+            os.remove(stale)
+        _write_feature_set(cache_path, feature_set)
+    except OSError:
+        pass
+
+    return feature_set
@@ -0,0 +1,186 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import scipy.stats as stats
+
+from . import cooccurrence, parallel
+from .store import DrawStore
+from .sampler import sample_draws
+from .audit import run_audit, compute_gaps
+
+# -------------------------------------------------------------------
+# DISTRIBUCIONES NULAS POR MONTE CARLO (P-VALORES EXACTOS)
+# -------------------------------------------------------------------
+# Null histories have the same length as the real one and draw k balls out of
+# total_balls WITHOUT replacement, so the p-values do not rely on the asymptotic
+# Chi-Square or on the normal approximation of the Runs Test.
+
+NULL_STATISTICS = ['chi2', 'parity_chi2', 'runs_abs_z', 'max_gap_z', 'pair_chi2']
+
+STATISTIC_LABELS = {
+    'chi2': 'Chi-Cuadrado (Frecuencias)',
+    'parity_chi2': 'Chi-Cuadrado (Paridad)',
+    'runs_abs_z': 'Runs Test |Z|',
+    'max_gap_z': 'Máximo Z-Score de Retraso',
+    'pair_chi2': 'Chi-Cuadrado (Pares)',
+}
+
+@dataclass
+class NullAuditResult:
+    """
+    Observed audit statistics, their simulated null distributions and empirical p-values.
+    """
+    n_replicates: int
+    observed: dict
+    null: dict
+    p_values: dict
+    p_errors: dict
+
+    @property
+    def df_summary(self):
+        """
+        One row per statistic with the empirical p-value and its 95% Monte Carlo interval.
+        """
+        rows = []
+        for name in NULL_STATISTICS:
+            p, se = self.p_values[name], self.p_errors[name]
+            rows.append({
+                'Estadistico': STATISTIC_LABELS[name],
+                'Observado': self.observed[name],
+                'P_Empirico': p,
+                'Error_MC': se,
+                'IC_Bajo': max(0.0, p - 1.96 * se),
+                'IC_Alto': min(1.0, p + 1.96 * se),
+            })
+        return pd.DataFrame(rows)
+
+def _sample_histories(rng, n_histories, n_draws, k, total_balls):
+    return sample_draws(rng, n_histories * n_draws, k, total_balls).reshape(n_histories, n_draws, k)
+
+def audit_statistics(histories, total_balls=50):
+    """
+    Every null statistic for a batch of histories shaped (n_histories, n_draws, k).
+    Returns a dict of arrays of length n_histories.
+    """
+    histories = np.asarray(histories)
+    n_hist, n_draws, k = histories.shape
+    rep = np.arange(n_hist)[:, None, None]
+
+    # 1. Frequency Chi-Square
+    freqs = np.bincount((rep * (total_balls + 1) + histories).ravel(),
+                        minlength=n_hist * (total_balls + 1)).reshape(n_hist, total_balls + 1)[:, 1:]
+    expected = n_draws * k / total_balls
+    chi2 = ((freqs - expected) ** 2).sum(axis=1) / expected
+
+    # 2. Parity Chi-Square against the hypergeometric reference
+    evens = (histories % 2 == 0).sum(axis=2)
+    parity_hist = np.bincount((np.arange(n_hist)[:, None] * (k + 1) + evens).ravel(),
+                              minlength=n_hist * (k + 1)).reshape(n_hist, k + 1)
+    pmf = stats.hypergeom.pmf(k - np.arange(k + 1), total_balls, (total_balls + 1) // 2, k)
+    parity_expected = n_draws * pmf
+    cells = parity_expected > 0
+    parity_chi2 = ((parity_hist[:, cells] - parity_expected[cells]) ** 2 / parity_expected[cells]).sum(axis=1)
+
+    # 3. Runs Test on the sums (vectorized normal approximation)
+    sums = histories.sum(axis=2, dtype=np.int64)
+    seq = sums > np.median(sums, axis=1, keepdims=True)
+    n1 = seq.sum(axis=1).astype(float)
+    n2 = n_draws - n1
+    runs = np.count_nonzero(np.diff(seq, axis=1), axis=1) + 1
+    with np.errstate(invalid='ignore', divide='ignore'):
+        expected_runs = 2 * n1 * n2 / (n1 + n2) + 1
+        var_runs = 2 * n1 * n2 * (2 * n1 * n2 - n1 - n2) / ((n1 + n2) ** 2 * (n1 + n2 - 1))
+        runs_abs_z = np.where(var_runs > 0, np.abs(runs - expected_runs) / np.sqrt(var_runs), 0.0)
+
+    # 4. Largest gap Z-Score (gaps in draw indices): one pass over time records, for
+    #    every hit of every (history, ball) pair, the draw where it was last seen
+    n_groups = n_hist * total_balls
+    group = (np.arange(n_hist)[None, :, None] * total_balls - 1 + histories.transpose(1, 0, 2)).reshape(n_draws, -1)
+    last_seen = np.full(n_groups, -1, dtype=np.int64)
+    previous = np.empty(group.shape, dtype=np.int64)
+    for t in range(n_draws):
+        previous[t] = last_seen[group[t]]
+        last_seen[group[t]] = t
+
+    seen = previous >= 0
+    gaps = (np.arange(n_draws)[:, None] - previous)[seen].astype(float)
+    hit = group[seen]
+    n_gaps = np.bincount(hit, minlength=n_groups)
+    gap_sum = np.bincount(hit, weights=gaps, minlength=n_groups)
+    gap_sq = np.bincount(hit, weights=gaps * gaps, minlength=n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_gap = gap_sum / n_gaps
+        std_gap = np.sqrt(np.maximum(gap_sq / n_gaps - mean_gap ** 2, 0.0))
+        z = np.where(std_gap > 0, ((n_draws - 1 - last_seen) - mean_gap) / std_gap, 0.0)
+    max_gap_z = z.reshape(n_hist, total_balls).max(axis=1)
+
+    # 5. Global pair Chi-Square (as cooccurrence): pair counts of every history as X^T X
+    x = np.zeros((n_hist, n_draws, total_balls + 1), dtype=np.float32)
+    np.put_along_axis(x, histories.astype(np.int64), 1.0, axis=2)
+    x = x[:, :, 1:]
+    pair_counts = np.rint(np.matmul(x.transpose(0, 2, 1), x)).astype(np.int64)
+    iu = np.triu_indices(total_balls, k=1)
+    pair_expected = n_draws * k * (k - 1) / (total_balls * (total_balls - 1))
+    pair_chi2 = ((pair_counts[:, iu[0], iu[1]] - pair_expected) ** 2).sum(axis=1) / pair_expected
+
+    return {'chi2': chi2, 'parity_chi2': parity_chi2, 'runs_abs_z': runs_abs_z, 'max_gap_z': max_gap_z,
+            'pair_chi2': pair_chi2}
+
+def _null_chunk(seed, n_histories, n_draws, k, total_balls):
+    rng = np.random.default_rng(seed)
+    return audit_statistics(_sample_histories(rng, n_histories, n_draws, k, total_balls), total_balls)
+
+def _observed_statistics(draws, total_balls):
+    result = run_audit(draws, total_balls)
+    k = draws.shape[1]
+    parity_expected = result.n_draws * result.parity_expected
+    cells = parity_expected > 0
+    gaps = compute_gaps((draws[:, :, None] == np.arange(1, total_balls + 1)).any(axis=1))
+
+    return {
+        'chi2': result.chi2_stat,
+        'parity_chi2': float(((result.parity_hist[cells] - parity_expected[cells]) ** 2 / parity_expected[cells]).sum()),
+        'runs_abs_z': abs(result.runs_z),
+        'max_gap_z': float(np.nanmax(gaps.z_score)),
+        'pair_chi2': cooccurrence.compute_cooccurrence(draws, total_balls).pair_chi2,
+    }
+
+def run_null_audit(draws, n_replicates=10000, seed=None, chunk_size=500, n_jobs=1, total_balls=50):
+    """
+    Empirical p-values for every audit statistic against n_replicates simulated null
+    histories of the same length.
+
+    Replicates are generated in chunks of chunk_size histories, each chunk with its own
+    SeedSequence child, so the result for a given seed does not depend on n_jobs.
+    n_jobs > 1 spreads the chunks across processes (-1 = all cores).
+    """
+    if isinstance(draws, DrawStore):
+        draws = draws.draws
+    draws = np.asarray(draws)
+    n_draws, k = draws.shape
+
+    observed = _observed_statistics(draws, total_balls)
+
+    n_chunks = -(-n_replicates // chunk_size)
+    sizes = [min(chunk_size, n_replicates - i * chunk_size) for i in range(n_chunks)]
+    seeds = parallel.spawn_seeds(seed, n_chunks)
+    tasks = [(s, size, n_draws, k, total_balls) for s, size in zip(seeds, sizes)]
+
+    null = parallel.merge_concat(parallel.run_tasks(_null_chunk, tasks, n_jobs))
+
+    # Upper-tail empirical p-value with the +1 correction, and its binomial Monte Carlo error
+    p_values, p_errors = {}, {}
+    for name in NULL_STATISTICS:
+        exceed = np.count_nonzero(null[name] >= observed[name] - 1e-12)
+        p = (exceed + 1) / (n_replicates + 1)
+        p_values[name] = p
+        p_errors[name] = float(np.sqrt(p * (1 - p) / n_replicates))
+
+    return NullAuditResult(
+        n_replicates=n_replicates,
+        observed=observed,
+        null=null,
+        p_values=p_values,
+        p_errors=p_errors,
+    )
@@ -0,0 +1,83 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .sampler import BLOCK_SIZE, as_seed_sequence
+
+# -------------------------------------------------------------------
+# CAPA DE EJECUCIÓN PARALELA REPRODUCIBLE
+# -------------------------------------------------------------------
+# A simulation is split into shards whose random streams are fixed by the root seed
+# and the shard index only (SeedSequence.spawn children, or the sampler's per-block
+# seeds). Workers never own a stream, so for a given seed every n_jobs produces the
+# same shard results, and merging them in shard order gives identical totals.
+
+def resolve_jobs(n_jobs):
+    """
+    Number of worker processes (-1 = all cores, never less than 1).
+    """
+    if n_jobs is None or n_jobs == 0:
+        return 1
+    if n_jobs < 0:
+        return max(1, (os.cpu_count() or 1) + 1 + n_jobs)
+    return n_jobs
+
+def thread_budget(n_workers):
+    """
+    Threads each of n_workers processes may use without oversubscribing the cores.
+    """
+    return max(1, (os.cpu_count() or 1) // max(1, n_workers))
+
+def spawn_seeds(seed, n_shards):
+    """
+    One independent child SeedSequence per shard.
+    """
+    return as_seed_sequence(seed).spawn(n_shards)
+
+def run_tasks(func, tasks, n_jobs=1):
+    """
+    func(*task) for every task, in task order; in a process pool when n_jobs > 1.
+    """
+    n_jobs = resolve_jobs(n_jobs)
+    if n_jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(tasks))) as pool:
+            return list(pool.map(func, *zip(*tasks)))
+    return [func(*task) for task in tasks]
+
+def block_shards(n_items, n_jobs=1, block_size=BLOCK_SIZE):
+    """
+    Split n_items sampler rows into (first_block, n_items) shards of whole blocks.
+    Shard boundaries only change the scheduling: each block keeps its own seed.
+    """
+    n_blocks = -(-n_items // block_size)
+    n_shards = max(1, min(n_blocks, 4 * resolve_jobs(n_jobs)))
+    bounds = np.linspace(0, n_blocks, n_shards + 1).round().astype(int)
+    shards = []
+    for b0, b1 in zip(bounds[:-1], bounds[1:]):
+        if b1 > b0:
+            shards.append((int(b0), int(min(b1 * block_size, n_items) - b0 * block_size)))
+    return shards
+
+def merge_sum(results):
+    """
+    Exact element-wise sum of shard results (numbers, arrays, dicts or tuples of them).
+    """
+    first = results[0]
+    if isinstance(first, dict):
+        return {key: merge_sum([r[key] for r in results]) for key in first}
+    if isinstance(first, tuple):
+        return tuple(merge_sum(list(parts)) for parts in zip(*results))
+    total = first.copy() if isinstance(first, np.ndarray) else first
+    for r in results[1:]:
+        total = total + r
+    return total
+
+def merge_concat(results):
+    """
+    Shard results concatenated in shard order (arrays, or dicts of arrays).
+    """
+    first = results[0]
+    if isinstance(first, dict):
+        return {key: np.concatenate([r[key] for r in results]) for key in first}
+    return np.concatenate(results)
@@ -0,0 +1,240 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from . import bitmask, parallel, prizes, sampler
+from .simulation import MAIN_BALLS
+
+# -------------------------------------------------------------------
+# SIMULADOR DE PORTAFOLIOS DE TICKETS (BITMASK + POPCOUNT)
+# -------------------------------------------------------------------
+# Every ticket and every simulated draw is a uint64 bitmask, so the matches of a
+# whole block of draws against the whole portfolio are popcount(draw & ticket)
+# over a (draws x tickets) matrix. The boliyapa hit is folded into the same cell
+# as outcome = 2 * matches + hit, and only the cells that can pay (3+ matches, or
+# 2 matches plus the boliyapa) are gathered from the prize engine's payout tensor,
+# so the cost is dominated by the popcount itself.
+
+MIN_PLAYED, MAX_PLAYED = 6, 15
+PRIZE_TIERS = [3, 4, 5, 6]
+
+# Cells of the (draws x tickets) match matrix processed at once (sized to stay in cache)
+MATCH_BLOCK_CELLS = 1 << 16
+
+# Lowest outcome code (2 * matches + boliyapa hit) that can pay: 2 matches + boliyapa
+MIN_PAYING_OUTCOME = 2 * 2 + 1
+
+@dataclass
+class PortfolioResult:
+    """
+    Outcome of a portfolio of tickets against the same n_draws simulated draws.
+    tier_hits[t, i] counts the draws where ticket t reached PRIZE_TIERS[i] matches;
+    boliyapa_hits[t] counts the paying draws where it also held the boliyapa.
+    prize_values / prize_counts: distribution of the portfolio's total prize per draw.
+    """
+    n_draws: int
+    tickets: list
+    ticket_masks: np.ndarray
+    n_played: np.ndarray
+    cost_per_draw: np.ndarray
+    revenue: np.ndarray
+    tier_hits: np.ndarray
+    boliyapa_hits: np.ndarray
+    prize_values: np.ndarray
+    prize_counts: np.ndarray
+
+    @property
+    def total_cost(self):
+        return float(self.cost_per_draw.sum() * self.n_draws)
+
+    @property
+    def total_revenue(self):
+        return float(self.revenue.sum())
+
+    @property
+    def roi_percent(self):
+        return (self.total_revenue - self.total_cost) / self.total_cost * 100
+
+    @property
+    def coverage(self):
+        """
+        Distinct balls covered by at least one ticket.
+        """
+        return int(bitmask.popcount(np.bitwise_or.reduce(self.ticket_masks)))
+
+    @property
+    def df_tickets(self):
+        """
+        One row per ticket: numbers, cost, prizes, ROI and hits per tier.
+        """
+        cost = self.cost_per_draw * self.n_draws
+        df = pd.DataFrame({
+            'Ticket': np.arange(1, len(self.tickets) + 1),
+            'Numeros': ['-'.join(str(n) for n in t) for t in self.tickets],
+            'Cantidad': self.n_played,
+            'Costo_Total': cost,
+            'Premios': self.revenue,
+            'ROI': (self.revenue - cost) / cost * 100,
+        })
+        for i, tier in enumerate(PRIZE_TIERS):
+            df[f'Aciertos_{tier}'] = self.tier_hits[:, i]
+        df['Con_Boliyapa'] = self.boliyapa_hits
+        return df
+
+    @property
+    def df_prize_distribution(self):
+        """
+        Total portfolio prize per draw, with its frequency and probability.
+        """
+        return pd.DataFrame({
+            'Premio_Portafolio': self.prize_values,
+            'Sorteos': self.prize_counts,
+            'Probabilidad': self.prize_counts / self.n_draws,
+        })
+
+    def overlap_matrix(self):
+        """
+        Numbers shared by every pair of tickets (n_tickets x n_tickets).
+        """
+        return bitmask.popcount(self.ticket_masks[:, None] & self.ticket_masks[None, :], np.uint8)
+
+    def overlap_histogram(self):
+        """
+        How many ticket pairs share 0, 1, 2, ... numbers (computed in blocks).
+        """
+        masks = self.ticket_masks
+        hist = np.zeros(MAX_PLAYED + 1, dtype=np.int64)
+        step = max(1, MATCH_BLOCK_CELLS // max(len(masks), 1))
+        for start in range(0, len(masks), step):
+            rows = np.arange(start, min(start + step, len(masks)))
+            shared = bitmask.popcount(masks[rows, None] & masks[None, :], np.uint8)
+            upper = np.arange(len(masks))[None, :] > rows[:, None]
+            hist += np.bincount(shared[upper], minlength=MAX_PLAYED + 1)[:MAX_PLAYED + 1]
+        return hist
+
+def payout_table(max_played=MAX_PLAYED, k=6):
+    """
+    payout[n, 2 * m + b]: prize of a system bet of n numbers with m matches and
+    boliyapa hit b (the flat outcome layout used by score_draws).
+    """
+    engine = prizes.get_prize_engine()
+    return np.ascontiguousarray(engine.payouts[:max_played + 1, :k + 1, :, 0]).reshape(max_played + 1, 2 * (k + 1))
+
+def parse_tickets(tickets, total_balls=50):
+    """
+    Validate a list of tickets (iterables of 6 to 15 distinct balls) and return
+    (sorted tickets, masks, n_played).
+    """
+    parsed = []
+    for i, ticket in enumerate(tickets, start=1):
+        numbers = sorted(int(n) for n in ticket)
+        if not MIN_PLAYED <= len(numbers) <= MAX_PLAYED:
+            raise ValueError(f"Ticket {i}: debe tener entre {MIN_PLAYED} y {MAX_PLAYED} números.")
+        if len(set(numbers)) != len(numbers) or numbers[0] < 1 or numbers[-1] > total_balls:
+            raise ValueError(f"Ticket {i}: números repetidos o fuera de 1-{total_balls}.")
+        parsed.append(numbers)
+    if not parsed:
+        raise ValueError("El portafolio está vacío.")
+
+    masks = np.array([bitmask.numbers_to_mask(t) for t in parsed], dtype=np.uint64)
+    n_played = np.array([len(t) for t in parsed], dtype=np.int64)
+    return parsed, masks, n_played
+
+def random_portfolio(n_tickets, n_played=6, seed=None, total_balls=50):
+    """
+    n_tickets random tickets of n_played numbers each (for stress tests and demos).
+    """
+    rng = np.random.default_rng(seed)
+    return [sorted(row.tolist()) for row in sampler.sample_draws(rng, n_tickets, n_played, total_balls).astype(int)]
+
+def score_draws(draw_masks, boliyapa_masks, ticket_masks, ticket_payouts):
+    """
+    Prizes of a block of draws against every ticket.
+    ticket_payouts[t, 2 * m + b] is the prize of ticket t for m matches and boliyapa hit b.
+    Returns (per-ticket revenue, per-ticket tier hits, per-ticket boliyapa hits,
+    per-draw portfolio prize).
+    """
+    n_tickets = len(ticket_masks)
+    revenue = np.zeros(n_tickets, dtype=np.int64)
+    tier_hits = np.zeros((n_tickets, len(PRIZE_TIERS)), dtype=np.int64)
+    boliyapa_hits = np.zeros(n_tickets, dtype=np.int64)
+    draw_prize = np.zeros(len(draw_masks), dtype=np.int64)
+
+    step = max(1, MATCH_BLOCK_CELLS // n_tickets)
+    for start in range(0, len(draw_masks), step):
+        block = draw_masks[start:start + step]
+        outcome = 2 * bitmask.popcount(block[:, None] & ticket_masks[None, :], np.uint8)
+        outcome += (boliyapa_masks[start:start + step, None] & ticket_masks[None, :]) != 0
+
+        # Only cells that can pay are gathered (flat indices: 2-D nonzero is much slower)
+        cells = np.flatnonzero(outcome >= MIN_PAYING_OUTCOME)
+        rows, cols = np.divmod(cells, n_tickets)
+        code = outcome.ravel()[cells].astype(np.int64)
+        cell_prizes = ticket_payouts[cols, code]
+        m, hit = np.divmod(code, 2)
+
+        revenue += np.bincount(cols, weights=cell_prizes, minlength=n_tickets).astype(np.int64)
+        main = m >= PRIZE_TIERS[0]
+        tier_hits += np.bincount(cols[main] * len(PRIZE_TIERS) + (m[main] - PRIZE_TIERS[0]),
+                                 minlength=n_tickets * len(PRIZE_TIERS)).reshape(n_tickets, len(PRIZE_TIERS))
+        boliyapa_hits += np.bincount(cols[hit == 1], minlength=n_tickets)
+        draw_prize[start:start + len(block)] = np.bincount(rows, weights=cell_prizes, minlength=len(block)).astype(np.int64)
+
+    return revenue, tier_hits, boliyapa_hits, draw_prize
+
+def _merge_distribution(values, counts, new_values, new_counts):
+    # Exact union of two (sorted values, counts) distributions
+    merged, inverse = np.unique(np.concatenate([values, new_values]), return_inverse=True)
+    merged_counts = np.bincount(inverse, weights=np.concatenate([counts, new_counts]), minlength=len(merged))
+    return merged, merged_counts.astype(np.int64)
+
+def _portfolio_shard(ticket_masks, ticket_payouts, seed_seq, first_block, n_draws, total_balls):
+    revenue = np.zeros(len(ticket_masks), dtype=np.int64)
+    tier_hits = np.zeros((len(ticket_masks), len(PRIZE_TIERS)), dtype=np.int64)
+    boliyapa_hits = np.zeros(len(ticket_masks), dtype=np.int64)
+    prize_values, prize_counts = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    for block in sampler.iter_draws(n_draws, seed_seq, MAIN_BALLS + 1, total_balls, first_block):
+        r, h, bh, draw_prize = score_draws(bitmask.draws_to_masks(block[:, :MAIN_BALLS]),
+                                           bitmask.draws_to_masks(block[:, MAIN_BALLS:]), ticket_masks, ticket_payouts)
+        revenue += r
+        tier_hits += h
+        boliyapa_hits += bh
+        prize_values, prize_counts = _merge_distribution(prize_values, prize_counts, *np.unique(draw_prize, return_counts=True))
+    return revenue, tier_hits, boliyapa_hits, prize_values, prize_counts
+
+def run_portfolio(tickets, n_draws=100000, seed=None, total_balls=50, n_jobs=1):
+    """
+    Simulate a portfolio of system bets (6 to 15 numbers each) against the same
+    n_draws simulated draws (see sampler: same seed -> same draws).
+    n_jobs > 1 spreads the draw blocks across processes with identical results.
+    """
+    tickets, ticket_masks, n_played = parse_tickets(tickets, total_balls)
+    ticket_payouts = payout_table()[n_played]
+    cost_per_draw = prizes.get_prize_engine().cost(n_played)
+
+    seed_seq = sampler.as_seed_sequence(seed)
+    tasks = [(ticket_masks, ticket_payouts, seed_seq, first_block, n, total_balls)
+             for first_block, n in parallel.block_shards(n_draws, n_jobs)]
+    shards = parallel.run_tasks(_portfolio_shard, tasks, n_jobs)
+
+    revenue = parallel.merge_sum([shard[0] for shard in shards])
+    tier_hits = parallel.merge_sum([shard[1] for shard in shards])
+    boliyapa_hits = parallel.merge_sum([shard[2] for shard in shards])
+    prize_values, prize_counts = shards[0][3], shards[0][4]
+    for shard in shards[1:]:
+        prize_values, prize_counts = _merge_distribution(prize_values, prize_counts, shard[3], shard[4])
+
+    return PortfolioResult(
+        n_draws=n_draws,
+        tickets=tickets,
+        ticket_masks=ticket_masks,
+        n_played=n_played,
+        cost_per_draw=cost_per_draw,
+        revenue=revenue,
+        tier_hits=tier_hits,
+        boliyapa_hits=boliyapa_hits,
+        prize_values=prize_values,
+        prize_counts=prize_counts,
+    )
@@ -0,0 +1,174 @@
+import os
+import json
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from scipy.special import comb
+
+from . import bitmask
+
+# -------------------------------------------------------------------
+# MOTOR DE PREMIOS (TENSOR DE PAGOS PRECALCULADO)
+# -------------------------------------------------------------------
+# Costs and prizes are read from a single config (data/prize_table.json). From it
+# the payout of every possible outcome is built once:
+#   payouts[n, m, b, a] = prize of a system bet of n numbers with m main matches,
+#   b = 1 if the boliyapa is one of its numbers and a of its numbers among the
+#   "Sí o Sí" additional balls.
+# A system bet pays every 6-number sub-combination on its own. A sub-combination
+# holding the boliyapa is paid with the boliyapa table instead of the regular one;
+# one made only of main and additional balls (with at least one additional ball)
+# is paid the "Sí o Sí" prize. After that, any number of outcomes is priced with a
+# single array gather.
+
+PRIZE_CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'prize_table.json')
+
+# Engines already built by this process, keyed by config path
+_ENGINES = {}
+
+@dataclass
+class PrizeEngine:
+    """
+    Cost and payout tables of the game.
+    costs[n]: price of a bet of n numbers (0 where n cannot be played).
+    payouts[n, m, b, a]: prize of an outcome (see the module notes).
+    tier_counts[n, m, x]: sub-combinations with x main matches (no boliyapa nor additional balls).
+    """
+    k: int
+    min_played: int
+    max_played: int
+    costs: np.ndarray
+    payouts: np.ndarray
+    tier_counts: np.ndarray
+
+    @property
+    def jackpot(self):
+        return int(self.payouts[self.k, self.k, 0, 0])
+
+    def cost(self, n_played):
+        """
+        Price of a bet of n_played numbers (scalar or array).
+        """
+        return self.costs[n_played]
+
+    def payout(self, n_played, matches, boliyapa_hit=0, extra_hits=0):
+        """
+        Prize of any number of outcomes at once (arguments broadcast like NumPy arrays).
+        """
+        return self.payouts[n_played, matches, np.asarray(boliyapa_hit, dtype=np.int64), extra_hits]
+
+    def outcome_payouts(self, n_played):
+        """
+        (k + 1 x 2) prizes of a bet of n_played numbers by main matches and boliyapa hit,
+        without additional balls (the layout of the simulated outcome histograms).
+        """
+        return self.payouts[n_played, :, :, 0]
+
+    @property
+    def df_costs(self):
+        """
+        Price and number of sub-combinations of every playable bet size.
+        """
+        n = np.arange(self.min_played, self.max_played + 1)
+        return pd.DataFrame({
+            'Cantidad': n,
+            'Combinaciones': [comb(int(i), self.k, exact=True) for i in n],
+            'Costo': self.costs[n],
+        })
+
+def load_prize_config(path=PRIZE_CONFIG_PATH):
+    """
+    Prize and cost tables of the config file, with integer keys.
+    """
+    with open(path, encoding='utf-8') as f:
+        raw = json.load(f)
+    return {
+        'k': int(raw['numbers_per_combination']),
+        'cost': {int(n): int(v) for n, v in raw['cost'].items()},
+        'prizes': {int(x): int(v) for x, v in raw['prizes'].items()},
+        'boliyapa_prizes': {int(x): int(v) for x, v in raw['boliyapa_prizes'].items()},
+        'si_o_si_prize': int(raw.get('si_o_si_prize', 0)),
+    }
+
+def _combination_prize(config, x, with_boliyapa, extra):
+    # Prize of one 6-number sub-combination with x main matches
+    if with_boliyapa:
+        return config['boliyapa_prizes'].get(x, 0)
+    if extra and x + extra == config['k']:
+        return config['si_o_si_prize']
+    return config['prizes'].get(x, 0)
+
+def build_payout_tensor(config):
+    """
+    payouts[n, m, b, a] and tier_counts[n, m, x] for every playable n, by counting the
+    sub-combinations of each kind: C(m, x) * C(b, y) * C(a, z) * C(rest, k - x - y - z).
+    """
+    k, max_played = config['k'], max(config['cost'])
+    payouts = np.zeros((max_played + 1, k + 1, 2, max_played + 1), dtype=np.int64)
+    tier_counts = np.zeros((max_played + 1, k + 1, k + 1), dtype=np.int64)
+
+    for n in config['cost']:
+        for m in range(min(k, n) + 1):
+            for x in range(m + 1):
+                tier_counts[n, m, x] = comb(m, x, exact=True) * comb(n - m, k - x, exact=True)
+            for b in range(min(1, n - m) + 1):
+                for a in range(n - m - b + 1):
+                    rest = n - m - b - a
+                    total = 0
+                    for x in range(m + 1):
+                        for y in range(b + 1):
+                            for z in range(a + 1):
+                                others = k - x - y - z
+                                if 0 <= others <= rest:
+                                    ways = comb(m, x, exact=True) * comb(a, z, exact=True) * comb(rest, others, exact=True)
+                                    total += ways * _combination_prize(config, x, y, z)
+                    payouts[n, m, b, a] = total
+    return payouts, tier_counts
+
+def get_prize_engine(path=PRIZE_CONFIG_PATH):
+    """
+    PrizeEngine of a config file, built once per process.
+    """
+    key = os.path.abspath(path)
+    if key not in _ENGINES:
+        config = load_prize_config(path)
+        payouts, tier_counts = build_payout_tensor(config)
+        costs = np.zeros(payouts.shape[0], dtype=np.int64)
+        for n, price in config['cost'].items():
+            costs[n] = price
+        _ENGINES[key] = PrizeEngine(
+            k=config['k'],
+            min_played=min(config['cost']),
+            max_played=max(config['cost']),
+            costs=costs,
+            payouts=payouts,
+            tier_counts=tier_counts,
+        )
+    return _ENGINES[key]
+
+def draw_outcomes(ticket_mask, main_masks, boliyapa_masks, extra_masks=None):
+    """
+    (main matches, boliyapa hit, additional-ball hits) of a ticket against many draws,
+    all as bitmasks (extra_masks=None: no additional balls).
+    """
+    ticket_mask = np.uint64(ticket_mask)
+    matches = bitmask.popcount(np.asarray(main_masks, dtype=np.uint64) & ticket_mask)
+    boliyapa_hit = (np.asarray(boliyapa_masks, dtype=np.uint64) & ticket_mask) != 0
+    if extra_masks is None:
+        extra_hits = np.zeros_like(matches)
+    else:
+        extra_hits = bitmask.popcount(np.asarray(extra_masks, dtype=np.uint64) & ticket_mask)
+    return matches, boliyapa_hit.astype(np.int64), extra_hits
+
+def history_payouts(numbers, draws, boliyapa, extra_balls=None, engine=None):
+    """
+    Prize of a ticket in every real draw (main balls, boliyapa and "Sí o Sí"
+    additional balls as parsed by etl), priced with one gather.
+    """
+    engine = engine or get_prize_engine()
+    numbers = list(numbers)
+    extra_masks = None if extra_balls is None else bitmask.draws_to_masks(extra_balls)
+    matches, boliyapa_hit, extra_hits = draw_outcomes(bitmask.numbers_to_mask(numbers), bitmask.draws_to_masks(draws),
+                                                      bitmask.draws_to_masks(np.asarray(boliyapa).reshape(-1, 1)), extra_masks)
+    return engine.payout(len(numbers), matches, boliyapa_hit, extra_hits)
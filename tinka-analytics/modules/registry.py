@@ -0,0 +1,204 @@
+import os
+import glob
+import json
+import shutil
+import hashlib
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from . import analysis, etl, features
+
+# -------------------------------------------------------------------
+# REGISTRO DE MODELOS (ARTEFACTOS POR VERSIÓN DE DATOS E HIPERPARÁMETROS)
+# -------------------------------------------------------------------
+# A trained XGBoost model is saved together with its evaluation (confusion matrix,
+# ROC points, feature importances) under data/cache/models/<version>_<params hash>/,
+# so a page load with the same data and settings reads it back instead of training.
+# When draws are appended the dataset version changes; if an artifact with the same
+# settings was trained on a prefix of the current history, its booster is loaded and
+# warm_start_rounds more trees are fitted on the longer training window instead of
+# starting from zero. Its old training rows are all earlier than the new holdout.
+
+# Settings that identify an artifact (besides the dataset version)
+DEFAULT_PARAMS = {**analysis.XGB_PARAMS, 'test_size': 0.2}
+
+@dataclass
+class ModelArtifact:
+    """
+    A saved model and its evaluation on the chronological holdout.
+    source: 'registro' (read from disk), 'incremental' (warm start from parent) or 'nuevo'.
+    """
+    key: str
+    path: str
+    version: str
+    params: dict
+    n_draws: int
+    n_train: int
+    n_trees: int
+    parent: str
+    source: str
+    cm: np.ndarray
+    fpr: np.ndarray
+    tpr: np.ndarray
+    roc_auc: float
+    importances: dict
+
+    def load_model(self):
+        """
+        The trained XGBClassifier.
+        """
+        from xgboost import XGBClassifier
+
+        model = XGBClassifier()
+        model.load_model(os.path.join(self.path, 'model.json'))
+        return model
+
+    @property
+    def df_importances(self):
+        return (pd.DataFrame({'Feature': list(self.importances), 'Importancia': list(self.importances.values())})
+                .sort_values('Importancia', ascending=False, ignore_index=True))
+
+def params_key(params):
+    """
+    Short stable hash of a settings dict.
+    """
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:12]
+
+def history_hash(target):
+    """
+    Fingerprint of the draws a model was trained and evaluated on.
+    """
+    return hashlib.sha256(np.ascontiguousarray(target, dtype=bool).tobytes()).hexdigest()[:16]
+
+def _read_artifact(path, source='registro'):
+    with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+        meta = json.load(f)
+    with np.load(os.path.join(path, 'metrics.npz'), allow_pickle=False) as cached:
+        cm, fpr, tpr = cached['cm'], cached['fpr'], cached['tpr']
+        importances = dict(zip(cached['feature_names'].tolist(), cached['importances'].tolist()))
+    return ModelArtifact(
+        key=os.path.basename(path),
+        path=path,
+        version=meta['version'],
+        params=meta['params'],
+        n_draws=meta['n_draws'],
+        n_train=meta['n_train'],
+        n_trees=meta['n_trees'],
+        parent=meta['parent'],
+        source=source,
+        cm=cm,
+        fpr=fpr,
+        tpr=tpr,
+        roc_auc=meta['roc_auc'],
+        importances=importances,
+    )
+
+def _write_artifact(path, model, meta, cm, fpr, tpr, importances):
+    # Everything goes to a temporary folder that replaces the artifact at the end
+    tmp_path = path + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    model.save_model(os.path.join(tmp_path, 'model.json'))
+    with open(os.path.join(tmp_path, 'metrics.npz'), 'wb') as f:
+        np.savez(f, cm=cm, fpr=fpr, tpr=tpr, feature_names=np.array(list(importances), dtype=str),
+                 importances=np.array(list(importances.values()), dtype=float))
+    with open(os.path.join(tmp_path, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+
+def _find_parent(models_dir, settings_hash, feature_set):
+    # Artifact with the same settings trained on a prefix of the current draws (longest first)
+    candidates = []
+    for path in glob.glob(os.path.join(models_dir, f"*_{settings_hash}")):
+        try:
+            with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            continue
+        n_old = meta.get('n_draws', 0)
+        if 0 < n_old < feature_set.n_draws and meta.get('history') == history_hash(feature_set.target[:n_old]):
+            candidates.append((n_old, path))
+    return max(candidates)[1] if candidates else None
+
+def load_or_train(source=None, params=None, warm_start_rounds=25, filepath="data/tinka_data.csv", cache_dir=None):
+    """
+    ModelArtifact of the current dataset version and settings (params override
+    DEFAULT_PARAMS). Read from the registry if it exists; otherwise trained, warm
+    starting from an artifact of an earlier version when one matches, and saved.
+    Returns None if the data or XGBoost is unavailable.
+    """
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    try:
+        import xgboost  # noqa: F401
+    except ImportError:
+        return None
+    feature_set = features.load_features(source, filepath, cache_dir)
+    if feature_set is None:
+        return None
+
+    models_dir = os.path.join(os.path.dirname(etl.get_cache_paths(filepath, cache_dir)[0]), 'models')
+    settings_hash = params_key(params)
+    key = f"{feature_set.version}_{settings_hash}"
+    path = os.path.join(models_dir, key)
+
+    # 1. Same data and settings: read back
+    if os.path.exists(os.path.join(path, 'meta.json')):
+        try:
+            return _read_artifact(path)
+        except (OSError, ValueError, KeyError):
+            pass
+
+    # 2. Warm start from an earlier version of the history, or train from scratch
+    xgb_params = {k: v for k, v in params.items() if k != 'test_size'}
+    parent = _find_parent(models_dir, settings_hash, feature_set)
+    booster = None
+    if parent is not None:
+        try:
+            booster = _read_artifact(parent).load_model().get_booster()
+        except (OSError, ValueError, KeyError):
+            parent = None
+    if booster is not None:
+        xgb_params['n_estimators'] = warm_start_rounds
+    model, cm, fpr, tpr, roc_auc, importances = analysis.fit_xgb_model(feature_set, xgb_params, params['test_size'], booster)
+
+    # 3. Save, replacing the artifacts of older versions with the same settings
+    n_train = feature_set.n_draws - int(np.ceil(params['test_size'] * feature_set.n_draws))
+    meta = {
+        'version': feature_set.version,
+        'params': params,
+        'n_draws': feature_set.n_draws,
+        'n_train': n_train,
+        'n_trees': int(model.get_booster().num_boosted_rounds()),
+        'parent': os.path.basename(parent) if parent else None,
+        'history': history_hash(feature_set.target),
+        'roc_auc': float(roc_auc),
+    }
+    importances = {name: float(v) for name, v in importances.items()}
+    try:
+        os.makedirs(models_dir, exist_ok=True)
+        _write_artifact(path, model, meta, cm, fpr, tpr, importances)
+        for stale in glob.glob(os.path.join(models_dir, f"*_{settings_hash}")):
+            if stale != path:
+                shutil.rmtree(stale, ignore_errors=True)
+    except OSError:
+        pass
+
+    return ModelArtifact(
+        key=key,
+        path=path,
+        version=meta['version'],
+        params=params,
+        n_draws=meta['n_draws'],
+        n_train=n_train,
+        n_trees=meta['n_trees'],
+        parent=meta['parent'],
+        source='incremental' if parent else 'nuevo',
+        cm=cm,
+        fpr=fpr,
+        tpr=tpr,
+        roc_auc=meta['roc_auc'],
+        importances=importances,
+    )
@@ -0,0 +1,57 @@
+import numpy as np
+
+# -------------------------------------------------------------------
+# MUESTREO VECTORIZADO SIN REEMPLAZO
+# -------------------------------------------------------------------
+# Simulated draws are produced in fixed blocks of BLOCK_SIZE rows. Block b always
+# uses the child SeedSequence with spawn_key (b,), so a given seed yields the same
+# draws bit-for-bit whatever the chunk size, the number of workers or the order
+# in which the blocks are consumed.
+
+BLOCK_SIZE = 1 << 16
+
+def sample_draws(rng, n_draws, k=6, total_balls=50):
+    """
+    (n_draws x k) int8 matrix of draws of k distinct balls out of 1..total_balls.
+    Every row is an exactly uniform k-subset (in random order).
+    """
+    acceptance = np.prod((total_balls - np.arange(k)) / total_balls)
+
+    if acceptance < 0.25:
+        # Many balls per draw: the k smallest of total_balls random keys per draw
+        keys = rng.random((n_draws, total_balls), dtype=np.float32)
+        return (np.argpartition(keys, k - 1, axis=1)[:, :k] + 1).astype(np.int8)
+
+    # Few balls per draw: k uniform balls, redrawing the rows with repeats (exactly uniform)
+    draws = rng.integers(1, total_balls + 1, (n_draws, k), dtype=np.int8)
+    pending = np.arange(n_draws)
+    while len(pending):
+        ordered = np.sort(draws[pending], axis=1)
+        pending = pending[(ordered[:, 1:] == ordered[:, :-1]).any(axis=1)]
+        draws[pending] = rng.integers(1, total_balls + 1, (len(pending), k), dtype=np.int8)
+    return draws
+
+def block_rng(seed_seq, block):
+    """
+    Generator of block `block` (the same child spawn() would return, without spawning all).
+    """
+    child = np.random.SeedSequence(seed_seq.entropy, spawn_key=tuple(seed_seq.spawn_key) + (block,),
+                                   pool_size=seed_seq.pool_size)
+    return np.random.default_rng(child)
+
+def as_seed_sequence(seed):
+    """
+    SeedSequence from an int, None (fresh entropy) or an existing SeedSequence.
+    """
+    return seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+
+def iter_draws(n_draws, seed=None, k=6, total_balls=50, first_block=0):
+    """
+    Yield the n_draws simulated draws block by block (at most BLOCK_SIZE rows each),
+    so memory stays bounded for any n_draws.
+    """
+    seed_seq = as_seed_sequence(seed)
+    n_blocks = -(-n_draws // BLOCK_SIZE)
+    for b in range(n_blocks):
+        size = min(BLOCK_SIZE, n_draws - b * BLOCK_SIZE)
+        yield sample_draws(block_rng(seed_seq, first_block + b), size, k, total_balls)
@@ -1,94 +1,440 @@
+import time
+from dataclasses import dataclass
+from math import gcd
+
 import numpy as np
 import pandas as pd
-from scipy.special import comb
+import scipy.stats as stats
+
+from . import bitmask, parallel, prizes, sampler
+from .store import DrawStore
 
-def calculate_system_payout(n_played, k_matches):
+def calculate_system_payout(n_played, k_matches, boliyapa_hit=False):
     """
     Calculates the detailed payout for a System Bet (Jugada Múltiple).
     Logic: If you play N numbers and hit K winning numbers, how many sub-combinations of 6
     have 3, 4, 5, or 6 hits?
-    
+
     Formula: C(k_matches, x) * C(n_played - k_matches, 6 - x)
-    where x is the prize tier (3, 4, 5, 6).
+    where x is the prize tier (3, 4, 5, 6). Both the total and the breakdown are read
+    from the precomputed tables of the prize engine (see modules/prizes.py); with
+    boliyapa_hit the total includes the boliyapa prizes.
     """
-    if k_matches < 3:
+    engine = prizes.get_prize_engine()
+    total_winnings = int(engine.payout(n_played, k_matches, int(boliyapa_hit)))
+    if total_winnings == 0:
         return 0, {}
-    
-    # Prize Table (Per single combination)
-    prizes = {
-        3: 10,
-        4: 100,
-        5: 5000,
-        6: 4000000 # Estimated Pozo
-    }
-    
-    breakdown = {3:0, 4:0, 5:0, 6:0}
-    total_winnings = 0
-    
-    for x in [3, 4, 5, 6]:
-        # How many combinations of length 6 have exactly x hits?
-        # We need to choose x from the k matched numbers AND (6-x) from the (n-k) non-matched numbers.
-        if x <= k_matches and (6 - x) <= (n_played - k_matches):
-            ways = comb(k_matches, x, exact=True) * comb(n_played - k_matches, 6 - x, exact=True)
-            breakdown[x] = ways
-            total_winnings += ways * prizes[x]
-            
+
+    breakdown = {x: int(engine.tier_counts[n_played, k_matches, x]) for x in [3, 4, 5, 6]}
     return total_winnings, breakdown
 
-def run_simulation(user_numbers, n_simulations=10000):
+# Simulated draws carry 7 distinct balls: the 6 main balls and the boliyapa (last column)
+MAIN_BALLS = 6
+
+def _outcome_hist(is_played, block):
+    # (7 x 2) histogram of (main matches, boliyapa hit) for a block of 7-ball draws
+    codes = 2 * is_played[block[:, :MAIN_BALLS]].sum(axis=1) + is_played[block[:, MAIN_BALLS]]
+    return np.bincount(codes, minlength=2 * (MAIN_BALLS + 1)).reshape(MAIN_BALLS + 1, 2)
+
+def _count_outcomes_shard(is_played, seed_seq, first_block, n_draws, total_balls):
+    outcome_hist = np.zeros((MAIN_BALLS + 1, 2), dtype=np.int64)
+    for block in sampler.iter_draws(n_draws, seed_seq, MAIN_BALLS + 1, total_balls, first_block):
+        outcome_hist += _outcome_hist(is_played, block)
+    return outcome_hist
+
+def count_simulated_outcomes(user_numbers, n_simulations, seed=None, total_balls=50, n_jobs=1):
+    """
+    (7 x 2) histogram of (matches 0..6, boliyapa hit) between a ticket and n_simulations
+    simulated draws. Draws are generated and counted block by block (see sampler), so
+    memory stays bounded; n_jobs > 1 spreads the blocks across processes with identical results.
+    """
+    is_played = np.zeros(total_balls + 1, dtype=np.int8)
+    is_played[np.asarray(list(user_numbers), dtype=int)] = 1
+
+    # Fresh entropy (seed=None) is drawn once here and shared by every shard
+    seed_seq = sampler.as_seed_sequence(seed)
+    tasks = [(is_played, seed_seq, first_block, n_draws, total_balls)
+             for first_block, n_draws in parallel.block_shards(n_simulations, n_jobs)]
+    return parallel.merge_sum(parallel.run_tasks(_count_outcomes_shard, tasks, n_jobs))
+
+def count_simulated_matches(user_numbers, n_simulations, seed=None, total_balls=50, n_jobs=1):
+    """
+    Histogram of main matches (0..6) between a ticket and n_simulations simulated draws.
+    """
+    return count_simulated_outcomes(user_numbers, n_simulations, seed, total_balls, n_jobs).sum(axis=1)
+
+def run_simulation(user_numbers, n_simulations=10000, seed=None, n_jobs=1):
     """
     Run a vectorized Monte Carlo simulation for La Tinka.
     Args:
         user_numbers (list/set): The numbers chosen by the user (6 to 15).
         n_simulations (int): Number of simulated draws.
+        seed (int, optional): Same seed -> same draws, bit-for-bit.
+        n_jobs (int): Worker processes (-1 = all cores); does not change the result.
     """
     n_played = len(user_numbers)
     if n_played < 6 or n_played > 15:
         return None, 0, {}, 0
 
-    user_set = np.array(list(user_numbers))
-    
-    # 1. Generate Winning Numbers Matrix (n_simulations x 6)
-    rng = np.random.default_rng()
-    sim_draws = np.zeros((n_simulations, 6), dtype=int)
-    
-    for i in range(n_simulations):
-        sim_draws[i] = rng.choice(50, size=6, replace=False) + 1
-        
-    # 2. Vectorized Comparison (Count matches)
-    # Check how many of user's N numbers satisfy the 6 drawn numbers
-    matches = np.isin(sim_draws, user_set).sum(axis=1)
-    
-    # 3. Calculate Payouts per Simulation
-    total_revenue = 0
-    hit_counts = {3:0, 4:0, 5:0, 6:0}
-    
-    # Since we can have matches 0..6, we loop through unique match counts to optimize
-    unique_matches, counts = np.unique(matches, return_counts=True)
-    
-    for m, count in zip(unique_matches, counts):
-        if m >= 3:
-            payout, breakdown = calculate_system_payout(n_played, m)
-            total_revenue += payout * count
-            
-            # Aggregate "Jackpot" hits etc for simple display
-            # Note: For system bets, a "5 match" outcome might actually contain many "3 match" prizes.
-            # We track the highest tier reached per sim for the "Frequency" chart
-            hit_counts[m] = hit_counts.get(m, 0) + count
+    # 1. + 2. Simulated draws and (matches, boliyapa) per draw (batched, without a Python loop per draw)
+    outcome_hist = count_simulated_outcomes(user_numbers, n_simulations, seed, n_jobs=n_jobs)
+    match_hist = outcome_hist.sum(axis=1)
+    unique_matches = np.flatnonzero(match_hist)
+
+    # 3. Payouts of every outcome in one gather from the prize engine
+    engine = prizes.get_prize_engine()
+    total_revenue = int((outcome_hist * engine.outcome_payouts(n_played)).sum())
+
+    # Highest main tier reached per draw, for the "Frequency" chart
+    # (a system bet with 5 matches also collects many 3- and 4-match prizes)
+    hit_counts = {m: int(match_hist[m]) for m in [3, 4, 5, 6]}
 
     # 4. ROI Calculation
-    # Cost Table
-    cost_table = {
-        6: 5, 7: 35, 8: 140, 9: 420, 10: 1050, 
-        11: 2310, 12: 4620, 13: 8580, 14: 15015, 15: 25025
-    }
-    cost_per_play = cost_table.get(n_played, 5) # Fallback simplistic
-    total_cost = n_simulations * cost_per_play
-    
+    total_cost = n_simulations * int(engine.cost(n_played))
     roi_percent = ((total_revenue - total_cost) / total_cost) * 100
-    
+
     return hit_counts, roi_percent, unique_matches, total_revenue
 
+# -------------------------------------------------------------------
+# MONTE CARLO EN STREAMING (PARADA POR PRECISIÓN O TIEMPO)
+# -------------------------------------------------------------------
+# The stream consumes the same block sampler as run_simulation, so after n draws the
+# running result equals run_simulation(n_simulations=n) with the same seed. The ROI
+# estimate comes from the outcome histogram, so every update is O(1) in the draws
+# seen. The CI half-width uses the exact per-play payout variance of the ticket
+# (outcome_distribution x prize engine): the sample variance ignores tiers not hit
+# yet (the jackpot dominates it), which would stop the stream far too early.
+
+@dataclass
+class StreamUpdate:
+    """
+    Running Monte Carlo estimate after n_simulations draws.
+    roi_half_width is the half-width of the ROI confidence interval (percentage points),
+    from the exact payout variance of the ticket (tiers not observed yet included).
+    outcome_hist[m, b] counts draws with m matches and boliyapa hit b.
+    stop_reason is None until the stream ends.
+    """
+    n_simulations: int
+    outcome_hist: np.ndarray
+    total_revenue: int
+    roi_percent: float
+    roi_half_width: float
+    tier_freqs: np.ndarray
+    tier_low: np.ndarray
+    tier_high: np.ndarray
+    elapsed: float
+    stop_reason: str = None
+
+    @property
+    def match_hist(self):
+        return self.outcome_hist.sum(axis=1)
+
+    @property
+    def hit_counts(self):
+        """
+        Same layout as the hit_counts of run_simulation.
+        """
+        match_hist = self.match_hist
+        return {m: int(match_hist[m]) for m in [3, 4, 5, 6]}
+
+    @property
+    def df_tiers(self):
+        """
+        Frequency of every prize tier with its Wilson confidence interval.
+        """
+        return pd.DataFrame({
+            'Aciertos': [3, 4, 5, 6],
+            'Frecuencia': self.tier_freqs,
+            'IC_Bajo': self.tier_low,
+            'IC_Alto': self.tier_high,
+        })
+
+def _wilson_interval(successes, n, z):
+    # Wilson score interval (well-behaved for the rare tiers, including 0 successes)
+    p = successes / n
+    denom = 1 + z ** 2 / n
+    center = (p + z ** 2 / (2 * n)) / denom
+    half = z * np.sqrt(p * (1 - p) / n + z ** 2 / (4 * n ** 2)) / denom
+    return np.maximum(center - half, 0.0), np.minimum(center + half, 1.0)
+
+def stream_simulation(user_numbers, target_half_width=None, time_budget=None, max_simulations=10**7,
+                      chunk_size=8192, confidence=0.95, seed=None, total_balls=50):
+    """
+    Monte Carlo for a ticket that yields a StreamUpdate after every chunk of draws.
+    Stops when the ROI CI half-width (percentage points) reaches target_half_width,
+    when time_budget seconds have passed, or after max_simulations draws.
+    """
+    n_played = len(user_numbers)
+    if n_played < 6 or n_played > 15:
+        return
+
+    is_played = np.zeros(total_balls + 1, dtype=np.int8)
+    is_played[np.asarray(list(user_numbers), dtype=int)] = 1
+    engine = prizes.get_prize_engine()
+    payouts = engine.outcome_payouts(n_played).astype(np.float64)
+    cost = int(engine.cost(n_played))
+    z = stats.norm.ppf(0.5 + confidence / 2)
+
+    # Exact per-play payout variance (known before any draw)
+    exact_probs = outcome_distribution(n_played, total_balls, MAIN_BALLS)
+    exact_mean = float((exact_probs * payouts).sum())
+    var_pay = float((exact_probs * payouts ** 2).sum()) - exact_mean ** 2
+
+    outcome_hist = np.zeros((MAIN_BALLS + 1, 2), dtype=np.int64)
+    n_seen = 0
+    start = time.perf_counter()
+    for block in sampler.iter_draws(max_simulations, seed, MAIN_BALLS + 1, total_balls):
+        for offset in range(0, len(block), chunk_size):
+            chunk = block[offset:offset + chunk_size]
+            outcome_hist += _outcome_hist(is_played, chunk)
+            n_seen += len(chunk)
+
+            # Running mean payout per play
+            mean_pay = float((outcome_hist / n_seen * payouts).sum())
+            half_width = z * np.sqrt(var_pay / n_seen) / cost * 100
+            match_hist = outcome_hist.sum(axis=1)
+            tier_low, tier_high = _wilson_interval(match_hist[3:], n_seen, z)
+            elapsed = time.perf_counter() - start
+
+            stop_reason = None
+            if target_half_width is not None and half_width <= target_half_width:
+                stop_reason = 'precision'
+            elif time_budget is not None and elapsed >= time_budget:
+                stop_reason = 'time'
+            elif n_seen >= max_simulations:
+                stop_reason = 'max_simulations'
+
+            yield StreamUpdate(
+                n_simulations=n_seen,
+                outcome_hist=outcome_hist.copy(),
+                total_revenue=int(round(mean_pay * n_seen)),
+                roi_percent=(mean_pay - cost) / cost * 100,
+                roi_half_width=float(half_width),
+                tier_freqs=match_hist[3:] / n_seen,
+                tier_low=tier_low,
+                tier_high=tier_high,
+                elapsed=elapsed,
+                stop_reason=stop_reason,
+            )
+            if stop_reason is not None:
+                return
+
+def run_streaming_simulation(user_numbers, progress_callback=None, **kwargs):
+    """
+    Consume stream_simulation, calling progress_callback(update) after every chunk.
+    Returns the last StreamUpdate (or None for an invalid ticket).
+    """
+    update = None
+    for update in stream_simulation(user_numbers, **kwargs):
+        if progress_callback is not None:
+            progress_callback(update)
+    return update
+
+# -------------------------------------------------------------------
+# MODO ANALÍTICO (HIPERGEOMÉTRICO EXACTO)
+# -------------------------------------------------------------------
+# Playing n numbers against a draw of 6 out of 50, the number of matches m is
+# Hypergeometric(50, n, 6); the boliyapa is then one of the 44 remaining balls, so
+# it falls on the ticket with probability (n - m) / 44. The prize engine gives the
+# payout of each (m, boliyapa) outcome. Totals over S independent plays are sums of
+# S copies of that payout, obtained by convolution (FFT on the prize lattice)
+# instead of simulation.
+
+@dataclass
+class AnalyticResult:
+    """
+    Exact economics of playing a system bet of n_played numbers n_plays times.
+    outcome_probs[m, b] = P(m matches, boliyapa hit b); outcome_payouts[m, b] = its prize.
+    winnings / winnings_probs: distribution of the total prize over the n_plays
+    (probabilities below the truncation tolerance are dropped).
+    """
+    n_played: int
+    n_plays: int
+    cost_per_play: float
+    outcome_probs: np.ndarray
+    outcome_payouts: np.ndarray
+    expected_payout: float
+    payout_variance: float
+    winnings: np.ndarray
+    winnings_probs: np.ndarray
+
+    @property
+    def match_probs(self):
+        return self.outcome_probs.sum(axis=1)
+
+    @property
+    def total_cost(self):
+        return self.n_plays * self.cost_per_play
+
+    @property
+    def expected_revenue(self):
+        return self.n_plays * self.expected_payout
+
+    @property
+    def revenue_std(self):
+        return float(np.sqrt(self.n_plays * self.payout_variance))
+
+    @property
+    def expected_roi(self):
+        """
+        Expected ROI in percent (same definition as run_simulation).
+        """
+        return (self.expected_payout - self.cost_per_play) / self.cost_per_play * 100
+
+    @property
+    def roi_std(self):
+        """
+        Standard deviation of the ROI over n_plays plays, in percent.
+        """
+        return self.revenue_std / self.total_cost * 100
+
+    @property
+    def prob_profit(self):
+        """
+        P(total prize > total cost).
+        """
+        return float(self.winnings_probs[self.winnings > self.total_cost].sum())
+
+    @property
+    def df_tiers(self):
+        """
+        Probability, expected count over n_plays and payout of every match tier,
+        without and with the boliyapa.
+        """
+        match_probs = self.match_probs
+        return pd.DataFrame({
+            'Aciertos': np.arange(len(match_probs)),
+            'Probabilidad': match_probs,
+            'Esperado_en_Jugadas': self.n_plays * match_probs,
+            'Premio': self.outcome_payouts[:, 0],
+            'Prob_Boliyapa': np.divide(self.outcome_probs[:, 1], match_probs, out=np.zeros_like(match_probs), where=match_probs > 0),
+            'Premio_Boliyapa': self.outcome_payouts[:, 1],
+        })
+
+def match_distribution(n_played, total_balls=50, k=6):
+    """
+    Exact P(m matches), m = 0..k, for a ticket of n_played numbers.
+    """
+    return stats.hypergeom.pmf(np.arange(k + 1), total_balls, n_played, k)
+
+def outcome_distribution(n_played, total_balls=50, k=6):
+    """
+    Exact P(m matches, boliyapa hit b) as a (k + 1 x 2) array for a ticket of n_played numbers.
+    """
+    m = np.arange(k + 1)
+    p_boliyapa = np.clip(n_played - m, 0, None) / (total_balls - k)
+    probs = match_distribution(n_played, total_balls, k)
+    return np.stack([probs * (1 - p_boliyapa), probs * p_boliyapa], axis=1)
+
+def _lattice_unit(payouts, span, max_grid):
+    # Prize lattice step: gcd of the payouts, coarsened so that span fits in max_grid cells
+    unit = 0
+    for pay in payouts:
+        unit = gcd(unit, int(pay))
+    unit = max(unit, 1)
+    return unit * max(1, -(-int(span) // (unit * max_grid)))
+
+def _sum_distribution(probs, payouts, n_plays, unit, max_grid, tail):
+    # Distribution of the sum of n_plays iid payouts, as phi ** n_plays on a circular FFT
+    # window covering the mass. Payouts off the lattice are split linearly between their
+    # two neighbours, which keeps the mean exact.
+    pos = payouts / unit
+    low = np.floor(pos).astype(np.int64)
+    frac = pos - low
+    mean = float((probs * pos).sum())
+    std = float(np.sqrt(max((probs * (pos - mean) ** 2).sum(), 0.0)))
+    full_hi = n_plays * int(np.ceil(pos.max()))
+
+    if full_hi + 1 <= max_grid:
+        lo, width = 0, full_hi + 1
+    else:
+        # Tails beyond 40 standard deviations carry no representable mass
+        spread = 40 * np.sqrt(n_plays) * std + pos.max()
+        lo = max(0, int(n_plays * mean - spread))
+        width = min(full_hi, int(n_plays * mean + spread)) - lo + 1
+
+    size = 1 << int(np.ceil(np.log2(max(width, 2))))
+    grid = np.zeros(size)
+    np.add.at(grid, low % size, probs * (1 - frac))
+    np.add.at(grid, (low + 1) % size, probs * frac)
+    dist = np.fft.irfft(np.fft.rfft(grid) ** n_plays, n=size)
+    dist = np.clip(dist, 0.0, None)
+
+    # Unwrap the circular index to the values window [lo, lo + size)
+    values = lo + (np.arange(size) - lo) % size
+    keep = dist > tail
+    order = np.argsort(values[keep])
+    dist = dist[keep][order]
+    return values[keep][order] * unit, dist / dist.sum()
+
+def analytic_simulation(user_numbers, n_plays=10000, max_grid=1 << 20, tail=1e-14):
+    """
+    Closed-form counterpart of run_simulation: exact expected ROI, variance, tier
+    probabilities and distribution of the total prize over n_plays plays.
+    user_numbers can be the list of numbers or just how many are played (6 to 15).
+    When the prize lattice over n_plays needs more than max_grid cells it is coarsened
+    (mean-preserving), so the totals are exact up to that grid resolution.
+    """
+    n_played = user_numbers if isinstance(user_numbers, (int, np.integer)) else len(user_numbers)
+    if n_played < 6 or n_played > 15:
+        return None
+
+    # 1. Per-play (matches, boliyapa) distribution and payouts, flattened to 2 * (k + 1) outcomes
+    engine = prizes.get_prize_engine()
+    outcome_probs = outcome_distribution(n_played)
+    outcome_payouts = engine.outcome_payouts(n_played)
+    probs, payouts = outcome_probs.ravel(), outcome_payouts.ravel()
+    expected_payout = float((probs * payouts).sum())
+    payout_variance = float((probs * (payouts - expected_payout) ** 2).sum())
+
+    # 2. Number of jackpot plays J ~ Binomial(S, p6), truncated to non-negligible values
+    p6 = outcome_probs[-1].sum()
+    jackpot_pay = outcome_payouts[-1]
+    p_boliyapa = outcome_probs[-1, 1] / p6
+    j_values = np.arange(int(stats.binom.ppf(tail, n_plays, p6)), min(int(stats.binom.isf(tail, n_plays, p6)) + 1, n_plays) + 1)
+    j_probs = stats.binom.pmf(j_values, n_plays, p6)
+
+    if len(j_values) <= 16:
+        # Few possible jackpots: each one shifts the rest by a whole jackpot (with or without
+        # the boliyapa prizes), so the non-jackpot plays get their own fine lattice and J is
+        # mixed in exactly
+        rest_probs, rest_pay = outcome_probs[:-1].ravel() / (1 - p6), outcome_payouts[:-1].ravel()
+        rest_mean = (rest_probs * rest_pay).sum()
+        rest_std = np.sqrt((rest_probs * (rest_pay - rest_mean) ** 2).sum())
+        unit = _lattice_unit(rest_pay, n_plays * rest_mean + 40 * np.sqrt(n_plays) * rest_std, max_grid)
+        values, weights = [], []
+        for j, pj in zip(j_values, j_probs):
+            if pj <= tail:
+                continue
+            v, d = _sum_distribution(rest_probs, rest_pay, int(n_plays - j), unit, max_grid, tail / pj)
+            # i of the j jackpot plays also hit the boliyapa
+            i_values = np.arange(j + 1) if p_boliyapa > 0 else np.zeros(1, dtype=np.int64)
+            i_probs = stats.binom.pmf(i_values, j, p_boliyapa)
+            for i, pi in zip(i_values, i_probs):
+                if pj * pi > tail:
+                    values.append(v + (j - i) * jackpot_pay[0] + i * jackpot_pay[1])
+                    weights.append(d * pj * pi)
+        winnings, winnings_probs = np.concatenate(values), np.concatenate(weights)
+    else:
+        # Many jackpots expected: a single lattice wide enough for all of them
+        spread = 80 * np.sqrt(n_plays * payout_variance) + jackpot_pay.max()
+        unit = _lattice_unit(payouts, spread, max_grid)
+        winnings, winnings_probs = _sum_distribution(probs, payouts, n_plays, unit, max_grid, tail)
+
+    order = np.argsort(winnings, kind='stable')
+
+    return AnalyticResult(
+        n_played=n_played,
+        n_plays=n_plays,
+        cost_per_play=int(engine.cost(n_played)),
+        outcome_probs=outcome_probs,
+        outcome_payouts=outcome_payouts,
+        expected_payout=expected_payout,
+        payout_variance=payout_variance,
+        winnings=winnings[order],
+        winnings_probs=winnings_probs[order] / winnings_probs.sum(),
+    )
+
 def get_kelly_criterion(win_prob, payout_ratio):
     """
     Calculates Kelly Criterion optimal bet size.
@@ -107,64 +453,201 @@ def get_kelly_criterion(win_prob, payout_ratio):
     f_star = (b * win_prob - q) / b
     return max(0, f_star) # No shorting the lottery
 
-def simulate_capital_growth(initial_capital, n_steps, win_prob, payout_ratio, strategy='kelly'):
+def simulate_capital_growth(initial_capital, n_steps, win_prob, payout_ratio, strategy='kelly', seed=None):
     """
     Simulates capital growth over n steps using Kelly or Fixed betting.
+    The whole path is computed at once (cumulative product / sum); seed makes it reproducible.
     """
-    capital = [initial_capital]
     f_star = get_kelly_criterion(win_prob, payout_ratio)
-    
-    for _ in range(n_steps):
-        current_cap = capital[-1]
-        
-        if strategy == 'kelly':
-            bet_size = current_cap * f_star
-        elif strategy == 'fixed':
-            bet_size = current_cap * 0.05 # 5% fixed
-        else:
-            bet_size = 5 # Fixed $5
-            
-        # Hard stop if ruin
-        if current_cap <= 0:
-            capital.append(0)
-            continue
-            
-        win = np.random.random() < win_prob
-        
-        if win:
-            new_cap = current_cap + (bet_size * payout_ratio)
-        else:
-            new_cap = current_cap - bet_size
-            
-        capital.append(new_cap)
-        
-    return capital
+    rng = np.random.default_rng(seed)
+    win = rng.random(n_steps) < win_prob
+
+    if strategy in ('kelly', 'fixed'):
+        # Proportional bets: every step multiplies the capital
+        fraction = f_star if strategy == 'kelly' else 0.05 # 5% fixed
+        factors = np.where(win, 1 + fraction * payout_ratio, 1 - fraction)
+        path = initial_capital * np.cumprod(factors)
+    else:
+        # Fixed $5 bet: every step adds or subtracts
+        path = initial_capital + np.cumsum(np.where(win, 5 * payout_ratio, -5.0))
 
-def run_ab_test_simulator(freq_df, n_future_draws=500):
+    # Hard stop if ruin: after the first step at or below 0 the capital stays at 0
+    ruined = np.maximum.accumulate(np.concatenate([[initial_capital <= 0], path[:-1] <= 0]))
+    path = np.where(ruined, 0.0, path)
+
+    return [initial_capital] + path.tolist()
+
+# -------------------------------------------------------------------
+# ENSAMBLE DE TRAYECTORIAS DE CAPITAL
+# -------------------------------------------------------------------
+# All paths of all strategies advance together, one vectorized step at a time, and
+# share the same win/loss sequence per path (common random numbers), so strategy
+# differences are not blurred by sampling noise. Only per-step summaries are kept.
+
+CAPITAL_STRATEGIES = {
+    'kelly': 'Kelly (f*)',
+    'half_kelly': 'Medio Kelly (f*/2)',
+    'fixed': 'Fijo 5% del Capital',
+    'flat': 'Monto Fijo $5',
+}
+
+@dataclass
+class CapitalEnsemble:
+    """
+    Per-step summaries of n_paths capital paths for each strategy.
+    quantiles[s, t, q] is the quantile_levels[q] quantile of the capital of strategy s
+    after t steps; ruin_prob[s, t] the fraction of paths ruined by step t;
+    ruin_times[s, t] how many paths were ruined exactly at step t.
+    paths[label] holds the full (n_steps + 1 x n_paths) paths only if requested.
+    """
+    strategies: list
+    labels: list
+    n_paths: int
+    n_steps: int
+    quantile_levels: np.ndarray
+    quantiles: np.ndarray
+    mean: np.ndarray
+    ruin_prob: np.ndarray
+    ruin_times: np.ndarray
+    paths: dict = None
+
+    @property
+    def df_bands(self):
+        """
+        Long format (Estrategia, Paso, Media, Q_<level>...) for plotting.
+        """
+        frames = []
+        for s, label in enumerate(self.labels):
+            df = pd.DataFrame({'Estrategia': label, 'Paso': np.arange(self.n_steps + 1), 'Media': self.mean[s],
+                               'Prob_Ruina': self.ruin_prob[s]})
+            for q, level in enumerate(self.quantile_levels):
+                df[f'Q_{level:g}'] = self.quantiles[s, :, q]
+            frames.append(df)
+        return pd.concat(frames, ignore_index=True)
+
+    @property
+    def df_summary(self):
+        """
+        Final median, mean and ruin probability of every strategy.
+        """
+        median_col = int(np.argmin(np.abs(self.quantile_levels - 0.5)))
+        return pd.DataFrame({
+            'Estrategia': self.labels,
+            'Capital_Mediano_Final': self.quantiles[:, -1, median_col],
+            'Capital_Medio_Final': self.mean[:, -1],
+            'Prob_Ruina_Final': self.ruin_prob[:, -1],
+        })
+
+def _bet_rule(strategy, f_star):
+    # (fraction of capital, fixed amount) bet by a strategy
+    if isinstance(strategy, (int, float, np.floating)):
+        return float(strategy), 0.0
+    rules = {'kelly': (f_star, 0.0), 'half_kelly': (f_star / 2, 0.0), 'fixed': (0.05, 0.0), 'flat': (0.0, 5.0)}
+    if strategy not in rules:
+        raise ValueError(f"Estrategia desconocida: {strategy}")
+    return rules[strategy]
+
+def simulate_capital_ensemble(initial_capital, n_steps, win_prob, payout_ratio, strategies=('kelly', 'fixed'),
+                              n_paths=100000, seed=None, quantile_levels=(0.05, 0.25, 0.5, 0.75, 0.95),
+                              ruin_fraction=0.01, keep_paths=False):
+    """
+    Many capital paths per strategy advanced in lock-step as arrays.
+
+    strategies: names in CAPITAL_STRATEGIES or floats (fraction of capital bet each step).
+    A path is ruined once its capital falls to ruin_fraction * initial_capital or below
+    (0 means only an actual loss of everything); it then stays at 0, as in simulate_capital_growth.
+    Memory is O(n_strategies x n_paths) plus the per-step summaries, unless keep_paths.
+    """
+    f_star = get_kelly_criterion(win_prob, payout_ratio)
+    strategies = list(strategies)
+    labels = [CAPITAL_STRATEGIES.get(s, f"Fijo {s:.1%} del Capital" if not isinstance(s, str) else s) for s in strategies]
+    rules = np.array([_bet_rule(s, f_star) for s in strategies])
+    fraction, amount = rules[:, 0:1], rules[:, 1:2]
+    levels = np.asarray(quantile_levels, dtype=float)
+    ruin_level = ruin_fraction * initial_capital
+
+    n_strat = len(strategies)
+    capital = np.full((n_strat, n_paths), float(initial_capital))
+    ruined = np.zeros((n_strat, n_paths), dtype=bool)
+    quantiles = np.empty((n_strat, n_steps + 1, len(levels)))
+    mean = np.empty((n_strat, n_steps + 1))
+    ruin_prob = np.zeros((n_strat, n_steps + 1))
+    ruin_times = np.zeros((n_strat, n_steps + 1), dtype=np.int64)
+    paths = {label: np.empty((n_steps + 1, n_paths)) for label in labels} if keep_paths else None
+
+    def record(t):
+        quantiles[:, t] = np.quantile(capital, levels, axis=1).T
+        mean[:, t] = capital.mean(axis=1)
+        ruin_prob[:, t] = ruined.mean(axis=1)
+        if keep_paths:
+            for s, label in enumerate(labels):
+                paths[label][t] = capital[s]
+
+    record(0)
+    rng = np.random.default_rng(seed)
+    for t in range(1, n_steps + 1):
+        # 1. Same outcome for every strategy on a given path
+        win = rng.random(n_paths) < win_prob
+
+        # 2. Bet and settle every live path at once
+        bet = capital * fraction + amount
+        capital = np.where(win, capital + bet * payout_ratio, capital - bet)
+
+        # 3. Ruin is absorbing
+        newly = ~ruined & (capital <= ruin_level)
+        ruin_times[:, t] = newly.sum(axis=1)
+        ruined |= newly
+        capital[ruined] = 0.0
+        record(t)
+
+    return CapitalEnsemble(
+        strategies=strategies,
+        labels=labels,
+        n_paths=n_paths,
+        n_steps=n_steps,
+        quantile_levels=levels,
+        quantiles=quantiles,
+        mean=mean,
+        ruin_prob=ruin_prob,
+        ruin_times=ruin_times,
+        paths=paths,
+    )
+
+def get_hot_numbers(freq_df, k=6):
+    """
+    Top-k most drawn balls, from the frequency table or straight from a DrawStore.
+    """
+    if isinstance(freq_df, DrawStore):
+        counts = freq_df.ball_counts()
+        return np.argsort(-counts, kind='stable')[:k] + 1
+    return freq_df.sort_values(by='Frecuencia', ascending=False).head(k)['Numero'].astype(int).values
+
+def _ab_test_shard(hot_mask, draws_seq, picks_seq, first_block, n_draws):
+    future_masks = np.concatenate([bitmask.draws_to_masks(b) for b in sampler.iter_draws(n_draws, draws_seq, 6, 50, first_block)])
+    pick_masks = np.concatenate([bitmask.draws_to_masks(b) for b in sampler.iter_draws(n_draws, picks_seq, 6, 50, first_block)])
+    return {
+        'hot': bitmask.count_matches(future_masks, hot_mask),
+        'random': bitmask.popcount(future_masks & pick_masks),
+    }
+
+def run_ab_test_simulator(freq_df, n_future_draws=500, seed=None, n_jobs=1):
     """
     Returns A/B test sequence comparing picking top 6 hot numbers vs random picks.
+    freq_df can also be a DrawStore (zero-copy).
+    Future draws and random picks come from two independent seeded streams, so the
+    result depends only on seed (not on n_jobs).
     """
-    top_6 = freq_df.sort_values(by='Frecuencia', ascending=False).head(6)['Numero'].astype(int).values
+    top_6 = get_hot_numbers(freq_df, 6)
+    hot_mask = bitmask.numbers_to_mask(top_6)
     
-    hot_hits = []
-    random_hits = []
-    
-    # Vectorized future draws
-    random_matrix = np.random.rand(n_future_draws, 50)
-    future_draws = np.argsort(random_matrix, axis=1)[:, :6] + 1
-    
-    for draw in future_draws:
-        # A strategy: Top 6 Hot Numbers
-        hits_a = len(np.intersect1d(draw, top_6))
-        hot_hits.append(hits_a)
-        
-        # B strategy: Fully Random Pick
-        random_pick = np.random.choice(range(1, 51), 6, replace=False)
-        hits_b = len(np.intersect1d(draw, random_pick))
-        random_hits.append(hits_b)
+    # A strategy: Top 6 Hot Numbers / B strategy: Fully Random Pick, per future draw
+    draws_seq, picks_seq = sampler.as_seed_sequence(seed).spawn(2)
+    tasks = [(hot_mask, draws_seq, picks_seq, first_block, n_draws)
+             for first_block, n_draws in parallel.block_shards(n_future_draws, n_jobs)]
+    hits = parallel.merge_concat(parallel.run_tasks(_ab_test_shard, tasks, n_jobs))
         
     return pd.DataFrame({
         'Draw': range(1, n_future_draws + 1),
-        'Hot_Strategy_Hits': hot_hits,
-        'Random_Strategy_Hits': random_hits
+        'Hot_Strategy_Hits': hits['hot'],
+        'Random_Strategy_Hits': hits['random']
     })
@@ -0,0 +1,160 @@
+import os
+import json
+import shutil
+import tempfile
+import numpy as np
+
+from . import bitmask
+
+# -------------------------------------------------------------------
+# ALMACÉN COMPARTIDO (MEMORY-MAPPED)
+# -------------------------------------------------------------------
+# Every dataset version gets its own folder of .npy files. Readers map them with
+# mmap_mode='r', so all Streamlit sessions and API workers on a machine share the
+# same pages of the OS file cache instead of holding one pandas copy each.
+# A published version folder is never written again: a new version is written into
+# a private temporary folder and renamed into place, so a file someone has mapped
+# is never truncated or rewritten under them.
+
+STORE_ARRAYS = ['draws', 'incidence', 'masks', 'dates', 'sorteos', 'boliyapa', 'extra_balls']
+CURRENT_FILE = 'current.json'
+TMP_PREFIX = '.tmp-'
+
+# tempfile creates private (0o700 / 0o600) entries; published ones must be readable
+# by every process that shares the store, whichever user it runs as
+DIR_MODE = 0o755
+FILE_MODE = 0o644
+
+# Mapped stores already opened by this process, keyed by (store_dir, version)
+_OPEN_STORES = {}
+
+class DrawStore:
+    """
+    Read-only, memory-mapped view of the modern-era draws.
+    All arrays are aligned row-by-row in chronological order.
+    """
+
+    def __init__(self, version, draws, incidence, masks, dates, sorteos, boliyapa, extra_balls):
+        self.version = version
+        self.draws = draws              # (n_draws x 6) int8
+        self.incidence = incidence      # (n_draws x 50) bool
+        self.masks = masks              # (n_draws,) uint64
+        self.dates = dates              # (n_draws,) datetime64[D]
+        self.sorteos = sorteos          # (n_draws,) int64
+        self.boliyapa = boliyapa        # (n_draws,) int8, 0 = missing
+        self.extra_balls = extra_balls  # (n_draws x max_extra) int8 "Sí o Sí" balls, 0 = missing
+
+    def __len__(self):
+        return len(self.draws)
+
+    @property
+    def total_balls(self):
+        return self.incidence.shape[1]
+
+    def ball_counts(self):
+        """
+        Times each ball 1..total_balls has been drawn.
+        """
+        return self.incidence.sum(axis=0)
+
+def get_store_version(store_dir):
+    """
+    Dataset version currently published in store_dir, or None.
+    """
+    try:
+        with open(os.path.join(store_dir, CURRENT_FILE)) as f:
+            return json.load(f)['version']
+    except (OSError, ValueError, KeyError):
+        return None
+
+def write_store(store_dir, version, df_draws, draws, total_balls=bitmask.TOTAL_BALLS, boliyapa=None, extra_balls=None):
+    """
+    Publish a new version of the store (boliyapa / extra_balls as parsed by
+    etl.parse_extra_balls; missing = no extra balls). The arrays are written to a temporary folder
+    that is renamed to the version folder only if no complete copy exists yet, and the
+    pointer file is swapped atomically, so open readers are never disturbed.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    version_dir = os.path.join(store_dir, version)
+
+    arrays = {
+        'draws': np.ascontiguousarray(draws, dtype=np.int8),
+        'incidence': bitmask.draws_to_incidence(draws, total_balls),
+        'masks': bitmask.draws_to_masks(draws),
+        'dates': df_draws['Fecha_dt'].to_numpy(dtype='datetime64[D]'),
+        'sorteos': df_draws['Sorteo'].to_numpy(dtype=np.int64),
+        'boliyapa': np.zeros(len(draws), dtype=np.int8) if boliyapa is None else np.asarray(boliyapa, dtype=np.int8),
+        'extra_balls': np.zeros((len(draws), 0), dtype=np.int8) if extra_balls is None else np.asarray(extra_balls, dtype=np.int8),
+    }
+
+    # 1. Write into a private folder, then move it into place (a rename never
+    #    replaces a non-empty folder: if another writer got there first, its copy stays)
+    tmp_dir = tempfile.mkdtemp(prefix=TMP_PREFIX, dir=store_dir)
+    try:
+        for name, values in arrays.items():
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), values)
+            os.chmod(os.path.join(tmp_dir, f"{name}.npy"), FILE_MODE)
+        os.chmod(tmp_dir, DIR_MODE)
+        if os.path.isdir(version_dir) and not _is_complete(version_dir):
+            # Leftover of an interrupted write: unlinking keeps any mapped pages alive
+            _discard(store_dir, version_dir)
+        try:
+            os.rename(tmp_dir, version_dir)
+        except OSError:
+            if not _is_complete(version_dir):
+                raise
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    # 2. Swap the pointer file
+    fd, tmp_path = tempfile.mkstemp(prefix=TMP_PREFIX, dir=store_dir)
+    with os.fdopen(fd, 'w') as f:
+        json.dump({'version': version, 'n_draws': int(len(draws))}, f)
+    os.chmod(tmp_path, FILE_MODE)
+    os.replace(tmp_path, os.path.join(store_dir, CURRENT_FILE))
+
+    _prune_versions(store_dir, keep=version)
+
+def _is_complete(version_dir):
+    # Every array present, readable and with the same number of rows
+    try:
+        lengths = {len(np.load(os.path.join(version_dir, f"{name}.npy"), mmap_mode='r')) for name in STORE_ARRAYS}
+    except (OSError, ValueError):
+        return False
+    return len(lengths) == 1
+
+def _discard(store_dir, path):
+    # Move a folder out of the way atomically, then delete it
+    trash = tempfile.mkdtemp(prefix=TMP_PREFIX, dir=store_dir)
+    os.rename(path, os.path.join(trash, 'old'))
+    shutil.rmtree(trash, ignore_errors=True)
+
+def _prune_versions(store_dir, keep):
+    # Processes that still map an old version keep their pages until they reopen
+    for name in os.listdir(store_dir):
+        path = os.path.join(store_dir, name)
+        # Temporary folders belong to writers still in progress
+        if name != keep and not name.startswith(TMP_PREFIX) and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+
+def open_store(store_dir):
+    """
+    Map the current version of the store (zero-copy, read-only).
+    Returns a DrawStore, or None if nothing has been published yet.
+    """
+    version = get_store_version(store_dir)
+    if version is None:
+        return None
+
+    key = (os.path.abspath(store_dir), version)
+    if key not in _OPEN_STORES:
+        version_dir = os.path.join(store_dir, version)
+        try:
+            arrays = {name: np.load(os.path.join(version_dir, f"{name}.npy"), mmap_mode='r') for name in STORE_ARRAYS}
+        except (OSError, ValueError):
+            return None
+        for stale in [k for k in _OPEN_STORES if k[0] == key[0]]:
+            del _OPEN_STORES[stale]
+        _OPEN_STORES[key] = DrawStore(version, **arrays)
+
+    return _OPEN_STORES[key]
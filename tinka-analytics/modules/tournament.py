@@ -0,0 +1,197 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import scipy.stats as stats
+
+from . import analysis, bitmask, exact, parallel, sampler
+
+# -------------------------------------------------------------------
+# TORNEO DE ESTRATEGIAS (MUCHAS RÉPLICAS DEL FUTURO)
+# -------------------------------------------------------------------
+# Every strategy plays the same simulated future draws. Strategies with a fixed
+# ticket are scored all at once as incidence(draws) @ indicator(tickets).T; strategies
+# that pick a new ticket every draw (random, sum-centered) are scored by popcount.
+# Significance is a paired test against the random strategy on the same draws,
+# corrected for multiple comparisons with Holm-Bonferroni.
+
+TOURNAMENT_STRATEGIES = {
+    'hot': 'Calientes (Top 6 Frecuencia)',
+    'cold': 'Fríos (Menor Frecuencia)',
+    'overdue': 'Más Atrasados (Z-Score de Retraso)',
+    'sum_centered': 'Suma Centrada (Rango Intercuartil)',
+    'random': 'Azar Puro',
+}
+
+BASELINE = 'random'
+
+@dataclass
+class TournamentResult:
+    """
+    Hits of every strategy over n_replicates futures of n_future_draws draws each.
+    hit_hist[s, m] counts draws with m matches; replicate_means[s, r] is the mean hits
+    of strategy s in replicate r.
+    """
+    strategies: list
+    tickets: dict
+    n_replicates: int
+    n_future_draws: int
+    hit_hist: np.ndarray
+    replicate_means: np.ndarray
+    expected_hits: float
+
+    @property
+    def labels(self):
+        return [TOURNAMENT_STRATEGIES[s] for s in self.strategies]
+
+    @property
+    def df_hits(self):
+        """
+        Hit distribution (share of draws with 0..6 matches) per strategy.
+        """
+        probs = self.hit_hist / self.hit_hist.sum(axis=1, keepdims=True)
+        df = pd.DataFrame(probs, columns=[f'{m} Aciertos' for m in range(probs.shape[1])])
+        df.insert(0, 'Estrategia', self.labels)
+        return df
+
+    @property
+    def df_summary(self):
+        """
+        Mean hits with a 95% CI, P(3+ hits), and the Holm-corrected paired test
+        against the random strategy (computed across replicates).
+        """
+        n_draws = self.hit_hist.sum(axis=1)
+        mean_hits = (self.hit_hist * np.arange(self.hit_hist.shape[1])).sum(axis=1) / n_draws
+        se = self.replicate_means.std(axis=1, ddof=1) / np.sqrt(self.n_replicates)
+        base = self.strategies.index(BASELINE) if BASELINE in self.strategies else None
+
+        p_values = np.full(len(self.strategies), np.nan)
+        diffs = np.full(len(self.strategies), np.nan)
+        if base is not None and self.n_replicates > 1:
+            for s in range(len(self.strategies)):
+                if s == base:
+                    continue
+                delta = self.replicate_means[s] - self.replicate_means[base]
+                diffs[s] = delta.mean()
+                p_values[s] = stats.ttest_1samp(delta, 0.0).pvalue if delta.std() > 0 else 1.0
+
+        return pd.DataFrame({
+            'Estrategia': self.labels,
+            'Ticket': ['-'.join(str(n) for n in self.tickets[s]) if self.tickets.get(s) is not None else 'Nuevo en cada sorteo'
+                       for s in self.strategies],
+            'Media_Aciertos': mean_hits,
+            'IC_Bajo': mean_hits - 1.96 * se,
+            'IC_Alto': mean_hits + 1.96 * se,
+            'Prob_3_Mas': self.hit_hist[:, 3:].sum(axis=1) / n_draws,
+            'Diferencia_vs_Azar': diffs,
+            'P_Valor': p_values,
+            'P_Holm': holm_correction(p_values),
+        })
+
+def holm_correction(p_values):
+    """
+    Holm-Bonferroni adjusted p-values (NaN entries are left out and stay NaN).
+    """
+    p_values = np.asarray(p_values, dtype=float)
+    adjusted = np.full_like(p_values, np.nan)
+    valid = np.flatnonzero(~np.isnan(p_values))
+    if len(valid) == 0:
+        return adjusted
+    order = valid[np.argsort(p_values[valid], kind='stable')]
+    m = len(order)
+    running = np.maximum.accumulate((m - np.arange(m)) * p_values[order])
+    adjusted[order] = np.minimum(running, 1.0)
+    return adjusted
+
+def strategy_tickets(source, current_sorteo_max=None, k=6, total_balls=50):
+    """
+    Fixed tickets of the history-based strategies, from df_exploded or a DrawStore.
+    """
+    df_freq, _, _ = analysis.get_frequency_analysis(source)
+    counts = np.zeros(total_balls, dtype=np.int64)
+    counts[df_freq['Numero'].astype(int).to_numpy() - 1] = df_freq['Frecuencia'].to_numpy()
+
+    df_gaps, _ = analysis.get_gap_metrics(source, current_sorteo_max, total_balls)
+    overdue = df_gaps.sort_values('Z_Score', ascending=False, kind='stable')['Numero'].astype(int).head(k)
+
+    return {
+        'hot': sorted((np.argsort(-counts, kind='stable')[:k] + 1).tolist()),
+        'cold': sorted((np.argsort(counts, kind='stable')[:k] + 1).tolist()),
+        'overdue': sorted(overdue.tolist()),
+    }
+
+def _sum_centered_draws(rng, n_rows, band, k, total_balls):
+    # Random tickets whose sum lies in the central band of the exact sum distribution
+    tickets = sampler.sample_draws(rng, n_rows, k, total_balls)
+    pending = np.arange(n_rows)
+    while len(pending):
+        sums = tickets[pending].sum(axis=1, dtype=np.int64)
+        pending = pending[(sums < band[0]) | (sums > band[1])]
+        tickets[pending] = sampler.sample_draws(rng, len(pending), k, total_balls)
+    return tickets
+
+def _tournament_chunk(seed_seq, n_replicates, n_future_draws, strategies, fixed_matrix, sum_band, k, total_balls):
+    rng = np.random.default_rng(seed_seq)
+    n_rows = n_replicates * n_future_draws
+    future = sampler.sample_draws(rng, n_rows, k, total_balls)
+
+    hits = np.empty((len(strategies), n_rows), dtype=np.int64)
+    fixed = [s for s in strategies if s not in ('random', 'sum_centered')]
+    if fixed:
+        # Matrix membership counts for every fixed ticket at once
+        incidence = bitmask.draws_to_incidence(future, total_balls).astype(np.float32)
+        fixed_hits = np.rint(incidence @ fixed_matrix.T).astype(np.int64)
+        for i, s in enumerate(fixed):
+            hits[strategies.index(s)] = fixed_hits[:, i]
+
+    future_masks = bitmask.draws_to_masks(future)
+    if 'random' in strategies:
+        picks = sampler.sample_draws(rng, n_rows, k, total_balls)
+        hits[strategies.index('random')] = bitmask.popcount(future_masks & bitmask.draws_to_masks(picks))
+    if 'sum_centered' in strategies:
+        picks = _sum_centered_draws(rng, n_rows, sum_band, k, total_balls)
+        hits[strategies.index('sum_centered')] = bitmask.popcount(future_masks & bitmask.draws_to_masks(picks))
+
+    hit_hist = np.stack([np.bincount(h, minlength=k + 1) for h in hits])
+    replicate_means = hits.reshape(len(strategies), n_replicates, n_future_draws).mean(axis=2)
+    return hit_hist, replicate_means
+
+def run_tournament(source, current_sorteo_max=None, n_future_draws=500, n_replicates=200, strategies=None,
+                   seed=None, chunk_size=50, n_jobs=1, k=6, total_balls=50):
+    """
+    Score every strategy on n_replicates independent futures of n_future_draws draws.
+    source: df_exploded or DrawStore (history used to build the hot / cold / overdue tickets).
+    Replicates run in chunks of chunk_size with spawned seeds, so the result depends only
+    on seed (not on n_jobs).
+    """
+    strategies = list(strategies or TOURNAMENT_STRATEGIES.keys())
+    unknown = [s for s in strategies if s not in TOURNAMENT_STRATEGIES]
+    if unknown:
+        raise ValueError(f"Estrategias desconocidas: {', '.join(map(str, unknown))}. "
+                         f"Opciones válidas: {', '.join(TOURNAMENT_STRATEGIES)}.")
+    tickets = strategy_tickets(source, current_sorteo_max, k, total_balls)
+    tickets = {s: tickets.get(s) for s in strategies}
+
+    fixed = [s for s in strategies if tickets[s] is not None]
+    fixed_matrix = np.zeros((len(fixed), total_balls), dtype=np.float32)
+    for i, s in enumerate(fixed):
+        fixed_matrix[i, np.asarray(tickets[s]) - 1] = 1.0
+
+    sum_dist = exact.get_tables(total_balls, k).suma
+    sum_band = (int(sum_dist.ppf(0.25)), int(sum_dist.ppf(0.75)))
+
+    n_chunks = -(-n_replicates // chunk_size)
+    sizes = [min(chunk_size, n_replicates - i * chunk_size) for i in range(n_chunks)]
+    tasks = [(s, size, n_future_draws, strategies, fixed_matrix, sum_band, k, total_balls)
+             for s, size in zip(parallel.spawn_seeds(seed, n_chunks), sizes)]
+    chunks = parallel.run_tasks(_tournament_chunk, tasks, n_jobs)
+
+    return TournamentResult(
+        strategies=strategies,
+        tickets=tickets,
+        n_replicates=n_replicates,
+        n_future_draws=n_future_draws,
+        hit_hist=parallel.merge_sum([c[0] for c in chunks]),
+        replicate_means=np.concatenate([c[1] for c in chunks], axis=1),
+        expected_hits=k * k / total_balls,
+    )
@@ -0,0 +1,156 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import scipy.stats as stats
+
+from . import analysis, parallel
+
+# -------------------------------------------------------------------
+# VALIDACIÓN CRUZADA TEMPORAL (ORIGEN MÓVIL, FOLDS EN PARALELO)
+# -------------------------------------------------------------------
+# A single chronological holdout gives one noisy AUC. Here the draws after the
+# first min_train are cut into n_folds consecutive test blocks; fold i trains on
+# every draw before its block (a growing window) and is scored on the block, so no
+# fold ever sees its own future. Folds are independent fits on slices of the same
+# cached FeatureSet and run in a process pool; each worker gets an explicit XGBoost
+# thread budget (cores // workers) so processes and threads never oversubscribe.
+# Per-fold AUC and log-loss are summarised with t-based confidence intervals and
+# compared, fold by fold, with a random scorer and a constant base-rate predictor.
+
+@dataclass
+class CVResult:
+    """
+    One entry per fold: first test sorteo, train / test sizes, and the model's
+    AUC and log-loss next to the random baseline (random-score AUC, base-rate log-loss).
+    """
+    origins: np.ndarray
+    n_train: np.ndarray
+    n_test: np.ndarray
+    auc: np.ndarray
+    log_loss: np.ndarray
+    random_auc: np.ndarray
+    base_log_loss: np.ndarray
+    n_threads: int
+    n_workers: int
+
+    @property
+    def n_folds(self):
+        return len(self.auc)
+
+    @property
+    def df_folds(self):
+        return pd.DataFrame({
+            'Fold': np.arange(1, self.n_folds + 1),
+            'Sorteo_Origen': self.origins,
+            'Sorteos_Entrenamiento': self.n_train,
+            'Sorteos_Prueba': self.n_test,
+            'AUC': self.auc,
+            'AUC_Azar': self.random_auc,
+            'Log_Loss': self.log_loss,
+            'Log_Loss_Base': self.base_log_loss,
+        })
+
+    @property
+    def df_summary(self):
+        """
+        Mean of each metric with a 95% t interval, and the paired fold-by-fold test
+        of the model against its baseline.
+        """
+        rows = []
+        for name, model, baseline in (('AUC', self.auc, self.random_auc), ('Log_Loss', self.log_loss, self.base_log_loss)):
+            low, high = t_interval(model)
+            delta = model - baseline
+            p_value = stats.ttest_1samp(delta, 0.0).pvalue if self.n_folds > 1 and delta.std() > 0 else np.nan
+            rows.append({
+                'Metrica': name,
+                'Modelo': model.mean(),
+                'IC_Bajo': low,
+                'IC_Alto': high,
+                'Azar': baseline.mean(),
+                'Diferencia': delta.mean(),
+                'P_Valor': p_value,
+            })
+        return pd.DataFrame(rows)
+
+def t_interval(values, confidence=0.95):
+    """
+    (low, high) Student-t confidence interval of the mean of values.
+    """
+    values = np.asarray(values, dtype=float)
+    mean = values.mean()
+    if len(values) < 2:
+        return mean, mean
+    half = stats.t.ppf(0.5 + confidence / 2, len(values) - 1) * values.std(ddof=1) / np.sqrt(len(values))
+    return mean - half, mean + half
+
+def rolling_origin_folds(n_draws, n_folds=20, min_train=None):
+    """
+    (train_end, test_end) draw indices of every fold: train on [0, train_end),
+    test on [train_end, test_end). The test blocks tile the draws after min_train
+    (default: the first half of the history).
+    """
+    min_train = n_draws // 2 if min_train is None else min_train
+    if n_folds < 1 or n_draws - min_train < n_folds:
+        raise ValueError(f"No hay suficientes sorteos para {n_folds} folds después de {min_train} de entrenamiento.")
+    bounds = np.linspace(min_train, n_draws, n_folds + 1).round().astype(int)
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:])]
+
+def _binary_log_loss(y, p):
+    p = np.clip(p, 1e-15, 1 - 1e-15)
+    return float(-np.mean(y * np.log(p) + (1 - y) * np.log(1 - p)))
+
+def _cv_fold(features, target, train_end, params, n_threads, seed_seq):
+    from xgboost import XGBClassifier
+    from sklearn.metrics import roc_auc_score
+
+    n_features = features.shape[2]
+    X_train, y_train = features[:train_end].reshape(-1, n_features), target[:train_end].reshape(-1).astype(np.int8)
+    X_test, y_test = features[train_end:].reshape(-1, n_features), target[train_end:].reshape(-1).astype(np.int8)
+
+    # 1. Same model as analysis.fit_xgb_model, limited to this worker's threads
+    weight = (len(y_train) - y_train.sum()) / y_train.sum()
+    model = XGBClassifier(eval_metric='logloss', scale_pos_weight=weight, n_jobs=n_threads, **params)
+    model.fit(X_train, y_train)
+
+    # 2. Undo the class reweighting (it multiplies the odds by weight) before the log-loss
+    p = model.predict_proba(X_test)[:, 1]
+    p = p / (p + weight * (1 - p))
+
+    # 3. Baselines: random scores, and the training base rate for every sample
+    rng = np.random.default_rng(seed_seq)
+    base_rate = y_train.mean()
+    return (roc_auc_score(y_test, p), _binary_log_loss(y_test, p),
+            roc_auc_score(y_test, rng.random(len(y_test))), _binary_log_loss(y_test, np.full(len(y_test), base_rate)))
+
+def run_time_series_cv(source, n_folds=20, min_train=None, params=None, seed=None, n_jobs=-1):
+    """
+    Rolling-origin cross-validation of the XGBoost classifier.
+    source: df_exploded or DrawStore (features from analysis.get_ml_features).
+    params override analysis.XGB_PARAMS. Folds run on n_jobs processes (-1 = all
+    cores), each with cores // processes XGBoost threads; seed fixes the random baseline.
+    """
+    params = {**analysis.XGB_PARAMS, **(params or {})}
+    feature_set = analysis.get_ml_features(source)
+    folds = rolling_origin_folds(feature_set.n_draws, n_folds, min_train)
+
+    # 1. Processes first (folds are independent), the remaining cores as threads per fold
+    n_workers = min(parallel.resolve_jobs(n_jobs), len(folds))
+    n_threads = parallel.thread_budget(n_workers)
+
+    # 2. Each task only ships the draws its fold can see
+    tasks = [(feature_set.features[:test_end], feature_set.target[:test_end], train_end, params, n_threads, s)
+             for (train_end, test_end), s in zip(folds, parallel.spawn_seeds(seed, len(folds)))]
+    auc, log_loss, random_auc, base_log_loss = (np.array(m) for m in zip(*parallel.run_tasks(_cv_fold, tasks, n_workers)))
+
+    return CVResult(
+        origins=np.asarray(feature_set.sorteos)[[train_end for train_end, _ in folds]],
+        n_train=np.array([train_end for train_end, _ in folds]),
+        n_test=np.array([test_end - train_end for train_end, test_end in folds]),
+        auc=auc,
+        log_loss=log_loss,
+        random_auc=random_auc,
+        base_log_loss=base_log_loss,
+        n_threads=n_threads,
+        n_workers=n_workers,
+    )
@@ -1,7 +1,7 @@
 import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
-from modules import etl, analysis
+from modules import etl, analysis, audit, nulls, cooccurrence, exact
 
 st.set_page_config(page_title="Randomness Audit Framework", page_icon="📊", layout="wide")
 
@@ -9,17 +9,30 @@ st.set_page_config(page_title="Randomness Audit Framework", page_icon="📊", la
 with open('assets/style.css') as f:
     st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
 
-# LOAD DATA
-df_draws, df_exploded = etl.load_data()
+# LOAD DATA: every session maps the shared store; the pandas frames are only built
+# when the store is unavailable
+draw_store = etl.open_draw_store()
+if draw_store is not None:
+    draws = draw_store.draws
+    history = gap_source = draw_store
+    sorteo_labels = None
+    current_sorteo = int(draw_store.sorteos.max()) if len(draw_store) else 0
+else:
+    df_draws, draws = etl.load_draws()
+    history, gap_source = draws, etl.explode_draws(df_draws, draws)
+    sorteo_labels = df_draws['Sorteo'].to_numpy() if 'Sorteo' in df_draws.columns else None
+    current_sorteo = df_draws['Sorteo'].max() if 'Sorteo' in df_draws.columns else 0
 
-if df_draws.empty:
+if len(draws) == 0:
     st.error("No se encontró el archivo de datos. Por favor verifica 'data/tinka_data.csv'")
     st.stop()
 
+# Fase 1 + Fase 2 in a single vectorized pass
+audit_result = audit.run_audit(history)
+
 st.title("📊 Framework de Auditoría de Aleatoriedad")
 st.markdown("Análisis estadístico riguroso de la era moderna de La Tinka (Oct 2022 - Presente | 50 Bolillas)")
 
-current_sorteo = df_draws['Sorteo'].max() if 'Sorteo' in df_draws.columns else 0
 
 st.markdown("---")
 st.header("FASE 1: ESTADÍSTICA DESCRIPTIVA (EDA)")
@@ -33,7 +46,7 @@ st.markdown("""
 > **¿Qué estamos midiendo aquí?** Buscamos identificar sesgos en el sorteo. Si todos los números tienen la misma probabilidad, las barras deberían estar relativamente parejas alrededor de la media.
 """)
 
-df_freq, mean_freq, std_freq = analysis.get_frequency_analysis(df_exploded)
+df_freq, mean_freq = audit_result.df_freq, audit_result.mean_freq
 fig_freq = px.bar(df_freq, x='Numero', y='Frecuencia', title="Frecuencia Histórica por Bolilla")
 fig_freq.update_xaxes(title="Número de Bolilla (1-50)")
 fig_freq.update_yaxes(title="Veces que salió")
@@ -58,10 +71,16 @@ st.markdown("""
 > **¿Qué estamos midiendo aquí?** Aplicamos el Teorema del Límite Central. La suma de múltiples variables independientes (las 6 bolillas) tiende a formar una clásica "Campana de Gauss", donde los extremos son raros y el centro es lo habitual.
 """)
 
-sums, mean_sum, std_sum, p_value_shapiro = analysis.get_sum_distribution(df_draws)
-fig_sum = px.histogram(sums, nbins=20, title="Distribución de Sumas por Sorteo", marginal="box")
+sums, mean_sum, std_sum = audit_result.sums, audit_result.mean_sum, audit_result.std_sum
+p_value_shapiro = audit_result.shapiro_p_value
+exact_tables = exact.get_tables(audit_result.total_balls, draws.shape[1])
+exact_summary, exact_bins = exact.exact_audit(draws, audit_result.total_balls)
+sum_exact_p = exact_summary.loc[0, 'P_Valor']
+
+fig_sum = px.histogram(sums, nbins=20, histnorm='probability density', title="Distribución de Sumas por Sorteo vs. Distribución Exacta", marginal="box")
+fig_sum.add_trace(go.Scatter(x=exact_tables.suma.support, y=exact_tables.suma.pmf_table, mode='lines', name='Teórica Exacta', line=dict(color='orange')))
 fig_sum.update_xaxes(title="Valor de la Suma")
-fig_sum.update_yaxes(title="Frecuencia de Aparición")
+fig_sum.update_yaxes(title="Densidad de Probabilidad")
 fig_sum.add_vline(x=mean_sum, line_dash="dash", line_color="red", annotation_text=f"Media: {mean_sum:.1f}")
 fig_sum.update_layout(template="plotly_dark")
 st.plotly_chart(fig_sum, use_container_width=True)
@@ -71,8 +90,9 @@ if p_value_shapiro > 0.05:
 else:
     shapiro_msg = "La distribución presenta ligeras desviaciones respecto a una campana de Gauss perfecta."
 
-st.info(f"**Interpretación del Resultado:** La suma promedio central es de {mean_sum:.1f} (muy cerca al teórico 153) con una desviación de {std_sum:.1f}. "
+st.info(f"**Interpretación del Resultado:** La suma promedio central es de {mean_sum:.1f} (teórico exacto {exact_tables.suma.mean:.0f} ± {exact_tables.suma.std:.1f}) con una desviación de {std_sum:.1f}. "
            f"Valor-p (Prueba de Normalidad): {p_value_shapiro:.4f}. {shapiro_msg} "
+           f"Frente a la distribución exacta de la suma (sin aproximaciones), el valor-p de bondad de ajuste es {sum_exact_p:.4f}. "
            f"En control de manufactura, resultados fuera de ±3 desviaciones ({mean_sum-3*std_sum:.1f} a {mean_sum+3*std_sum:.1f}) serían defectos de fábrica críticos.")
 
 # ----------------- Análisis 3 -----------------
@@ -85,7 +105,7 @@ st.markdown("""
 > **¿Qué estamos midiendo aquí?** Evaluamos la probabilidad hipergeométrica (sacar bolas sin reemplazo). Comparamos lo que *debería* suceder matemáticamente frente a lo que *realmente* está sucediendo en la máquina.
 """)
 
-parity_counts = analysis.get_parity_analysis(df_draws)
+parity_counts = audit_result.parity_counts
 fig_par = go.Figure(data=[
     go.Bar(name='Observado (Real)', x=parity_counts['Combinacion'], y=parity_counts['ProporcionObservada']),
     go.Scatter(name='Teórico (Matemático)', x=parity_counts['Combinacion'], y=parity_counts['ProbabilidadTeorica'], mode='lines+markers', line=dict(color='red'))
@@ -112,7 +132,8 @@ st.markdown("""
 """)
 
 # current_sorteo needs to be transformed correctly if it is drawing numbers.
-chi2_stat, p_value_chi2, obs_freq, exp_freq = analysis.get_chi_square_test(df_exploded)
+chi2_stat, p_value_chi2 = audit_result.chi2_stat, audit_result.chi2_p_value
+obs_freq, exp_freq = audit_result.frequencies, audit_result.expected_freq
 
 fig_chi = go.Figure(data=[
     go.Bar(name='Frecuencia Observada', x=list(range(1, 51)), y=obs_freq),
@@ -142,7 +163,7 @@ st.markdown("""
 """)
 
 current_max_sorteo = int(str(current_sorteo).strip()) if str(current_sorteo).isdigit() else 0 # simple fallback
-gaps_df, anomaly = analysis.get_gap_metrics(df_exploded, current_max_sorteo)
+gaps_df, anomaly = analysis.get_gap_metrics(gap_source, current_max_sorteo)
 
 fig_scatter = px.scatter(
     gaps_df, 
@@ -175,18 +196,17 @@ st.markdown("""
 > **¿Qué estamos midiendo aquí?** Medimos si el resultado de *hoy* depende de alguna forma del de *ayer*. Si los números oscilan naturalmente arriba y abajo de la mediana, son independientes. Si hay largas tendencias fijas, pierden aleatoriedad.
 """)
 
-z_stat_runs, p_value_runs, runs, expected_runs = analysis.get_runs_test(df_draws)
+p_value_runs, runs, expected_runs = audit_result.runs_p_value, audit_result.runs, audit_result.expected_runs
 
 # Create a sequence plot of sums
-sums_col = analysis.get_sum_distribution(df_draws)[0]
 fig_runs = go.Figure()
 fig_runs.add_trace(go.Scatter(
-    y=sums_col.values, # Sums
+    y=audit_result.sums, # Sums
     mode='lines+markers',
     name='Suma del Sorteo',
     line=dict(color='cyan', width=1)
 ))
-fig_runs.add_hline(y=sums_col.median(), line_dash="dash", line_color="orange", annotation_text="Mediana")
+fig_runs.add_hline(y=audit_result.median_sum, line_dash="dash", line_color="orange", annotation_text="Mediana")
 fig_runs.update_layout(title="Serie Temporal de Sumas (Visualización de Rachas/Runs)", template="plotly_dark")
 fig_runs.update_xaxes(title="Índice de Sorteo Histórico")
 fig_runs.update_yaxes(title="Suma Total de Bolillas Ganadoras")
@@ -200,3 +220,140 @@ else:
 st.success(f"**Interpretación del Resultado:** Rachas observadas: {runs} | Rachas estimadas teóricamente: {expected_runs:.1f} | Valor-p: {p_value_runs:.4f}. "
            f"{runs_conclusion} "
            f"Para una empresa de ciberseguridad, fallar el Runs Test en encriptación implica que el código es predecible y vulnerable a hackeos.")
+
+# ----------------- Análisis 7 -----------------
+st.markdown("---")
+st.subheader("Análisis 7: Heatmap Temporal de Estabilidad")
+
+st.markdown("""
+> **¿Qué es esto?** Un mapa de calor que repite la auditoría de frecuencias en ventanas móviles de sorteos consecutivos.\n
+> **¿Para qué sirve?** En monitoreo de procesos (Control Estadístico de Procesos) se usa para detectar *drift*: un sistema que era estable y de pronto deja de serlo.\n
+> **¿Qué estamos midiendo aquí?** Para cada ventana calculamos cuántas veces salió cada bolilla frente a lo esperado y el valor-p de Chi-Cuadrado. Una máquina estable muestra colores sin patrones persistentes y valores-p dispersos por encima de 0.05.
+""")
+
+max_window = max(10, min(200, len(draws) - 1))
+window_size = st.slider("Tamaño de ventana (sorteos)", min_value=10, max_value=max_window, value=min(50, max_window), step=5)
+rolling = audit.rolling_audit(history, window=window_size, labels=sorteo_labels)
+
+if len(rolling.starts) > 0:
+    fig_heat = px.imshow(
+        rolling.heatmap_frame(relative=True),
+        aspect='auto',
+        color_continuous_scale='RdBu_r',
+        color_continuous_midpoint=1.0,
+        labels=dict(x="Último Sorteo de la Ventana", y="Número de Bolilla", color="Obs / Esperado"),
+        title=f"Frecuencia Relativa por Bolilla en Ventanas de {window_size} Sorteos"
+    )
+    fig_heat.update_layout(template="plotly_dark", height=700)
+    st.plotly_chart(fig_heat, use_container_width=True)
+
+    df_windows = rolling.df_windows
+    fig_pwin = px.line(df_windows, x='Sorteo_Fin', y='P_Value', title="Valor-p de Chi-Cuadrado por Ventana")
+    fig_pwin.add_hline(y=0.05, line_dash="dash", line_color="red", annotation_text="α = 0.05")
+    fig_pwin.update_xaxes(title="Último Sorteo de la Ventana")
+    fig_pwin.update_yaxes(title="Valor-p")
+    fig_pwin.update_layout(template="plotly_dark")
+    st.plotly_chart(fig_pwin, use_container_width=True)
+
+    share_rejected = (df_windows['P_Value'] < 0.05).mean()
+    st.info(f"**Interpretación del Resultado:** {share_rejected:.1%} de las {len(df_windows)} ventanas rechazan uniformidad al 5%. "
+            f"Bajo azar puro se espera alrededor de un 5% de falsas alarmas; porcentajes muy superiores y concentrados en un tramo de tiempo indicarían un cambio real en el sistema. "
+            f"En control de calidad, este es el equivalente a una carta de control que vigila la estabilidad del proceso a lo largo del tiempo.")
+else:
+    st.warning("No hay suficientes sorteos para construir ventanas de ese tamaño.")
+
+# ----------------- Análisis 8 -----------------
+st.markdown("---")
+st.subheader("Análisis 8: Valores-p Exactos por Monte Carlo")
+
+st.markdown("""
+> **¿Qué es esto?** En lugar de confiar en aproximaciones teóricas (Chi-Cuadrado asintótico, Normal en el Runs Test), simulamos miles de historias completas de La Tinka bajo azar perfecto y medimos qué tan raro es lo observado.\n
+> **¿Para qué sirve?** Es la técnica de *Permutation Testing* usada en ensayos clínicos y en auditorías de modelos cuando los supuestos clásicos no se cumplen.\n
+> **¿Qué estamos midiendo aquí?** Cada historia simulada tiene la misma cantidad de sorteos y extrae 6 bolillas **sin reemplazo**. El valor-p empírico es la proporción de historias simuladas tan extremas como la real, con su margen de error de Monte Carlo.
+""")
+
+n_replicates = st.select_slider("Historias simuladas", options=[1000, 5000, 10000, 50000, 100000], value=5000)
+if st.button("Calcular Valores-p Exactos"):
+    with st.spinner(f"Simulando {n_replicates:,} historias bajo la hipótesis nula..."):
+        null_result = nulls.run_null_audit(history, n_replicates=n_replicates, seed=2022, n_jobs=-1)
+
+    st.dataframe(null_result.df_summary, use_container_width=True)
+
+    fig_null = px.histogram(x=null_result.null['chi2'], nbins=60, title="Distribución Nula del Estadístico Chi-Cuadrado (Frecuencias)")
+    fig_null.add_vline(x=null_result.observed['chi2'], line_dash="dash", line_color="red", annotation_text="Observado")
+    fig_null.update_xaxes(title="Chi-Cuadrado bajo Azar Perfecto")
+    fig_null.update_yaxes(title="Historias Simuladas")
+    fig_null.update_layout(template="plotly_dark")
+    st.plotly_chart(fig_null, use_container_width=True)
+
+    st.info(f"**Interpretación del Resultado:** Con {n_replicates:,} historias simuladas, el valor-p empírico de Chi-Cuadrado es {null_result.p_values['chi2']:.4f} "
+            f"(± {1.96 * null_result.p_errors['chi2']:.4f}) y el del Runs Test es {null_result.p_values['runs_abs_z']:.4f}. "
+            f"Cuando los valores-p exactos coinciden con los asintóticos, las conclusiones de la Fase 2 son robustas; si difieren, manda la simulación.")
+
+# ----------------- Análisis 9 -----------------
+st.markdown("---")
+st.subheader("Análisis 9: Co-ocurrencia de Pares y Tríos")
+
+st.markdown("""
+> **¿Qué es esto?** Un mapa de calor de qué tan seguido salen juntas cada par de bolillas, comparado contra lo que dicta el azar.\n
+> **¿Para qué sirve?** Es el *Market Basket Analysis* del retail: descubrir qué productos se compran juntos para diseñar promociones y ubicar góndolas.\n
+> **¿Qué estamos midiendo aquí?** Para cada uno de los 1,225 pares y 19,600 tríos calculamos el Z-Score de su conteo frente al esperado. En un sorteo justo ninguna pareja debería "preferirse", y los Z-Scores extremos deberían ser tan raros como indica la campana de Gauss.
+""")
+
+cooc = cooccurrence.load_cooccurrence()
+if cooc is None:
+    cooc = cooccurrence.compute_cooccurrence(history)
+
+fig_pairs = px.imshow(
+    cooc.pair_z,
+    x=list(range(1, cooc.total_balls + 1)),
+    y=list(range(1, cooc.total_balls + 1)),
+    color_continuous_scale='RdBu_r',
+    color_continuous_midpoint=0.0,
+    labels=dict(x="Bolilla", y="Bolilla", color="Z-Score"),
+    title="Z-Score de Co-ocurrencia por Par de Bolillas"
+)
+fig_pairs.update_layout(template="plotly_dark", height=700)
+st.plotly_chart(fig_pairs, use_container_width=True)
+
+col_p, col_t = st.columns(2)
+col_p.dataframe(cooc.top_pairs(10), use_container_width=True)
+col_t.dataframe(cooc.top_triplets(10), use_container_width=True)
+
+top_pair = cooc.top_pairs(1).iloc[0]
+st.info(f"**Interpretación del Resultado:** El par más frecuente es {top_pair['Par']} con {top_pair['Observado']} apariciones frente a {top_pair['Esperado']:.1f} esperadas (Z = {top_pair['Z_Score']:.2f}). "
+        f"Con 1,225 pares evaluados, encontrar algunos Z-Scores mayores a 3 es normal por pura multiplicidad; lo relevante sería un patrón sistemático. "
+        f"En retail, esta misma matriz alimenta los motores de recomendación \"quienes compraron X también compraron Y\".")
+
+# ----------------- Análisis 10 -----------------
+st.markdown("---")
+st.subheader("Análisis 10: Bondad de Ajuste contra Distribuciones Exactas")
+
+st.markdown("""
+> **¿Qué es esto?** La distribución teórica *exacta* (no aproximada) de la suma, la cantidad de pares, las decenas distintas y los números consecutivos de un sorteo, obtenida contando todas las combinaciones posibles.\n
+> **¿Para qué sirve?** Es la diferencia entre una auditoría por muestreo y una auditoría al 100%: en control de calidad farmacéutico, la especificación exacta evita aprobar lotes por una aproximación demasiado generosa.\n
+> **¿Qué estamos midiendo aquí?** Comparamos con una prueba Chi-Cuadrado lo que sale en la máquina frente a las probabilidades exactas de sacar 6 bolillas de 50 sin reemplazo, agrupando los valores raros para que cada celda tenga suficientes casos esperados.
+""")
+
+st.dataframe(exact_summary, use_container_width=True)
+
+exact_tabs = st.tabs([exact.STATISTIC_LABELS[name] for name in exact.EXACT_STATISTICS])
+for tab, name in zip(exact_tabs, exact.EXACT_STATISTICS):
+    with tab:
+        df_bins = exact_bins[name]
+        fig_exact = go.Figure(data=[
+            go.Bar(name='Observado (Real)', x=df_bins['Rango'], y=df_bins['Observado']),
+            go.Scatter(name='Esperado (Exacto)', x=df_bins['Rango'], y=df_bins['Esperado'], mode='lines+markers', line=dict(color='red'))
+        ])
+        fig_exact.update_layout(title=f"{exact.STATISTIC_LABELS[name]}: Observado vs. Exacto", template="plotly_dark", xaxis_type='category')
+        fig_exact.update_xaxes(title="Valor (agrupado)")
+        fig_exact.update_yaxes(title="Cantidad de Sorteos")
+        st.plotly_chart(fig_exact, use_container_width=True)
+
+rejected = exact_summary[exact_summary['P_Valor'] < 0.05]
+if rejected.empty:
+    st.success("**Interpretación del Resultado:** Ninguna de las cuatro características estructurales se aparta de su distribución exacta (todos los valores-p > 0.05). "
+               "La máquina reproduce la forma de los sorteos que dicta la combinatoria, así como un proceso industrial bajo control reproduce su especificación.")
+else:
+    st.warning(f"**Interpretación del Resultado:** {', '.join(rejected['Estadistico'])} se aparta de su distribución exacta (valor-p < 0.05). "
+               "Con cuatro pruebas simultáneas, un rechazo aislado puede ser casualidad; si persiste con más sorteos ameritaría una revisión del proceso.")
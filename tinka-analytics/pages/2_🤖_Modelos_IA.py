@@ -1,7 +1,7 @@
 import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
-from modules import etl, analysis
+from modules import etl, analysis, bayes, registry, validation
 
 st.set_page_config(page_title="Modelos IA - Tinka Analytics", page_icon="🤖", layout="wide")
 
@@ -9,12 +9,14 @@ st.set_page_config(page_title="Modelos IA - Tinka Analytics", page_icon="🤖",
 with open('assets/style.css') as f:
     st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
 
-# LOAD DATA
-df_draws, df_exploded = etl.load_data()
-
-if df_draws.empty:
-    st.error("No se encontró el archivo de datos.")
-    st.stop()
+# LOAD DATA: the shared memory-mapped store; the pandas frames only if it is unavailable
+draw_store = etl.open_draw_store()
+history = draw_store
+if history is None:
+    df_draws, history = etl.load_data()
+    if df_draws.empty:
+        st.error("No se encontró el archivo de datos.")
+        st.stop()
 
 st.title("🤖 Modelos Predictivos e Inferencia (FASE 3)")
 st.markdown("Implementación de Machine Learning y Probabilidad Bayesiana para intentar predecir eventos en sistemas caóticos.")
@@ -31,9 +33,24 @@ with tab1:
     > **¿Qué estamos midiendo aquí?** Evaluamos qué tan bien el algoritmo diferencia números ganadores (1) de perdedores (0) a partir del Ruido Estadístico inyectado (lags, promedios móviles). Si la curva naranja cruzara hacia la esquina superior izquierda, la lotería sería matemáticamente predecible.
     """)
     
-    with st.spinner("Entrenando modelo y calculando métricas..."):
-        cm, fpr, tpr, roc_auc, importances = analysis.train_xgb_model(df_exploded)
-        
+    artifact = None
+    with st.spinner("Cargando modelo del registro (o entrenando si los datos cambiaron)..."):
+        if draw_store is not None:
+            artifact = registry.load_or_train(draw_store)
+        if artifact is not None:
+            cm, fpr, tpr, roc_auc, importances = artifact.cm, artifact.fpr, artifact.tpr, artifact.roc_auc, artifact.importances
+        else:
+            cm, fpr, tpr, roc_auc, importances = analysis.train_xgb_model(history)
+
+    if artifact is not None:
+        origin = {
+            'registro': "leído del registro de modelos (sin reentrenar)",
+            'incremental': f"continuado desde el modelo anterior `{artifact.parent}` con los sorteos nuevos",
+            'nuevo': "entrenado desde cero y guardado en el registro",
+        }[artifact.source]
+        st.caption(f"Modelo `{artifact.key}`: {origin}. {artifact.n_trees} árboles, "
+                   f"{artifact.n_train} sorteos de entrenamiento y {artifact.n_draws - artifact.n_train} de prueba.")
+
     if cm is not None:
         col1, col2 = st.columns(2)
         
@@ -52,6 +69,37 @@ with tab1:
             st.plotly_chart(fig_cm, use_container_width=True)
             
         st.info("**Interpretación del Resultado (Honestidad Predictiva):** Al observar que el AUC es de apenas ~0.50 (prácticamente igual a la línea azarosa), probamos el rigor y escepticismo matemático ante la Lotería. El sistema es impredecible. **Sin embargo, este mismo pipeline exacto (matemáticas XGBoost)** de ser expuesto a variables con correlación en e-commerce (historial de clics, tasa de abandono del carrito), entregaría un AUC de negocio del >0.85 garantizando conversión de ventas predictivas.")
+
+        st.markdown("---")
+        st.subheader("Validación Cruzada Temporal (Origen Móvil)")
+        st.markdown("""
+        > **¿Qué es esto?** En lugar de un único corte entrenamiento/prueba, la segunda mitad de la historia se divide en bloques consecutivos: cada *fold* entrena con todos los sorteos anteriores a su bloque y se evalúa en él, sin ver nunca su propio futuro.\n
+        > **¿Para qué sirve?** Es la forma estándar de validar modelos de pronóstico (demanda, riesgo de crédito, series financieras): un solo AUC es un número ruidoso, veinte AUC dan una media con intervalo de confianza.\n
+        > **¿Qué estamos midiendo aquí?** El AUC y el Log-Loss de cada fold frente a dos referencias de puro azar: un puntaje aleatorio (AUC) y predecir siempre la tasa base de 6/50 (Log-Loss).
+        """)
+
+        n_folds = st.slider("Cantidad de Folds", 5, 40, 20, step=5)
+        if st.button("Ejecutar Validación Cruzada"):
+            with st.spinner("Entrenando los folds en paralelo..."):
+                cv = validation.run_time_series_cv(history, n_folds=n_folds, seed=2022, n_jobs=-1)
+                df_cv = cv.df_summary
+
+            df_folds = cv.df_folds
+            fig_cv = go.Figure()
+            fig_cv.add_trace(go.Scatter(x=df_folds['Sorteo_Origen'], y=df_folds['AUC'], mode='lines+markers', name='AUC del Modelo', line=dict(color='darkorange')))
+            fig_cv.add_trace(go.Scatter(x=df_folds['Sorteo_Origen'], y=df_folds['AUC_Azar'], mode='lines+markers', name='AUC de Puntajes Aleatorios', line=dict(color='white', dash='dash')))
+            fig_cv.add_hline(y=0.5, line_dash="dot", line_color="gray")
+            fig_cv.update_layout(title='AUC por Fold (Origen Móvil)', template='plotly_dark')
+            fig_cv.update_xaxes(title="Primer Sorteo de Prueba del Fold")
+            fig_cv.update_yaxes(title="AUC")
+            st.plotly_chart(fig_cv, use_container_width=True)
+
+            st.dataframe(df_cv, use_container_width=True)
+            st.caption(f"{cv.n_folds} folds en {cv.n_workers} procesos con {cv.n_threads} hilo(s) de XGBoost cada uno.")
+
+            auc_row, loss_row = df_cv.iloc[0], df_cv.iloc[1]
+            st.info(f"**Interpretación del Resultado (Validación Cruzada):** El AUC medio es {auc_row['Modelo']:.3f} (IC 95%: {auc_row['IC_Bajo']:.3f} a {auc_row['IC_Alto']:.3f}) frente a {auc_row['Azar']:.3f} de puntajes aleatorios. "
+                    f"El Log-Loss del modelo ({loss_row['Modelo']:.3f}) frente al de predecir siempre la tasa base ({loss_row['Azar']:.3f}) muestra si el modelo aporta información o solo ruido sobreajustado: con sorteos independientes, ningún fold puede ganarle de forma consistente al azar.")
     else:
         st.error("Instala XGBoost y scikit-learn para ver este modelo.")
 
@@ -79,28 +127,55 @@ with tab2:
 
 # ----------------- TAB 3: BAYES -----------------
 with tab3:
-    current_sorteo = df_draws['Sorteo'].max()
-    current_max_sorteo = int(str(current_sorteo).strip()) if str(current_sorteo).isdigit() else 0
     st.header("Actualización de Probabilidad Bayesiana")
     
     st.markdown("""
-    > **¿Qué es esto?** Una técnica estadística (Teorema de Bayes) que altera la creencia original (Azar general 12%) utilizando "Nueva Evidencia Descubierta" para crear la certidumbre total actualizada.\n
-    > **¿Para qué sirve?** Vital en diagnósticos oncológicos médicos donde un test da positivo (evidencia) para modificar la creencia base de cáncer poblacional (prior) y calcular la posibilidad de la tragedia (posterior). Y en motores anti-spam.\n
-    > **¿Qué estamos midiendo aquí?** Alimentamos al algoritmo bayesiano la métrica del retraso (Z-Score) como la evidencia observada, calculando teóricamente qué tanta probabilidad "extra" tiene un número demorado en comparación a un número en su ventana media.
+    > **¿Qué es esto?** Una técnica estadística (Teorema de Bayes) que parte de una creencia original (Azar general 12%) y la actualiza sorteo a sorteo con la evidencia observada, obteniendo una distribución completa de la probabilidad real de cada bolilla.\n
+    > **¿Para qué sirve?** Vital en diagnósticos oncológicos médicos donde un test da positivo (evidencia) para modificar la creencia base de cáncer poblacional (prior) y calcular la posibilidad de la tragedia (posterior). Y en motores anti-spam o tests A/B bayesianos de conversión.\n
+    > **¿Qué estamos midiendo aquí?** Usamos el modelo conjugado Beta-Binomial: cada aparición de una bolilla suma evidencia a su favor y cada ausencia en su contra. Mostramos la probabilidad posterior de cada número con su intervalo de credibilidad del 95% y cómo evoluciona a lo largo de toda la historia.
     """)
 
-    bayes_df = analysis.get_bayesian_inference(df_exploded, current_max_sorteo)
+    prior_strength = st.slider("Peso del Prior (sorteos equivalentes de creencia inicial)", 1, 500, 50, step=1)
+
+    incidence, sorteos = analysis.get_gap_incidence(history)
+    trajectory = bayes.posterior_trajectory(incidence, sorteos, prior_strength=prior_strength)
+    bayes_df = trajectory.df_final
     
     # Sort for best plotting
     bayes_df_sorted = bayes_df.sort_values(by='Z_Score_Evidencia', ascending=False).head(20)
     
     fig_bayes = go.Figure(data=[
         go.Bar(name='Probabilidad a Priori (Azar Natural)', x=bayes_df_sorted['Numero'], y=bayes_df_sorted['Prior'], marker_color='grey'),
-        go.Bar(name='Probabilidad Posterior (Evidencia Anómala)', x=bayes_df_sorted['Numero'], y=bayes_df_sorted['Posterior'], marker_color='lime')
+        go.Bar(name='Probabilidad Posterior (IC 95%)', x=bayes_df_sorted['Numero'], y=bayes_df_sorted['Posterior'], marker_color='lime',
+               error_y=dict(type='data', symmetric=False,
+                            array=bayes_df_sorted['IC_Alto'] - bayes_df_sorted['Posterior'],
+                            arrayminus=bayes_df_sorted['Posterior'] - bayes_df_sorted['IC_Bajo']))
     ])
-    fig_bayes.update_layout(title="Filtro Bayesiano Empírico: Ajuste por Métrica Z", barmode='group', template='plotly_dark', xaxis_type='category')
+    fig_bayes.update_layout(title="Posterior Beta-Binomial: Top 20 por Evidencia", barmode='group', template='plotly_dark', xaxis_type='category')
     fig_bayes.update_xaxes(title="Número de Bolilla")
-    fig_bayes.update_yaxes(title="Probabilidad Acumulada")
+    fig_bayes.update_yaxes(title="Probabilidad por Sorteo")
     st.plotly_chart(fig_bayes, use_container_width=True)
-    
-    st.success("**Interpretación del Resultado (Ajuste de Riesgo):** El modelo bayesiano dinámicamente infla la ponderación probabilística (barras verdes) basado puramente en la fuerte anomalía de retraso encontrada de manera individual en cada número por parte de ese subcomponente (el Z-Score). En el modelo de negocio SAAS Ciberseguridad, esto descarta Falsos Positivos de ataques de red basándose progresivamente en la historia singular de un IP sospechoso.")
+
+    default_balls = bayes_df_sorted['Numero'].head(3).tolist() + bayes_df.sort_values('Z_Score_Evidencia')['Numero'].head(2).tolist()
+    selected_balls = st.multiselect("Bolillas a seguir en el tiempo", list(range(1, trajectory.total_balls + 1)), default=default_balls)
+
+    if selected_balls:
+        df_traj = trajectory.frame(selected_balls)
+        fig_traj = go.Figure()
+        for numero, group in df_traj.groupby('Numero'):
+            fig_traj.add_trace(go.Scatter(
+                x=list(group['Sorteo']) + list(group['Sorteo'][::-1]),
+                y=list(group['IC_Alto']) + list(group['IC_Bajo'][::-1]),
+                fill='toself', opacity=0.15, line=dict(width=0), showlegend=False, hoverinfo='skip',
+                legendgroup=str(numero)
+            ))
+            fig_traj.add_trace(go.Scatter(x=group['Sorteo'], y=group['Posterior'], mode='lines', name=f"Bolilla {numero}", legendgroup=str(numero)))
+        fig_traj.add_hline(y=trajectory.prior_mean, line_dash="dash", line_color="white", annotation_text="Azar 12%")
+        fig_traj.update_layout(title="Evolución de la Probabilidad Posterior (Media e IC 95%)", template='plotly_dark')
+        fig_traj.update_xaxes(title="Número de Sorteo")
+        fig_traj.update_yaxes(title="Probabilidad Posterior")
+        st.plotly_chart(fig_traj, use_container_width=True)
+
+    outside = int(((bayes_df['IC_Bajo'] > trajectory.prior_mean) | (bayes_df['IC_Alto'] < trajectory.prior_mean)).sum())
+    st.success(f"**Interpretación del Resultado (Ajuste de Riesgo):** Tras {trajectory.steps[-1]} sorteos, {outside} de {trajectory.total_balls} bolillas tienen un intervalo de credibilidad que excluye el 12% del azar (por pura casualidad se esperarían ~{0.05 * trajectory.total_balls:.1f}). "
+               "Las bandas se estrechan a medida que llega evidencia y todas convergen hacia la línea del azar: la evidencia no favorece a ningún número. En el modelo de negocio SAAS Ciberseguridad, esta misma actualización descarta Falsos Positivos de ataques de red basándose progresivamente en la historia singular de un IP sospechoso.")
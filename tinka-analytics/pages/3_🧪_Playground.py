@@ -3,7 +3,7 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from modules import simulation, etl, analysis
+from modules import simulation, etl, analysis, backtest, portfolio, prizes, tournament
 
 st.set_page_config(page_title="Simulación & Negocio", page_icon="🧪", layout="wide")
 
@@ -11,12 +11,19 @@ st.set_page_config(page_title="Simulación & Negocio", page_icon="🧪", layout=
 with open('assets/style.css') as f:
     st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
 
-df_draws, df_exploded = etl.load_data()
+# LOAD DATA: the shared memory-mapped store; the pandas frames only if it is unavailable
+draw_store = etl.open_draw_store()
+if draw_store is not None:
+    history = backtest_source = draw_store
+    current_sorteo_num = int(draw_store.sorteos.max()) if len(draw_store) else 0
+else:
+    backtest_source, history = etl.load_data()
+    current_sorteo_num = pd.to_numeric(backtest_source['Sorteo'], errors='coerce').max() if 'Sorteo' in backtest_source.columns else 0
 
 st.title("🧪 Laboratorio de Simulación y Valor Esperado (FASE 4)")
 st.markdown("Cálculo avanzado de riesgo matemático usando simulaciones de Monte Carlo y dimensionamiento de posición óptima (Criterio de Kelly).")
 
-tab1, tab2, tab3 = st.tabs(["Monte Carlo (Simulador de Mercado)", "Gestión de Riesgo (Kelly)", "A/B Testing (Mitigación de Sesgos)"])
+tab1, tab2, tab3, tab4 = st.tabs(["Monte Carlo (Simulador de Mercado)", "Gestión de Riesgo (Kelly)", "A/B Testing (Mitigación de Sesgos)", "Portafolio de Tickets"])
 
 # ----------------- TAB 1: MONTE CARLO -----------------
 with tab1:
@@ -32,7 +39,7 @@ with tab1:
     with col1:
         st.subheader("Configurar Inversión Simular")
         user_input = st.text_input("Ingresa los números del ticket (separados por comas)", "5, 12, 23, 34, 45, 50")
-        n_sims = st.slider("Total Compra de Sorteos Paralelos", min_value=1000, max_value=50000, value=10000, step=1000)
+        n_sims = st.slider("Total Compra de Sorteos Paralelos", min_value=1000, max_value=1000000, value=10000, step=1000)
         
         try:
             user_list = [int(x.strip()) for x in user_input.split(',')]
@@ -43,17 +50,70 @@ with tab1:
         if not valid_input:
             st.error("Por favor ingresa entre 6 y 15 números válidos del 1 al 50.")
             
+        calc_mode = st.radio("Modo de Cálculo", ["Monte Carlo (Simulación)", "Analítico (Exacto)", "Streaming (Precisión Objetivo)"], horizontal=True)
+        if calc_mode == "Streaming (Precisión Objetivo)":
+            target_hw = st.slider("Precisión Objetivo del ROI (± puntos porcentuales, IC 95%)", 0.5, 50.0, 5.0, step=0.5)
+            time_budget = st.slider("Presupuesto de Tiempo (segundos)", 1, 60, 10)
         run_btn = st.button("Ejecutar Simulación (Test Stress)", disabled=not valid_input, type="primary")
 
     with col2:
-        if run_btn and valid_input:
+        if run_btn and valid_input and calc_mode == "Analítico (Exacto)":
+            exact_result = simulation.analytic_simulation(user_list, n_plays=n_sims)
+
+            col_m1, col_m2 = st.columns(2)
+            col_m1.metric("Impacto Capital (Total Gastado)", f"S/ {exact_result.total_cost:,.2f}")
+            col_m2.metric("Liquidación Esperada (Premios)", f"S/ {exact_result.expected_revenue:,.2f}")
+
+            col_m3, col_m4 = st.columns(2)
+            col_m3.metric("ROI Esperado Exacto", f"{exact_result.expected_roi:.2f}%", delta=f"± {exact_result.roi_std:.2f}% (1 desv.)")
+            col_m4.metric("Probabilidad de Terminar en Ganancia", f"{exact_result.prob_profit * 100:.4f}%")
+
+            st.dataframe(exact_result.df_tiers, use_container_width=True)
+
+            net = exact_result.winnings - exact_result.total_cost
+            fig_dist = go.Figure(go.Scatter(x=net, y=exact_result.winnings_probs, mode='lines', line=dict(color='orange'), fill='tozeroy'))
+            fig_dist.add_vline(x=0, line_dash="dash", line_color="white", annotation_text="Punto de Equilibrio")
+            fig_dist.update_layout(title=f'Distribución Exacta del Resultado Neto en {n_sims:,} Jugadas', template='plotly_dark', yaxis_type='log')
+            fig_dist.update_xaxes(title="Ganancia / Pérdida Neta (S/)")
+            fig_dist.update_yaxes(title="Probabilidad (escala log)")
+            st.plotly_chart(fig_dist, use_container_width=True)
+
+            st.warning(f"**Interpretación del Resultado (Esperanza de Negocio Matemática):** Sin simular un solo sorteo, la distribución hipergeométrica fija el ROI esperado en {exact_result.expected_roi:.2f}% para cualquier cantidad de números jugados. "
+                       "Toda la masa de probabilidad a la izquierda del punto de equilibrio es el riesgo cuantificado con exactitud: el mismo cálculo que una aseguradora usa para tarifar pólizas sin esperar a que ocurran los siniestros.")
+
+        elif run_btn and valid_input and calc_mode == "Streaming (Precisión Objetivo)":
+            progress_bar = st.progress(0.0)
+            live_panel = st.empty()
+
+            def show_progress(update):
+                progress_bar.progress(min(1.0, max(target_hw / max(update.roi_half_width, 1e-12), update.elapsed / time_budget, update.n_simulations / n_sims)))
+                live_panel.markdown(f"**{update.n_simulations:,} sorteos** · ROI {update.roi_percent:.2f}% ± {update.roi_half_width:.2f} pp · {update.elapsed * 1000:.0f} ms")
+
+            stream_result = simulation.run_streaming_simulation(user_list, progress_callback=show_progress, target_half_width=target_hw,
+                                                                time_budget=time_budget, max_simulations=n_sims)
+            progress_bar.progress(1.0)
+
+            stop_messages = {
+                'precision': "Se alcanzó la precisión objetivo.",
+                'time': "Se agotó el presupuesto de tiempo.",
+                'max_simulations': "Se alcanzó el máximo de sorteos configurado.",
+            }
+            col_m1, col_m2 = st.columns(2)
+            col_m1.metric("Sorteos Necesarios", f"{stream_result.n_simulations:,}")
+            col_m2.metric("Tiempo de Cómputo", f"{stream_result.elapsed * 1000:.0f} ms")
+            st.metric("ROI Estimado (IC 95%)", f"{stream_result.roi_percent:.2f}%", delta=f"± {stream_result.roi_half_width:.2f} pp")
+            st.dataframe(stream_result.df_tiers, use_container_width=True)
+
+            st.info(f"**Interpretación del Resultado (Cómputo Adaptativo):** {stop_messages[stream_result.stop_reason]} En vez de fijar a ciegas la cantidad de escenarios, la simulación se detiene sola cuando la respuesta es lo bastante precisa, igual que un motor de riesgo bancario que corta el cálculo del VaR apenas converge. "
+                    "El ancho del intervalo usa la varianza exacta del ticket, incluido el pozo aunque aún no haya salido: por eso un ticket de 6 números necesita cientos de millones de sorteos para una precisión fina, y el modo Analítico da el valor exacto al instante.")
+
+        elif run_btn and valid_input:
             with st.spinner(f"Estresando algoritmo... {n_sims:,} escenarios paralelos..."):
-                hit_counts, roi_percent, unique_matches, total_revenue = simulation.run_simulation(user_list, n_simulations=n_sims)
+                hit_counts, roi_percent, unique_matches, total_revenue = simulation.run_simulation(user_list, n_simulations=n_sims, n_jobs=-1)
                 
             col_m1, col_m2 = st.columns(2)
             n_played = len(user_list)
-            cost_table = {6:5, 7:35, 8:140, 9:420, 10:1050, 11:2310, 12:4620, 13:8580, 14:15015, 15:25025}
-            cost_total = n_sims * cost_table.get(n_played, 5)
+            cost_total = n_sims * int(prizes.get_prize_engine().cost(n_played))
             
             col_m1.metric("Impacto Capital (Total Gastado)", f"S/ {cost_total:,.2f}")
             col_m2.metric("Liquidación (Prizes Total Bruto)", f"S/ {total_revenue:,.2f}")
@@ -87,20 +147,46 @@ with tab2:
     f_star = simulation.get_kelly_criterion(p_win, payout)
     st.metric("Porcentaje Patrimonial a Arriesgar por Periodo (Kelly f*)", f"{f_star*100:.2f}%")
     
-    if st.button("Estresar Evolución de Capital Dinámico (100 Ciclos)"):
-        with st.spinner("Integrando función logarítmica..."):
-            cap_kelly = simulation.simulate_capital_growth(capital_inicial, 100, p_win, payout, 'kelly')
-            cap_fixed = simulation.simulate_capital_growth(capital_inicial, 100, p_win, payout, 'fixed')
+    col_e1, col_e2 = st.columns(2)
+    n_paths = col_e1.select_slider("Universos Paralelos Simulados (Trayectorias)", options=[1000, 10000, 50000, 100000, 200000], value=10000)
+    selected_strategies = col_e2.multiselect("Políticas a Comparar", list(simulation.CAPITAL_STRATEGIES.keys()), default=['kelly', 'fixed'],
+                                             format_func=lambda s: simulation.CAPITAL_STRATEGIES[s])
+    
+    if st.button("Estresar Evolución de Capital Dinámico (100 Ciclos)", disabled=not selected_strategies):
+        with st.spinner(f"Integrando {n_paths:,} trayectorias por política..."):
+            ensemble = simulation.simulate_capital_ensemble(capital_inicial, 100, p_win, payout, selected_strategies, n_paths=n_paths, seed=2022)
+            df_bands = ensemble.df_bands
             
         fig_cap = go.Figure()
-        fig_cap.add_trace(go.Scatter(y=cap_kelly, mode='lines', name='Política Kelly Dinámica Computada'))
-        fig_cap.add_trace(go.Scatter(y=cap_fixed, mode='lines', name='Política Retrato Ciego Fija (5% Estático)'))
-        fig_cap.update_layout(title='Evolución de Trazado Financiero al Pasar Eventos Positivos Simulados', template='plotly_dark')
+        for label, band in df_bands.groupby('Estrategia', sort=False):
+            fig_cap.add_trace(go.Scatter(x=list(band['Paso']) + list(band['Paso'][::-1]), y=list(band['Q_0.95']) + list(band['Q_0.05'][::-1]),
+                                         fill='toself', opacity=0.15, line=dict(width=0), legendgroup=label, showlegend=False, hoverinfo='skip'))
+            fig_cap.add_trace(go.Scatter(x=list(band['Paso']) + list(band['Paso'][::-1]), y=list(band['Q_0.75']) + list(band['Q_0.25'][::-1]),
+                                         fill='toself', opacity=0.3, line=dict(width=0), legendgroup=label, showlegend=False, hoverinfo='skip'))
+            fig_cap.add_trace(go.Scatter(x=band['Paso'], y=band['Q_0.5'], mode='lines', name=f'{label} (Mediana)', legendgroup=label))
+        fig_cap.update_layout(title='Evolución del Bankroll: Mediana y Bandas 25-75% / 5-95%', template='plotly_dark')
         fig_cap.update_xaxes(title="Tiempo (Paso Iterativo Comercial)")
         fig_cap.update_yaxes(title="Crecimiento del Bankroll Corporativo Acumulado")
         st.plotly_chart(fig_cap, use_container_width=True)
+
+        col_r1, col_r2 = st.columns(2)
+        with col_r1:
+            fig_ruin = px.line(df_bands, x='Paso', y='Prob_Ruina', color='Estrategia', title='Probabilidad Acumulada de Ruina (Pérdida del 99%)')
+            fig_ruin.update_layout(template='plotly_dark')
+            fig_ruin.update_yaxes(title="Probabilidad de Ruina")
+            st.plotly_chart(fig_ruin, use_container_width=True)
+        with col_r2:
+            fig_ttr = go.Figure([go.Bar(x=np.arange(ensemble.n_steps + 1), y=ensemble.ruin_times[s], name=label) for s, label in enumerate(ensemble.labels)])
+            fig_ttr.update_layout(title='Histograma de Tiempo hasta la Ruina', template='plotly_dark', barmode='overlay')
+            fig_ttr.update_traces(opacity=0.7)
+            fig_ttr.update_xaxes(title="Paso en que Ocurre la Ruina")
+            fig_ttr.update_yaxes(title="Trayectorias Arruinadas")
+            st.plotly_chart(fig_ttr, use_container_width=True)
+
+        st.dataframe(ensemble.df_summary, use_container_width=True)
         
-        st.success("**Interpretación del Resultado (Defensa a Largo Plazo):** Si un CEO o algoritmo cuantitativo predictivo (XGBoost) halla un nicho exitoso, aplicar un multiplicador como Posición Kelly (línea azul dinámica) absorbe choques de varianza minimizando destrucción general, y escala multiplicándose exponencialmente.")
+        st.success("**Interpretación del Resultado (Defensa a Largo Plazo):** Con miles de universos paralelos ya no dependemos de la suerte de una sola trayectoria: la mediana y las bandas muestran qué le pasa al inversionista *típico* y al desafortunado. "
+                   "Si un CEO o algoritmo cuantitativo predictivo (XGBoost) halla un nicho exitoso, la Posición Kelly maximiza el crecimiento mediano sin ruina, mientras que apostar fracciones mayores dispara la probabilidad de quiebra aunque la ventaja sea la misma.")
 
 # ----------------- TAB 3: A/B TESTING -----------------
 with tab3:
@@ -114,8 +200,8 @@ with tab3:
     
     if st.button("Forzar Experimento Doble Ciego Iterativo (500 Muestras)"):
         with st.spinner("Calculando divergencias..."):
-            df_freq, _, _ = analysis.get_frequency_analysis(df_exploded)
-            ab_results = simulation.run_ab_test_simulator(df_freq, 500)
+            df_freq, _, _ = analysis.get_frequency_analysis(history)
+            ab_results = simulation.run_ab_test_simulator(df_freq, 500, n_jobs=-1)
             
             fig_ab = go.Figure()
             fig_ab.add_trace(go.Scatter(x=ab_results['Draw'], y=ab_results['Hot_Strategy_Hits'].rolling(20).mean(), name='A: Top Frecuencia de Data (Selección Algorítmica)'))
@@ -132,3 +218,136 @@ with tab3:
             st.metric("Diferencial de Control de Varianza", f"{abs(hit_mean_hot - hit_mean_rand):.4f} micro-aciertos de diferencial máximo")
             
             st.info("**Interpretación del Resultado (Data Driven Anti-Sesgos):** El gráfico empata brutalmente. Esta confluencia matemática refuta frontalmente el instinto humano ilusorio. Validar las pruebas A/B elimina el *Confirmation Bias* natural de equipos de ventas subjetivos, y fuerza un ambiente puramente numérico (Data-Driven Decisions) para enviar la versión ganadora a los cuarteles de Producción.")
+
+    st.markdown("---")
+    st.subheader("Torneo de Estrategias (Miles de Futuros Simulados)")
+    st.markdown("""
+    > **¿Qué es esto?** En lugar de un solo experimento A/B, enfrentamos cinco estrategias populares (números calientes, fríos, más atrasados, suma centrada y azar puro) sobre cientos de futuros alternativos idénticos para todas.\n
+    > **¿Para qué sirve?** Es un *ensayo clínico multi-brazo*: cuando se prueban muchos tratamientos a la vez, la probabilidad de un "ganador" por pura suerte crece, por eso se corrige la significancia por comparaciones múltiples (Holm-Bonferroni).\n
+    > **¿Qué estamos midiendo aquí?** El promedio de aciertos de cada estrategia con su intervalo de confianza del 95%, y si su diferencia contra el azar puro resiste la corrección.
+    """)
+
+    col_t1, col_t2 = st.columns(2)
+    n_replicates = col_t1.select_slider("Futuros Alternativos (Réplicas)", options=[50, 100, 200, 500, 1000], value=200)
+    n_future = col_t2.select_slider("Sorteos por Futuro", options=[100, 500, 1000], value=500)
+
+    if st.button("Ejecutar Torneo de Estrategias"):
+        with st.spinner(f"Simulando {n_replicates * n_future:,} sorteos futuros..."):
+            tour = tournament.run_tournament(history, current_sorteo_num, n_future, n_replicates, seed=2022, n_jobs=-1)
+            df_tour = tour.df_summary
+
+        fig_tour = go.Figure(go.Bar(
+            x=df_tour['Estrategia'], y=df_tour['Media_Aciertos'],
+            error_y=dict(type='data', symmetric=False, array=df_tour['IC_Alto'] - df_tour['Media_Aciertos'],
+                         arrayminus=df_tour['Media_Aciertos'] - df_tour['IC_Bajo'])
+        ))
+        fig_tour.add_hline(y=tour.expected_hits, line_dash="dash", line_color="red", annotation_text=f"Teórico: {tour.expected_hits:.2f}")
+        fig_tour.update_layout(title='Aciertos Promedio por Estrategia (IC 95%)', template='plotly_dark')
+        fig_tour.update_yaxes(title="Aciertos Promedio por Sorteo", range=[tour.expected_hits * 0.95, tour.expected_hits * 1.05])
+        st.plotly_chart(fig_tour, use_container_width=True)
+
+        st.dataframe(df_tour, use_container_width=True)
+        st.dataframe(tour.df_hits, use_container_width=True)
+
+        winners = df_tour[df_tour['P_Holm'] < 0.05]
+        if winners.empty:
+            st.info("**Interpretación del Resultado (Ensayo Multi-Brazo):** Ninguna estrategia supera al azar tras corregir por comparaciones múltiples. Todas las barras se apilan sobre la línea teórica de 0.72 aciertos: calientes, fríos y atrasados son la misma apuesta con distinto nombre. "
+                    "Es la lección de los ensayos clínicos: si pruebas suficientes tratamientos, alguno parecerá funcionar por casualidad, y solo la corrección estadística separa el hallazgo del ruido.")
+        else:
+            st.warning(f"**Interpretación del Resultado (Ensayo Multi-Brazo):** {', '.join(winners['Estrategia'])} se aparta del azar incluso tras la corrección de Holm. Con sorteos simulados justos esto solo puede ser un falso positivo raro; repite con otra cantidad de réplicas antes de sacar conclusiones.")
+
+    st.markdown("---")
+    st.subheader("Backtesting Histórico (Walk-Forward sobre Sorteos Reales)")
+    st.markdown("""
+    > **¿Qué es esto?** Repetimos la historia real de la era moderna sorteo por sorteo: antes de cada sorteo, cada estrategia (calientes, fríos, más atrasados, bayesiana y azar) elige su ticket usando **solo** los sorteos anteriores, y se le cobra con la tabla de premios real (incluida la Boliyapa y las bolillas adicionales del "Sí o Sí").\n
+    > **¿Para qué sirve?** Es el *backtesting walk-forward* con el que los fondos cuantitativos validan una estrategia de trading sin mirar el futuro (sin *look-ahead bias*).\n
+    > **¿Qué estamos midiendo aquí?** El costo y los premios acumulados de cada estrategia, su ROI real y la peor caída de su balance a lo largo de la historia.
+    """)
+
+    col_b1, col_b2 = st.columns(2)
+    backtest_played = col_b1.slider("Números por Ticket (Backtesting)", 6, 10, 6)
+    backtest_warmup = col_b2.slider("Sorteos de Historia Antes de Apostar", 10, 100, 30, step=5)
+
+    if st.button("Ejecutar Backtesting Histórico"):
+        with st.spinner("Repitiendo la historia sorteo por sorteo..."):
+            bt = backtest.run_backtest(backtest_source, n_played=backtest_played, min_history=backtest_warmup, seed=2022)
+            df_bt = bt.df_summary
+
+        fig_bt = px.line(bt.df_cumulative, x='Sorteo', y='Balance', color='Estrategia', title='Balance Acumulado por Estrategia (Premios - Costo)')
+        fig_bt.add_hline(y=0, line_dash="dash", line_color="white", annotation_text="Punto de Equilibrio")
+        fig_bt.update_layout(template='plotly_dark')
+        fig_bt.update_yaxes(title="Balance Acumulado (S/)")
+        st.plotly_chart(fig_bt, use_container_width=True)
+
+        st.dataframe(df_bt, use_container_width=True)
+
+        best = df_bt.loc[df_bt['ROI'].idxmax()]
+        st.info(f"**Interpretación del Resultado (Backtesting sin Mirar el Futuro):** La mejor estrategia de la historia real fue *{best['Estrategia']}* con un ROI de {best['ROI']:.2f}%, y aun así el balance termina lejos del punto de equilibrio. "
+                f"Las diferencias entre estrategias en {int(best['Sorteos'])} sorteos son del tamaño del ruido (el promedio teórico es {bt.expected_hits:.2f} aciertos por sorteo): un backtest favorable sobre una sola historia no es evidencia de ventaja, como bien saben los fondos que sobreajustan al pasado.")
+
+# ----------------- TAB 4: PORTAFOLIO -----------------
+with tab4:
+    st.header("Simulador de Portafolios de Tickets (Bitmask + Popcount)")
+
+    st.markdown("""
+    > **¿Qué es esto?** Un simulador que enfrenta cientos o miles de tickets (simples y jugadas múltiples de 6 a 15 números) contra exactamente los mismos sorteos simulados, representando cada ticket como una máscara de bits.\n
+    > **¿Para qué sirve?** Es el mismo problema que gestionar un portafolio de inversiones o una cartera de seguros: el riesgo del conjunto no es la suma de los riesgos individuales, depende de cuánto se *solapan* (correlacionan) las posiciones.\n
+    > **¿Qué estamos midiendo aquí?** El ROI de cada ticket y del portafolio completo, cuántos números comparten los tickets entre sí, y la distribución del premio total que cobra el portafolio en cada sorteo.
+    """)
+
+    col_p1, col_p2 = st.columns([1, 2])
+    with col_p1:
+        portfolio_mode = st.radio("Origen del Portafolio", ["Tickets Manuales", "Portafolio Aleatorio"])
+        if portfolio_mode == "Tickets Manuales":
+            tickets_text = st.text_area("Un ticket por línea (números separados por comas)", "5, 12, 23, 34, 45, 50\n1, 2, 3, 4, 5, 6, 7, 8\n10, 20, 30, 40, 41, 42")
+        else:
+            n_random_tickets = st.slider("Cantidad de Tickets", 10, 5000, 500, step=10)
+            random_size = st.slider("Números por Ticket", 6, 15, 6)
+        n_portfolio_draws = st.select_slider("Sorteos Simulados", options=[10000, 50000, 100000, 500000, 1000000], value=100000)
+        portfolio_btn = st.button("Simular Portafolio", type="primary")
+
+    with col_p2:
+        if portfolio_btn:
+            try:
+                if portfolio_mode == "Tickets Manuales":
+                    tickets = [[int(x) for x in line.split(',') if x.strip()] for line in tickets_text.splitlines() if line.strip()]
+                else:
+                    tickets = portfolio.random_portfolio(n_random_tickets, random_size, seed=2022)
+                with st.spinner(f"Cruzando {len(tickets):,} tickets contra {n_portfolio_draws:,} sorteos..."):
+                    port_result = portfolio.run_portfolio(tickets, n_draws=n_portfolio_draws, seed=2022, n_jobs=-1)
+            except ValueError as e:
+                st.error(str(e))
+                port_result = None
+
+            if port_result is not None:
+                col_q1, col_q2, col_q3 = st.columns(3)
+                col_q1.metric("Inversión Total del Portafolio", f"S/ {port_result.total_cost:,.0f}")
+                col_q2.metric("Premios Totales", f"S/ {port_result.total_revenue:,.0f}")
+                col_q3.metric("ROI del Portafolio", f"{port_result.roi_percent:.2f}%", delta=f"{port_result.roi_percent:.2f}%")
+
+                st.dataframe(port_result.df_tickets.sort_values('ROI', ascending=False).head(200), use_container_width=True)
+
+                df_dist = port_result.df_prize_distribution
+                fig_port = px.bar(df_dist[df_dist['Premio_Portafolio'] > 0], x='Premio_Portafolio', y='Probabilidad', log_x=True, log_y=True,
+                                  title=f"Distribución del Premio del Portafolio por Sorteo (P(premio = 0) = {df_dist['Probabilidad'].iloc[0] if df_dist['Premio_Portafolio'].iloc[0] == 0 else 0:.4f})")
+                fig_port.update_xaxes(title="Premio Total Cobrado en el Sorteo (S/)")
+                fig_port.update_yaxes(title="Probabilidad")
+                fig_port.update_layout(template='plotly_dark')
+                st.plotly_chart(fig_port, use_container_width=True)
+
+                if len(port_result.tickets) <= 60:
+                    fig_overlap = px.imshow(port_result.overlap_matrix(), color_continuous_scale='Viridis', title="Números Compartidos entre Tickets",
+                                            labels=dict(x="Ticket", y="Ticket", color="Compartidos"))
+                    fig_overlap.update_layout(template='plotly_dark')
+                    st.plotly_chart(fig_overlap, use_container_width=True)
+                else:
+                    overlap_hist = port_result.overlap_histogram()
+                    fig_overlap = px.bar(x=list(range(len(overlap_hist))), y=overlap_hist, title="Pares de Tickets según Números Compartidos")
+                    fig_overlap.update_xaxes(title="Números Compartidos")
+                    fig_overlap.update_yaxes(title="Pares de Tickets")
+                    fig_overlap.update_layout(template='plotly_dark')
+                    st.plotly_chart(fig_overlap, use_container_width=True)
+
+                st.warning(f"**Interpretación del Resultado (Diversificación):** El portafolio cubre {port_result.coverage} de 50 bolillas y aun así su ROI es {port_result.roi_percent:.2f}%. "
+                           "Diversificar reduce la volatilidad (más sorteos con algún premio) pero no puede cambiar el signo de la esperanza: sumar apuestas de valor esperado negativo solo produce un portafolio de valor esperado negativo. "
+                           "En finanzas, la diversificación elimina riesgo idiosincrático, nunca convierte un activo con rentabilidad negativa en uno rentable.")
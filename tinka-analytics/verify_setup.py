@@ -1,12 +1,13 @@
 import sys
 import os
+import numpy as np
 
 # Add current dir to path just in case
 sys.path.append(os.getcwd())
 
 try:
     print("Testing Imports...")
-    from modules import etl, analysis, simulation
+    from modules import etl, analysis, simulation, prizes
     print("Imports Successful.")
 
     print("Testing Data Loading...")
@@ -16,17 +17,103 @@ try:
         print(f"Latest Draw: {df_draws['Fecha'].max()}")
         
         print("Testing Analysis Mock...")
-        entropy = analysis.get_entropy(df_exploded)
-        print(f"Entropy calculated: {entropy}")
+        chi2_stat, p_value, _, _ = analysis.get_chi_square_test(df_exploded)
+        print(f"Chi-Square calculated: {chi2_stat:.2f} (p = {p_value:.4f})")
         
         print("Testing Simulation Mock...")
-        res, roi = simulation.run_simulation({1,2,3,4,5,6}, n_simulations=100)
+        res, roi, _, _ = simulation.run_simulation({1,2,3,4,5,6}, n_simulations=100)
         print("Simulation ran successfully.")
+
+        print("Testing Prize Engine...")
+        engine = prizes.get_prize_engine()
+        # Published example: 10 numbers, 5 matches + boliyapa pays S/ 86,600
+        assert engine.payout(10, 5, 1) == 86600, "Boliyapa payout of a 10-number bet does not match the prize guide"
+        assert all(engine.payout(n, m) == simulation.calculate_system_payout(n, m)[0] for n in range(6, 16) for m in range(7))
+        print("Prize engine matches the published prizes.")
+
+        print("Testing Analytic vs Monte Carlo...")
+        ticket = list(range(1, 11))
+        n_sims = 200000
+        exact_result = simulation.analytic_simulation(ticket, n_plays=n_sims)
+        outcome_hist = simulation.count_simulated_outcomes(ticket, n_sims, seed=2022)
+        # Every (tier, boliyapa) frequency within 4 standard errors of its exact probability
+        se = np.sqrt(exact_result.outcome_probs * (1 - exact_result.outcome_probs) / n_sims)
+        worst = np.max(np.abs(outcome_hist / n_sims - exact_result.outcome_probs) / np.maximum(se, 1e-300))
+        assert worst < 4, f"Tier frequencies disagree with the exact distribution ({worst:.2f} SE)"
+        _, roi_mc, _, _ = simulation.run_simulation(ticket, n_simulations=n_sims, seed=2022)
+        assert abs(roi_mc - exact_result.expected_roi) < 4 * exact_result.roi_std, "Monte Carlo ROI outside 4 SE of the exact ROI"
+        print(f"Analytic and Monte Carlo agree (worst tier: {worst:.2f} SE, ROI {roi_mc:.2f}% vs {exact_result.expected_roi:.2f}%).")
+
+        print("Testing Streaming Stop Rule...")
+        # A 6-number ticket cannot reach ±5 pp in one chunk: the jackpot variance counts before it is hit
+        early = simulation.run_streaming_simulation(list(range(1, 7)), target_half_width=5.0, max_simulations=100000, seed=2022)
+        assert early.stop_reason == 'max_simulations', "Streaming stopped on precision before the jackpot tier could be sampled"
+        # The 95% CI at the precision stop covers the exact ROI about 95% of the time
+        wide_ticket = list(range(1, 16))
+        wide_roi = simulation.analytic_simulation(wide_ticket, n_plays=1).expected_roi
+        stops = [simulation.run_streaming_simulation(wide_ticket, target_half_width=5.0, seed=s) for s in range(40)]
+        coverage = np.mean([abs(u.roi_percent - wide_roi) <= u.roi_half_width for u in stops])
+        assert all(u.stop_reason == 'precision' for u in stops) and coverage >= 0.85, f"Streaming CI coverage too low ({coverage:.0%})"
+        print(f"Streaming CI coverage at the precision stop: {coverage:.0%}.")
         
+        print("Testing Walk-Forward Backtest...")
+        from modules import backtest, tournament
+        bt = backtest.run_backtest(df_draws, strategies=['hot', 'overdue'], seed=2022)
+        # The last ticket only uses the history before the last draw
+        history = df_exploded[df_exploded['Sorteo'] != df_draws['Sorteo'].iloc[-1]]
+        reference = tournament.strategy_tickets(history, df_draws['Sorteo'].iloc[-2])
+        assert bt.tickets[0, -1].tolist() == reference['hot'] and bt.tickets[1, -1].tolist() == reference['overdue'], "Walk-forward tickets use future information"
+        print(f"Backtest replayed {len(bt.sorteos)} draws (ROI {bt.df_summary['ROI'].round(2).tolist()}).")
+        draw_store = etl.open_draw_store()
+        if draw_store is not None:
+            # The pages replay from the shared store; it must hold the same boliyapa and extra balls
+            bt_store = backtest.run_backtest(draw_store, strategies=['hot', 'overdue'], seed=2022)
+            assert np.array_equal(bt.payouts, bt_store.payouts), "Backtest from the draw store differs from the draws frame"
+
+        print("Testing ML Feature Store...")
+        from modules import features
+        incidence, sorteos = analysis.get_gap_incidence(df_exploded)
+        full = features.build_feature_set(incidence, sorteos)
+        extended = features.extend_feature_set(features.build_feature_set(incidence[:-5], sorteos[:-5]), incidence, sorteos)
+        assert np.array_equal(full.features, extended.features), "Incremental features differ from a full rebuild"
+        print(f"Feature store OK: {full.features.shape} (draws x balls x features).")
+
+        print("Testing Model Registry...")
+        import tempfile, types
+        from modules import registry
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # An artifact of an earlier version (a prefix of the draws) is continued, then read back
+            prefix = types.SimpleNamespace(version='prefix', incidence=incidence[:-5], sorteos=sorteos[:-5])
+            current = types.SimpleNamespace(version='current', incidence=incidence, sorteos=sorteos)
+            first = registry.load_or_train(prefix, params={'n_estimators': 10}, warm_start_rounds=5, cache_dir=tmp_dir)
+            if first is None:
+                print("XGBoost not installed, registry skipped.")
+            else:
+                warm = registry.load_or_train(current, params={'n_estimators': 10}, warm_start_rounds=5, cache_dir=tmp_dir)
+                cached = registry.load_or_train(current, params={'n_estimators': 10}, warm_start_rounds=5, cache_dir=tmp_dir)
+                assert warm.source == 'incremental' and warm.n_trees == 15, "Registry did not warm start from the earlier artifact"
+                assert cached.source == 'registro' and np.array_equal(cached.cm, warm.cm) and cached.roc_auc == warm.roc_auc
+                print(f"Model registry OK ({warm.key}: {warm.n_trees} trees, AUC {warm.roc_auc:.3f}).")
+
+                print("Testing Rolling-Origin Cross-Validation...")
+                from modules import validation
+                folds = validation.rolling_origin_folds(len(incidence), n_folds=5)
+                # Test blocks tile the second half of the history and always follow their training draws
+                assert folds[0][0] == len(incidence) // 2 and folds[-1][1] == len(incidence)
+                assert all(a[1] == b[0] for a, b in zip(folds[:-1], folds[1:]))
+                cv = validation.run_time_series_cv(df_exploded, n_folds=5, params={'n_estimators': 10}, seed=2022, n_jobs=1)
+                cv_parallel = validation.run_time_series_cv(df_exploded, n_folds=5, params={'n_estimators': 10}, seed=2022, n_jobs=2)
+                assert np.allclose(cv.auc, cv_parallel.auc) and np.allclose(cv.random_auc, cv_parallel.random_auc), "CV results depend on n_jobs"
+                auc_row = cv.df_summary.iloc[0]
+                print(f"Cross-validation OK: AUC {auc_row['Modelo']:.3f} [{auc_row['IC_Bajo']:.3f}, {auc_row['IC_Alto']:.3f}] vs random {auc_row['Azar']:.3f}.")
+
     else:
         print("Data Load Returned Empty DF.")
+        sys.exit(1)
 
 except Exception as e:
     print(f"Verification Failed: {e}")
     import traceback
     traceback.print_exc()
+    # A failed check must fail the run (CI, pre-commit), not just print
+    sys.exit(1)